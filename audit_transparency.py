@@ -0,0 +1,286 @@
+# audit_transparency.py
+"""
+キャラクターの全画像について、透過の不具合（輪郭のにじみ・穴・透明度の誤用）を一括で検査するコマンドラインツール。
+
+使い方:
+    python audit_transparency.py alice                    # alice の全画像を検査
+    python audit_transparency.py alice bob -j 8 --top 50
+    python audit_transparency.py --tolerance 10 --json    # 全キャラクターを許容値10で検査し、JSONで出力
+
+検査する画像は、各 COSTUME_DETAIL_* の AVAILABLE_EMOTIONS にある表情の画像（<表情>.png と _close / _open / _standby）、
+[FAVORABILITY_HEARTS] のハート画像、stills フォルダの画像です。表情とスチルは[INFO]、ハートは[HEART_UI]の
+TRANSPARENCY_MODE / TRANSPARENT_COLOR / EDGE_COLOR で判定します（判定の内容は TransparencyAnalyzer.find_issues を参照）。
+画像ごとの判定はプロセスプールで並列に行い、問題のある画像は、問題の画素の密度を元画像に重ねたヒートマップを
+--output-dir に書き出します。問題の多い順のランキングは標準エラー出力に、--json では全結果を標準出力に書き出します。
+"""
+
+import argparse
+import configparser
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from src.project_manager import ProjectManager
+from src.transparency import TransparencyAnalyzer
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+EXPRESSION_SUFFIXES = ('', '_close', '_open', '_standby')
+# ヒートマップの長辺の最大サイズ
+HEATMAP_MAX_SIZE = 512
+
+
+def collect_images(base_path: str, project_id: str, tolerance: int | None, config_path: str | None) -> tuple[list[dict], list[dict]]:
+    """
+    1キャラクター分の検査対象の画像と判定条件を集める。
+
+    Returns:
+        tuple: (検査ジョブのリスト, 見つからなかった画像のリスト)
+
+    Raises:
+        ValueError: 透過色・縁色を解釈できない場合。
+    """
+    from src.character_data import CharacterData
+
+    character_data = CharacterData(project_id, base_path=base_path, read_only=True)
+    char_dir = character_data.base_path
+    if tolerance is None:
+        tolerance = TransparencyAnalyzer.read_tolerance(character_data, config_path)
+    settings = {}
+    for section in ('INFO', 'HEART_UI'):
+        mode, trans_color, edge_color = TransparencyAnalyzer.read_settings(character_data, section)
+        try:
+            settings[section] = (mode, TransparencyAnalyzer.parse_color(trans_color), TransparencyAnalyzer.parse_color(edge_color))
+        except ValueError as e:
+            raise ValueError(f"[{section}] の透過色・縁色を解釈できません: {e}") from e
+
+    jobs = []
+    missing = []
+
+    def add(kind: str, label: str, path: str, section: str):
+        mode, key_rgb, edge_rgb = settings[section]
+        jobs.append({
+            'project_id': project_id, 'kind': kind, 'label': label, 'path': path, 'mode': mode,
+            'key_rgb': key_rgb, 'edge_rgb': edge_rgb, 'tolerance': tolerance,
+        })
+
+    for section in character_data.config.sections():
+        if not section.startswith('COSTUME_DETAIL_'):
+            continue
+        costume_id = section[len('COSTUME_DETAIL_'):]
+        for expression in character_data.get_expressions_for_costume(costume_id):
+            found = False
+            for suffix in EXPRESSION_SUFFIXES:
+                path = os.path.join(char_dir, costume_id, f"{expression['id']}{suffix}.png")
+                if os.path.exists(path):
+                    add('expression', f"{costume_id}/{expression['id']}{suffix}", path, 'INFO')
+                    found = True
+            if not found:
+                missing.append({'project_id': project_id, 'kind': 'expression', 'label': f"{costume_id}/{expression['id']}"})
+
+    # キャラクターの hearts に無い画像は、エディタと同じくアプリ同梱の既定の画像を使う
+    default_hearts_dir = os.path.join(base_path, 'images', 'hearts')
+    for heart in character_data.get_favorability_hearts():
+        path = os.path.join(char_dir, 'hearts', heart['filename'])
+        default_path = os.path.join(default_hearts_dir, heart['filename'])
+        if os.path.exists(path):
+            add('heart', f"hearts/{heart['filename']}", path, 'HEART_UI')
+        elif os.path.exists(default_path):
+            add('heart', f"images/hearts/{heart['filename']}", default_path, 'HEART_UI')
+        else:
+            missing.append({'project_id': project_id, 'kind': 'heart', 'label': f"hearts/{heart['filename']}"})
+
+    stills_dir = os.path.join(char_dir, 'stills')
+    if os.path.isdir(stills_dir):
+        for filename in sorted(os.listdir(stills_dir)):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                add('still', f"stills/{filename}", os.path.join(stills_dir, filename), 'INFO')
+
+    return jobs, missing
+
+
+def _write_heatmap(rgba, issues: dict, heatmap_path: str):
+    """問題の画素の密度を、暗くした元画像に赤〜黄で重ねたヒートマップを書き出す。"""
+    import numpy as np
+    from PIL import Image
+
+    height, width = rgba.shape[:2]
+    block = max(1, -(-max(height, width) // HEATMAP_MAX_SIZE))
+    grid_h, grid_w = -(-height // block), -(-width // block)
+    mask = issues['halo'] | issues['holes'] | issues['misuse']
+    padded = np.zeros((grid_h * block, grid_w * block), dtype=bool)
+    padded[:height, :width] = mask
+    counts = padded.reshape(grid_h, block, grid_w, block).sum(axis=(1, 3), dtype=np.uint32)
+    # 1画素だけの問題も見えるよう、ブロック内の割合の平方根で強調する
+    heat = np.sqrt(counts / float(block * block))[..., None]
+
+    background = Image.fromarray(rgba, "RGBA").convert("L").resize((grid_w, grid_h), Image.Resampling.BOX)
+    base = np.asarray(background, dtype=np.float32)[..., None] * 0.35
+    color = np.empty((grid_h, grid_w, 3), dtype=np.float32)
+    color[..., 0] = 255
+    color[..., 1] = 255 * (1 - heat[..., 0])
+    color[..., 2] = 0
+    weight = np.where(counts[..., None] > 0, 0.4 + 0.6 * heat, 0.0)
+    out = base * (1 - weight) + color * weight
+
+    os.makedirs(os.path.dirname(heatmap_path), exist_ok=True)
+    Image.fromarray(out.clip(0, 255).astype(np.uint8), "RGB").save(heatmap_path, "PNG")
+
+
+def audit_image(job: dict) -> dict:
+    """1枚の画像を検査する（ワーカープロセスで実行される）。例外は結果の 'error' に格納する。"""
+    import numpy as np
+    from PIL import Image
+
+    started = time.perf_counter()
+    result = {key: job[key] for key in ('project_id', 'kind', 'label', 'path', 'mode', 'tolerance')}
+    result.update(width=None, height=None, keyed_ratio=None, halo=0, holes=0, misuse=0, fringe=0, score=0, heatmap=None, error=None)
+    try:
+        with Image.open(job['path']) as img:
+            rgba = np.asarray(img if img.mode == "RGBA" else img.convert("RGBA"))
+        issues = TransparencyAnalyzer.find_issues(rgba, job['mode'], job['key_rgb'], job['edge_rgb'], job['tolerance'])
+        stats = issues['stats']
+        result.update(
+            width=rgba.shape[1], height=rgba.shape[0],
+            keyed_ratio=round(stats['keyed'] / stats['pixels'], 4) if stats['pixels'] else 0.0,
+            halo=stats['halo'], holes=stats['holes'], misuse=stats['misuse'], fringe=stats['fringe'],
+            score=stats['halo'] + stats['holes'] + stats['misuse'],
+        )
+        if job.get('heatmap_path') and (result['score'] or job.get('all_heatmaps')):
+            _write_heatmap(rgba, issues, job['heatmap_path'])
+            result['heatmap'] = job['heatmap_path']
+    except Exception as e:
+        result['error'] = str(e)
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def format_ranking(results: list[dict], top: int) -> str:
+    """問題の多い順のランキングを表にする。"""
+    ranked = [r for r in results if r['score'] or r['error']]
+    if not ranked:
+        return "透過の問題は見つかりませんでした。"
+    lines = [f"{'順位':>4}  {'にじみ':>8}  {'穴':>8}  {'誤用':>8}  キャラクター / 画像"]
+    for rank, r in enumerate(ranked[:top], 1):
+        if r['error']:
+            lines.append(f"{rank:>4}  {'-':>8}  {'-':>8}  {'-':>8}  {r['project_id']} / {r['label']} (読み込みエラー: {r['error']})")
+        else:
+            lines.append(f"{rank:>4}  {r['halo']:>8,}  {r['holes']:>8,}  {r['misuse']:>8,}  {r['project_id']} / {r['label']} [{r['mode']}]")
+    if len(ranked) > top:
+        lines.append(f"  ...ほか {len(ranked) - top} 件")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    if getattr(sys, 'frozen', False):
+        default_base_path = os.path.dirname(sys.executable)
+    else:
+        default_base_path = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="キャラクターの全画像の透過の問題（にじみ・穴・透明度の誤用）を一括で検査します。")
+    parser.add_argument('projects', nargs='*', help="対象のキャラクターID（省略時は characters/ 配下のすべて）")
+    parser.add_argument('--base-path', default=default_base_path, help="characters フォルダと config.ini があるディレクトリ")
+    parser.add_argument('--tolerance', type=int, default=None, help="透過色の許容値（省略時はキャラクターまたは config.ini の TRANSPARENCY_TOLERANCE）")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="並列実行するプロセス数")
+    parser.add_argument('--output-dir', default=None, help="ヒートマップの出力先（省略時は <base-path>/_transparency_audit）")
+    parser.add_argument('--no-heatmaps', action='store_true', help="ヒートマップを書き出さない")
+    parser.add_argument('--all-heatmaps', action='store_true', help="問題の無い画像のヒートマップも書き出す")
+    parser.add_argument('--top', type=int, default=30, help="ランキングに表示する件数")
+    parser.add_argument('--json', action='store_true', help="全結果をJSONで標準出力に書き出す")
+    args = parser.parse_args(argv)
+
+    if not TransparencyAnalyzer.AVAILABLE:
+        print("透過の検査には numpy が必要です。`pip install numpy` を実行してください。", file=sys.stderr)
+        return 2
+
+    base_path = os.path.abspath(args.base_path)
+    config_path = os.path.join(base_path, 'config.ini')
+    output_dir = os.path.abspath(args.output_dir or os.path.join(base_path, '_transparency_audit'))
+
+    # キャラクターの読み込み時のログは標準エラーへ（標準出力はJSON専用）
+    with contextlib.redirect_stdout(sys.stderr):
+        all_projects = ProjectManager(base_path).list_projects()
+    if args.projects:
+        unknown = [p for p in args.projects if p not in all_projects]
+        if unknown:
+            print(f"存在しないキャラクターIDが指定されました: {', '.join(unknown)}", file=sys.stderr)
+            return 2
+        project_ids = args.projects
+    else:
+        project_ids = all_projects
+
+    started = time.perf_counter()
+    jobs = []
+    missing = []
+    project_errors = []
+    with contextlib.redirect_stdout(sys.stderr):
+        for project_id in project_ids:
+            # iniが無いフォルダは雛形の値で読み込まれてしまうため除外する
+            if not os.path.exists(os.path.join(base_path, 'characters', project_id, 'character.ini')):
+                continue
+            try:
+                project_jobs, project_missing = collect_images(base_path, project_id, args.tolerance, config_path)
+            except (ValueError, OSError, configparser.Error) as e:
+                # 1キャラクターの設定の誤りで、他のキャラクターの検査を止めない
+                project_errors.append({'project_id': project_id, 'error': str(e)})
+                continue
+            jobs.extend(project_jobs)
+            missing.extend(project_missing)
+    for job in jobs:
+        job['all_heatmaps'] = args.all_heatmaps
+        if not args.no_heatmaps:
+            name = job['label'].replace('/', '__')
+            job['heatmap_path'] = os.path.join(output_dir, job['project_id'], f"{os.path.splitext(name)[0]}.png")
+
+    print(f"{len(project_ids)} 件のキャラクターの {len(jobs)} 枚の画像を {args.jobs} プロセスで検査します。", file=sys.stderr)
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as executor:
+            # 1枚ごとのやり取りの負担を減らすため、ある程度まとめてワーカーに渡す
+            chunksize = max(1, len(jobs) // (args.jobs * 4))
+            results = list(executor.map(audit_image, jobs, chunksize=chunksize))
+    else:
+        results = [audit_image(job) for job in jobs]
+
+    # エラーを先頭に、以降は問題の画素が多い順
+    results.sort(key=lambda r: (r['error'] is None, -r['score'], -r['halo'], r['project_id'], r['label']))
+    elapsed = time.perf_counter() - started
+
+    print(format_ranking(results, args.top), file=sys.stderr)
+    for m in missing:
+        print(f"画像が見つかりません: {m['project_id']} / {m['label']}", file=sys.stderr)
+    for e in project_errors:
+        print(f"検査できませんでした: {e['project_id']} ({e['error']})", file=sys.stderr)
+    flagged = sum(1 for r in results if r['score'])
+    print(f"{len(results)} 枚中 {flagged} 枚に問題があります ({elapsed:.2f}秒)。", file=sys.stderr)
+    if flagged and not args.no_heatmaps:
+        print(f"ヒートマップ: {output_dir}", file=sys.stderr)
+
+    if args.json:
+        summary = {
+            'generated_at_utc': datetime.now(timezone.utc).isoformat(),
+            'base_path': base_path,
+            'jobs': args.jobs,
+            'elapsed_sec': round(elapsed, 4),
+            'counts': {
+                'images': len(results),
+                'flagged': flagged,
+                'errors': sum(1 for r in results if r['error']),
+                'missing': len(missing),
+                'project_errors': len(project_errors),
+            },
+            'results': results,
+            'missing': missing,
+            'project_errors': project_errors,
+        }
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+    return 1 if flagged or project_errors or any(r['error'] for r in results) else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# batch_package.py
+"""
+GUIを使わずに、characters/ 配下の複数キャラクターをまとめて検証・ZIP化するコマンドラインツール。
+
+使い方:
+    python batch_package.py                      # 全キャラクターをZIP化
+    python batch_package.py alice bob            # 指定したキャラクターのみ
+    python batch_package.py -j 8 --summary out.json
+    python batch_package.py --optimize-images --max-colors 256   # 画像を可逆に最適化してからZIP化
+
+ZIPの作成はエディタの「GitHubに共有」と同じ GithubUploader.create_character_zip を使い、
+キャラクターごとにプロセスプールで並列実行します。
+処理結果（サイズ、分割の有無、処理時間、エラー）はJSONで標準出力（または --summary のファイル）に書き出します。
+各キャラクターの処理ログは標準エラー出力に流れるため、標準出力はそのまま機械処理に使えます。
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from src.project_manager import ProjectManager
+
+# ワーカープロセスごとに1つだけ生成するアップローダー
+_worker_uploader = None
+
+
+def _init_worker(config_path: str, output_dir: str | None, optimize_images: bool | None = None, max_colors: int | None = None):
+    """ワーカープロセスの初期化。GithubUploader（設定とソルトの読み込み）はプロセスごとに一度だけ行う。"""
+    global _worker_uploader
+    with contextlib.redirect_stdout(sys.stderr):
+        from src.github_uploader import GithubUploader
+        _worker_uploader = GithubUploader(config_path)
+        if output_dir:
+            _worker_uploader.zip_output_dir = os.path.abspath(output_dir)
+            os.makedirs(_worker_uploader.zip_output_dir, exist_ok=True)
+        if optimize_images is not None:
+            _worker_uploader.optimize_images = optimize_images
+        if max_colors is not None:
+            _worker_uploader.max_palette_colors = max_colors
+        # キャラクター単位で既に並列化しているため、画像の最適化はワーカー内で順に行う
+        _worker_uploader.image_optimizer_workers = 1
+
+
+def _read_package_info(zip_path: str) -> dict:
+    """作成済みZIPから package_info.json を読み出す。読めなければ空の辞書を返す。"""
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            return json.loads(zf.read('package_info.json').decode('utf-8'))
+    except (KeyError, OSError, ValueError, zipfile.BadZipFile):
+        return {}
+
+
+def package_project(base_path: str, project_id: str) -> dict:
+    """
+    1キャラクター分の検証とZIP化を行い、結果を辞書で返す（ワーカープロセスで実行される）。
+    例外はここで捕捉し、結果の 'error' に格納する。
+    """
+    from src.character_data import CharacterData
+
+    result = {
+        'project_id': project_id,
+        'character_name': None,
+        'status': 'ok',
+        'split': False,
+        'zips': [],
+        'total_zip_bytes': 0,
+        'censored_thumbnail': None,
+        'image_optimization': None,
+        'timings': {},
+        'error': None,
+    }
+    started = time.perf_counter()
+
+    # ログは標準エラーへ（標準出力はJSONサマリー専用）
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            ini_path = os.path.join(base_path, 'characters', project_id, 'character.ini')
+            if not os.path.exists(ini_path):
+                # iniが無いフォルダは雛形の値で読み込まれてしまうため、ここで除外する
+                result['status'] = 'skipped'
+                result['error'] = 'character.ini が見つかりません。'
+                return result
+
+            load_started = time.perf_counter()
+            # 読み取り専用で開き、events/stills フォルダやサムネイルを勝手に作らない
+            character_data = CharacterData(project_id, base_path=base_path, read_only=True)
+            character_name = character_data.get('INFO', 'CHARACTER_NAME', project_id)
+            result['character_name'] = character_name
+            result['timings']['load_sec'] = round(time.perf_counter() - load_started, 4)
+
+            package_started = time.perf_counter()
+            zip_paths, censored_thumbnail_path = _worker_uploader.create_character_zip(
+                character_data, character_data.base_path, project_id, character_name=character_name
+            )
+            result['timings']['package_sec'] = round(time.perf_counter() - package_started, 4)
+
+            for zip_path in zip_paths:
+                package_info = _read_package_info(zip_path)
+                size = os.path.getsize(zip_path)
+                result['zips'].append({
+                    'path': zip_path,
+                    'bytes': size,
+                    'package_type': package_info.get('package_type'),
+                    'part_name': package_info.get('part_name'),
+                })
+                result['total_zip_bytes'] += size
+            result['split'] = len(zip_paths) > 1
+            result['censored_thumbnail'] = censored_thumbnail_path
+            result['image_optimization'] = _worker_uploader.last_optimization_report
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+            print(f"[{project_id}] ZIP作成に失敗しました: {e}")
+        finally:
+            result['timings']['total_sec'] = round(time.perf_counter() - started, 4)
+
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    if getattr(sys, 'frozen', False):
+        default_base_path = os.path.dirname(sys.executable)
+    else:
+        default_base_path = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="キャラクターを一括で検証・ZIP化します（GUI不要）。")
+    parser.add_argument('projects', nargs='*', help="対象のキャラクターID（省略時は characters/ 配下のすべて）")
+    parser.add_argument('--base-path', default=default_base_path, help="characters フォルダと config.ini があるディレクトリ")
+    parser.add_argument('--config', default=None, help="config.ini のパス（省略時は <base-path>/config.ini）")
+    parser.add_argument('--output-dir', default=None, help="ZIPの出力先（省略時は _temp_zips）")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="並列実行するプロセス数")
+    parser.add_argument('--summary', default=None, help="JSONサマリーの書き出し先（省略時は標準出力）")
+    parser.add_argument('--optimize-images', action=argparse.BooleanOptionalAction, default=None,
+                        help="ZIP化の前に画像を可逆に最適化する（省略時は config.ini の [PACKAGING] optimize_images）")
+    parser.add_argument('--max-colors', type=int, default=None, metavar='N',
+                        help="N色以下の画像をパレットPNGにする（0で無効、省略時は config.ini の max_palette_colors）")
+    args = parser.parse_args(argv)
+
+    base_path = os.path.abspath(args.base_path)
+    config_path = args.config or os.path.join(base_path, 'config.ini')
+    if not os.path.exists(config_path):
+        print(f"設定ファイルが見つかりません: {config_path}", file=sys.stderr)
+        return 2
+
+    all_projects = ProjectManager(base_path).list_projects()
+    if args.projects:
+        unknown = [p for p in args.projects if p not in all_projects]
+        if unknown:
+            print(f"存在しないキャラクターIDが指定されました: {', '.join(unknown)}", file=sys.stderr)
+            return 2
+        project_ids = args.projects
+    else:
+        project_ids = all_projects
+
+    print(f"{len(project_ids)} 件のキャラクターを {args.jobs} プロセスで処理します。", file=sys.stderr)
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=max(1, args.jobs),
+        initializer=_init_worker,
+        initargs=(config_path, args.output_dir, args.optimize_images, args.max_colors),
+    ) as executor:
+        futures = {executor.submit(package_project, base_path, pid): pid for pid in project_ids}
+        for future in as_completed(futures):
+            project_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # ワーカープロセス自体の異常終了など
+                result = {'project_id': project_id, 'status': 'error', 'error': str(e)}
+            print(f"[{result['status']}] {project_id}", file=sys.stderr)
+            results.append(result)
+
+    order = {pid: i for i, pid in enumerate(project_ids)}
+    results.sort(key=lambda r: order[r['project_id']])
+    summary = {
+        'generated_at_utc': datetime.now(timezone.utc).isoformat(),
+        'base_path': base_path,
+        'jobs': args.jobs,
+        'elapsed_sec': round(time.perf_counter() - started, 4),
+        'counts': {
+            status: sum(1 for r in results if r['status'] == status)
+            for status in ('ok', 'skipped', 'error')
+        },
+        'results': results,
+    }
+
+    summary_json = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(summary_json)
+        print(f"サマリーを書き出しました: {args.summary}", file=sys.stderr)
+    else:
+        print(summary_json)
+
+    return 1 if summary['counts']['error'] else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# bench_packaging.py
+"""
+ZIPの圧縮ポリシーごとに、パッケージ作成の処理時間とZIPサイズを比較するベンチマーク。
+
+使い方:
+    python bench_packaging.py                         # 合成データ（画像 200MB 相当）で比較
+    python bench_packaging.py --images 400 --image-kb 1024
+    python bench_packaging.py --project alice         # 実在のキャラクターフォルダで比較
+
+署名やパッケージ情報の作成は行わず、GithubUploader と同じ CompressionPolicy.zip_info を使って
+エントリを書き込む部分だけを計測します。合成データの画像は、PNGと同様にほぼ圧縮できない乱数で作ります。
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+from src.compression_policy import CompressionPolicy
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def generate_synthetic_character(dest_dir: str, images: int, image_kb: int, events: int, seed: int | None) -> list[tuple[str, str]]:
+    """衣装の画像（圧縮できないデータ）とイベントJSONからなる合成キャラクターを作る。"""
+    rng = random.Random(seed)
+    entries = []
+
+    def add(arcname: str, data: bytes):
+        path = os.path.join(dest_dir, *arcname.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        entries.append((arcname, path))
+
+    add('character.ini', ("[INFO]\nCHARACTER_NAME = bench\n" + "".join(f"[COSTUME_DETAIL_c{i}]\nAVAILABLE_EMOTIONS = normal:通常\n" for i in range(20))).encode('utf-8'))
+    add('topics.txt', "\n".join(f"話題{i}" for i in range(500)).encode('utf-8'))
+    for i in range(images):
+        add(f"costume_{i % 10:02d}/expr_{i:04d}.png", rng.randbytes(image_kb * 1024))
+    for i in range(events):
+        event = {'id': f"event_{i:04d}", 'triggers': [[{'type': 'favorability_above', 'value': str(i)}]],
+                 'sequence': [{'type': 'dialogue', 'params': {'text': f"こんにちは、{i}回目のイベントです。" * 5}} for _ in range(20)]}
+        add(f"events/event_{i:04d}.json", json.dumps(event, ensure_ascii=False, indent=4).encode('utf-8'))
+    return entries
+
+
+def collect_project_entries(project_dir: str) -> list[tuple[str, str]]:
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(project_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            entries.append((os.path.relpath(path, project_dir).replace("\\", "/"), path))
+    return entries
+
+
+def build_zip(entries: list[tuple[str, str]], zip_path: str, policy: CompressionPolicy) -> dict:
+    started = time.perf_counter()
+    stored = 0
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        for arcname, src_path in entries:
+            zinfo = policy.zip_info(src_path, arcname)
+            stored += zinfo.compress_type == zipfile.ZIP_STORED
+            with open(src_path, 'rb') as src, zf.open(zinfo, 'w') as dest:
+                shutil.copyfileobj(src, dest, STREAM_CHUNK_SIZE)
+    return {
+        'mode': policy.mode,
+        'sec': round(time.perf_counter() - started, 4),
+        'zip_bytes': os.path.getsize(zip_path),
+        'stored_entries': stored,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    if getattr(sys, 'frozen', False):
+        default_base_path = os.path.dirname(sys.executable)
+    else:
+        default_base_path = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="ZIPの圧縮ポリシーごとの処理時間とサイズを比較します。")
+    parser.add_argument('--project', default=None, help="実在のキャラクターIDで計測する（省略時は合成データ）")
+    parser.add_argument('--base-path', default=default_base_path, help="characters フォルダがあるディレクトリ")
+    parser.add_argument('--images', type=int, default=200, help="合成データの画像の枚数")
+    parser.add_argument('--image-kb', type=int, default=1024, help="合成データの画像1枚のサイズ(KB)")
+    parser.add_argument('--events', type=int, default=100, help="合成データのイベント数")
+    parser.add_argument('--repeat', type=int, default=3, help="各ポリシーの計測回数（最速の値を採用）")
+    parser.add_argument('--seed', type=int, default=0, help="合成データの乱数シード")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='bench_packaging_')
+    try:
+        if args.project:
+            project_dir = os.path.join(os.path.abspath(args.base_path), 'characters', args.project)
+            if not os.path.isdir(project_dir):
+                print(f"キャラクターフォルダが見つかりません: {project_dir}", file=sys.stderr)
+                return 2
+            entries = collect_project_entries(project_dir)
+        else:
+            entries = generate_synthetic_character(os.path.join(work_dir, 'src'), args.images, args.image_kb, args.events, args.seed)
+        input_bytes = sum(os.path.getsize(path) for _, path in entries)
+        print(f"{len(entries)} ファイル, {input_bytes / 1024**2:.1f}MB を計測します...", file=sys.stderr)
+
+        results = []
+        for mode in (CompressionPolicy.MODE_DEFLATE_ALL, CompressionPolicy.MODE_EXTENSION, CompressionPolicy.MODE_AUTO):
+            policy = CompressionPolicy(mode)
+            runs = [build_zip(entries, os.path.join(work_dir, f"{mode}.zip"), policy) for _ in range(max(1, args.repeat))]
+            results.append(min(runs, key=lambda r: r['sec']))
+
+        baseline = results[0]
+        for r in results:
+            r['speedup'] = round(baseline['sec'] / r['sec'], 2) if r['sec'] else None
+            r['size_delta_bytes'] = r['zip_bytes'] - baseline['zip_bytes']
+        print(json.dumps({'files': len(entries), 'input_bytes': input_bytes, 'results': results}, indent=2, ensure_ascii=False))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # main.py
 
+import multiprocessing
 import os
 import sys
 import tkinter as tk
@@ -58,6 +59,8 @@ else:
 # スクリプトがあるディレクトリを作業ディレクトリに設定
 # これにより、常に 'characters' フォルダが正しく参照されます。
 if __name__ == "__main__":
+    # EXE化した環境で、画像最適化のプロセスプールがこのスクリプトを再実行しないようにする
+    multiprocessing.freeze_support()
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
     
     engine_manager = None
@@ -74,7 +77,6 @@ if __name__ == "__main__":
             # 依存ライブラリのチェック
             import psutil
             engine_manager = EngineManager(config_path=config_file, base_path=application_path)
-            engine_manager.start_all_engines_if_needed()
 
         except ImportError:
             print("\n" + "="*50)
@@ -89,7 +91,10 @@ if __name__ == "__main__":
     else:
         print(f"'{config_file}' が見つからないため、エンジン管理機能は無効です。")
     
+    # エンジンの確認・起動はウィンドウを表示してからバックグラウンドで行う
     app = CharacterMakerApp(base_path=application_path)
+    if engine_manager:
+        engine_manager.start_all_engines_async(on_status=app.set_engine_status)
 
     # ウィンドウが閉じられるときの処理を定義
     def on_closing():
@@ -0,0 +1,214 @@
+# simulate_triggers.py
+"""
+イベントの発生条件をシミュレーションするコマンドラインツール。
+
+使い方:
+    python simulate_triggers.py alice                     # 合成タイムラインで alice のイベントの発生を再生
+    python simulate_triggers.py alice --steps 500 --seed 1 --json
+    python simulate_triggers.py --bench 5000              # 5000件の合成イベントでベンチマーク
+
+キャラクターの events/*.json を読み取り専用で読み込み、好感度のランダムウォークとフラグ変更からなる
+タイムラインを TriggerSimulator で再生して、どのイベントがいつ発生したかを表示します。
+--bench では合成イベントを生成し、状態変化ごとに影響を受けるイベントだけを判定する方式と、
+毎回全イベントを判定する方式の処理時間・判定回数を比較します。両方式で発生したイベントの順序が
+一致しない場合は、比較の前提が崩れているためエラーにします。
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+from src.trigger_engine import TriggerEngine, TriggerSimulator
+
+
+def _parse_start(text: str | None) -> datetime.datetime:
+    if not text:
+        return datetime.datetime.now().replace(second=0, microsecond=0)
+    return datetime.datetime.strptime(text, "%Y/%m/%d %H:%M")
+
+
+def generate_synthetic_events(count: int, flag_count: int, seed: int | None = None) -> dict[str, dict]:
+    """ベンチマーク用に、好感度・フラグ・他イベントの完了を条件に持つイベントを生成する。"""
+    rng = random.Random(seed)
+    events = {}
+    for i in range(count):
+        groups = []
+        for _ in range(rng.randint(1, 2)):
+            group = [{'type': rng.choice(['favorability_above', 'favorability_below']), 'value': str(rng.randint(-300, 450))}]
+            if rng.random() < 0.6:
+                group.append({'type': rng.choice(['flag_equals', 'flag_exists', 'flag_above']),
+                              'flag': f"flag_{rng.randrange(flag_count)}", 'value': str(rng.randint(0, 3))})
+            if i and rng.random() < 0.2:
+                group.append({'type': 'event_completed', 'event_id': f"event_{rng.randrange(i):05d}"})
+            if rng.random() < 0.1:
+                group.append({'type': 'time_after', 'time': f"{rng.randint(0, 23):02d}:00"})
+            groups.append(group)
+        sequence = []
+        if rng.random() < 0.3:
+            sequence.append({'type': 'set_flag', 'params': {'flag': f"flag_{rng.randrange(flag_count)}", 'operator': '+', 'value': '1'}})
+        events[f"event_{i:05d}"] = {
+            'id': f"event_{i:05d}",
+            'triggers': groups,
+            'repeatable': rng.random() < 0.2,
+            'cooldown': '24h',
+            'sequence': sequence,
+        }
+    return events
+
+
+class _UnindexedTriggerEngine(TriggerEngine):
+    """状態の変更だけを行い、影響を受けるイベントの判定はしないエンジン（全件判定の比較用）。"""
+
+    def _firable_among(self, event_ids) -> list[str]:
+        return []
+
+
+class FullScanSimulator(TriggerSimulator):
+    """
+    ベンチマークの比較用。状態が変わるたびに全イベントをID順に判定する巡回を、発生するイベントが無くなるまで繰り返す。
+    発生したイベントの完了・set_flag などの副作用は TriggerSimulator と同じ _fire で適用する。
+    """
+
+    def __init__(self, events: dict[str, dict]):
+        super().__init__(events, _UnindexedTriggerEngine(events))
+
+    def run(self, timeline: list[dict]) -> list[dict]:
+        engine = self.engine
+        event_ids = sorted(self.events)
+        fired = []
+        for step in timeline:
+            engine.advance_clock(step['time'])
+            if 'favorability' in step:
+                engine.set_favorability(step['favorability'])
+            for flag, value in (step.get('flags') or {}).items():
+                engine.set_flag(flag, value)
+
+            fired_in_step = set()
+            fired_any = True
+            while fired_any:
+                fired_any = False
+                for event_id in event_ids:
+                    if event_id in fired_in_step or not engine.evaluate(event_id):
+                        continue
+                    fired_in_step.add(event_id)
+                    self._fire(event_id)
+                    fired.append({'time': engine.now, 'event_id': event_id, 'favorability': engine.favorability})
+                    fired_any = True
+        return fired
+
+
+def run_benchmark(event_count: int, steps: int, seed: int | None) -> dict:
+    """
+    同じタイムラインを、影響を受けるイベントだけを判定する方式と全イベントを判定する方式で再生して比較する。
+    どちらも TriggerSimulator で再生するため、完了・set_flag などの副作用は同じように適用される。
+
+    Raises:
+        RuntimeError: 両方式で発生したイベントの順序が一致しない場合。
+    """
+    flag_count = max(4, event_count // 50)
+    events = generate_synthetic_events(event_count, flag_count, seed)
+    flags = [f"flag_{i}" for i in range(flag_count)]
+    timeline = TriggerSimulator.generate_timeline(flags, steps, _parse_start(None), seed=seed)
+
+    started = time.perf_counter()
+    engine = TriggerEngine(events)
+    compile_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fired = TriggerSimulator(events, engine).run(timeline)
+    incremental_sec = time.perf_counter() - started
+
+    # 比較用: 状態が変わるたびに全イベントを判定する
+    full_simulator = FullScanSimulator(events)
+    started = time.perf_counter()
+    full_fired = full_simulator.run(timeline)
+    full_scan_sec = time.perf_counter() - started
+
+    sequence = [(r['time'], r['event_id']) for r in fired]
+    full_sequence = [(r['time'], r['event_id']) for r in full_fired]
+    if sequence != full_sequence:
+        mismatch = next((i for i, pair in enumerate(zip(sequence, full_sequence)) if pair[0] != pair[1]), min(len(sequence), len(full_sequence)))
+        raise RuntimeError(
+            f"2つの方式で発生したイベントが一致しません（{mismatch + 1}件目、"
+            f"発生数 {len(sequence)}件 / {len(full_sequence)}件）。"
+        )
+
+    return {
+        'events': event_count,
+        'steps': steps,
+        'compile_sec': round(compile_sec, 4),
+        'incremental_sec': round(incremental_sec, 4),
+        'incremental_evaluations': engine.evaluation_count,
+        'fired': len(fired),
+        'full_scan_sec': round(full_scan_sec, 4),
+        'full_scan_evaluations': full_simulator.engine.evaluation_count,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    if getattr(sys, 'frozen', False):
+        default_base_path = os.path.dirname(sys.executable)
+    else:
+        default_base_path = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="イベントの発生条件をシミュレーションします。")
+    parser.add_argument('project', nargs='?', help="対象のキャラクターID")
+    parser.add_argument('--base-path', default=default_base_path, help="characters フォルダがあるディレクトリ")
+    parser.add_argument('--steps', type=int, default=200, help="タイムラインのステップ数")
+    parser.add_argument('--step-hours', type=float, default=6.0, help="1ステップあたりの平均経過時間（時間）")
+    parser.add_argument('--start', default=None, help="開始日時 (YYYY/MM/DD HH:MM、省略時は現在時刻)")
+    parser.add_argument('--seed', type=int, default=None, help="乱数のシード（同じ値なら同じタイムラインになる）")
+    parser.add_argument('--json', action='store_true', help="結果をJSONで出力する")
+    parser.add_argument('--bench', type=int, default=None, metavar='N', help="N件の合成イベントでベンチマークを行う")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        try:
+            result = run_benchmark(args.bench, args.steps, args.seed)
+        except RuntimeError as e:
+            print(f"エラー: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return 0
+
+    if not args.project:
+        parser.error("キャラクターIDか --bench を指定してください。")
+
+    from src.character_data import CharacterData
+    character_data = CharacterData(args.project, base_path=os.path.abspath(args.base_path), read_only=True)
+    events = {event_id: data for event_id, data, _ in character_data.event_store.iter_cached_events()}
+    if not events:
+        print(f"キャラクター '{args.project}' にイベントがありません。", file=sys.stderr)
+        return 1
+
+    engine = TriggerEngine(events)
+    for event_id, cond, reason in engine.compile_errors:
+        print(f"警告: イベント '{event_id}' の条件 {cond} を解釈できません: {reason}", file=sys.stderr)
+
+    timeline = TriggerSimulator.generate_timeline(
+        character_data.event_store.get_all_flags(), args.steps, _parse_start(args.start),
+        step_hours=args.step_hours, seed=args.seed,
+    )
+    fired = TriggerSimulator(events, engine).run(timeline)
+
+    if args.json:
+        print(json.dumps([
+            {'time': r['time'].strftime("%Y/%m/%d %H:%M"), 'event_id': r['event_id'], 'favorability': r['favorability']}
+            for r in fired
+        ], indent=2, ensure_ascii=False))
+    else:
+        for r in fired:
+            print(f"{r['time'].strftime('%Y/%m/%d %H:%M')}  好感度 {r['favorability']:>5}  イベント '{r['event_id']}' が発生")
+        never_fired = sorted(set(events) - {r['event_id'] for r in fired})
+        print(f"\n{len(timeline)} ステップ中に {len(fired)} 回イベントが発生しました。")
+        if never_fired:
+            print(f"一度も発生しなかったイベント: {', '.join(never_fired)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
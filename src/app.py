@@ -13,6 +13,8 @@ from .project_manager import ProjectManager
 from .editor_window import EditorWindow
 from .settings_window import SettingsWindow
 from .character_installer import CharacterInstaller
+from .voice_client import VoiceEngineClient
+from .audio_cache import AudioCache
 
 class CharacterMakerApp(TkinterDnD.Tk):
     """
@@ -49,11 +51,22 @@ class CharacterMakerApp(TkinterDnD.Tk):
         self.minsize(int(win_width * 0.8), int(win_height * 0.7))
 
 
+        # 音声エンジンの状態 { セクション名: メッセージ }（main.py のバックグラウンド起動から通知される）
+        self.engine_status = {}
+        self.engine_status_label = None
+
         self.project_manager = ProjectManager(base_dir=self.base_path)
         
         # --- インストーラーを初期化 ---
         self.installer = CharacterInstaller(parent=self, characters_dir=self.project_manager.characters_dir)
 
+        # --- 音声エンジンとの通信は全エディタで1つのクライアントを共有する ---
+        self.voice_client = VoiceEngineClient(
+            self.config_file, cache_dir=os.path.join(self.project_manager.characters_dir, '.cache', 'speakers')
+        )
+        # 同じテキスト・話者・パラメータのテスト再生は合成し直さない
+        self.audio_cache = AudioCache(os.path.join(self.project_manager.characters_dir, '.cache', 'audio'))
+
         self.create_start_widgets()
 
     def create_menu(self):
@@ -88,6 +101,10 @@ class CharacterMakerApp(TkinterDnD.Tk):
         button_frame = ttk.Frame(self, padding=(self.padding_large, self.padding_small, self.padding_large, self.padding_large))
         button_frame.pack(side="bottom", fill="x")
 
+        self.engine_status_label = ttk.Label(button_frame, font=self.font_small, foreground="gray")
+        self.engine_status_label.pack(side="bottom", fill="x", pady=(self.padding_small, 0))
+        self._update_engine_status_label()
+
         # --- メインフレーム (残りの領域全体を占める) ---
         # 次に main_frame を作成し、残りの領域を埋めるように配置します。
         main_frame = ttk.Frame(self, padding=(self.padding_large, self.padding_large, self.padding_large, 0))
@@ -130,7 +147,25 @@ class CharacterMakerApp(TkinterDnD.Tk):
 
         ttk.Button(bottom_button_frame, text="キャラクターを探す(Web)", command=self.open_character_repo, style="App.TButton").pack(side="left", expand=True, fill="x", padx=(0, self.padding_small))
         ttk.Button(bottom_button_frame, text="キャラクターフォルダを開く", command=self.open_characters_folder, style="App.TButton").pack(side="left", expand=True, fill="x", padx=(0, self.padding_small))
-        ttk.Button(bottom_button_frame, text="更新", command=self.refresh_project_list, style="App.TButton").pack(side="left", expand=True, fill="x")
+        ttk.Button(bottom_button_frame, text="更新", command=lambda: self.refresh_project_list(full_rescan=True), style="App.TButton").pack(side="left", expand=True, fill="x")
+
+    def set_engine_status(self, section: str, status: str, message: str):
+        """音声エンジンの状態を表示する。ワーカースレッドから呼ばれるため、メインスレッドで反映する。"""
+        try:
+            self.after(0, self._apply_engine_status, section, message)
+        except (tk.TclError, RuntimeError):
+            pass # ウィンドウが閉じられた後
+
+    def _apply_engine_status(self, section: str, message: str):
+        self.engine_status[section] = message
+        self._update_engine_status_label()
+
+    def _update_engine_status_label(self):
+        if not self.engine_status_label or not self.engine_status_label.winfo_exists():
+            return
+        names = {'VOICEVOX': 'VOICEVOX', 'AIVIS_SPEECH': 'AivisSpeech'}
+        text = "  /  ".join(f"{names.get(section, section)}: {message}" for section, message in self.engine_status.items())
+        self.engine_status_label.config(text=text)
 
     def on_character_drop(self, event):
         """キャラクターリストにファイルがドロップされたときの処理"""
@@ -186,12 +221,28 @@ class CharacterMakerApp(TkinterDnD.Tk):
         """キャラクター配布リポジトリのIssueページをブラウザで開く"""
         webbrowser.open(self.character_repo_url)
 
-    def refresh_project_list(self):
-        """キャラクターリストを最新の状態に更新します。"""
+    def refresh_project_list(self, full_rescan: bool = False):
+        """
+        キャラクターリストを最新の状態に更新します。
+        「更新」ボタンからは full_rescan=True で呼び、フォルダの外から上書きされたファイルも読み直す。
+        """
         self.project_listbox.delete(0, tk.END)
-        projects = self.project_manager.list_projects()
-        for project_name in projects:
-            self.project_listbox.insert(tk.END, project_name)
+        project_index = self.project_manager.get_project_index(full_rescan=full_rescan)
+        # リストの行番号 → プロジェクトID（表示文字列にはキャラクター名などを含めるため）
+        self.project_ids = list(project_index)
+        for project_id, meta in project_index.items():
+            self.project_listbox.insert(tk.END, self._format_project_entry(project_id, meta))
+
+    @staticmethod
+    def _format_project_entry(project_id: str, meta: dict) -> str:
+        """キャラクターリストの1行分の表示文字列を作る。"""
+        if meta.get('error'):
+            return f"{project_id}  (⚠ {meta['error']})"
+        name = meta.get('character_name') or project_id
+        label = name if name == project_id else f"{name} ({project_id})"
+        size_mb = meta.get('total_bytes', 0) / (1024 * 1024)
+        return (f"{label}  - 衣装{meta.get('costume_count', 0)} / 表情{meta.get('expression_count', 0)}"
+                f" / イベント{meta.get('event_count', 0)} / {size_mb:.1f}MB")
 
     def new_project(self):
         """新規キャラクター作成のプロセスを開始します。"""
@@ -214,7 +265,7 @@ class CharacterMakerApp(TkinterDnD.Tk):
             messagebox.showwarning("警告", "編集するキャラクターをリストから選択してください。", parent=self)
             return
         
-        project_id = self.project_listbox.get(selected_indices[0])
+        project_id = self.project_ids[selected_indices[0]]
         self.open_editor_and_wait(project_id)
 
     def open_editor_and_wait(self, project_id):
@@ -223,6 +274,9 @@ class CharacterMakerApp(TkinterDnD.Tk):
         self.attributes("-disabled", True)
         self.wait_window(editor)
         self.attributes("-disabled", False)
+        # 編集内容（キャラクター名や衣装数など）を一覧に反映する
+        if self.project_listbox.winfo_exists():
+            self.refresh_project_list()
         self.deiconify()
         self.lift()
         self.focus_force()
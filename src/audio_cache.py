@@ -0,0 +1,121 @@
+# src/audio_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class AudioCache:
+    """
+    合成した音声(WAV)を (エンジン, APIのURL, エンジンのバージョン, 話者ID, テキスト, パラメータ) のハッシュを
+    ファイル名にしてディスクへ保存するキャッシュ。エンジンを更新・変更すると別のキーになるため、古い音声は使われない。
+
+    合計サイズが上限を超えたら、最後に使われた時刻が古いものから削除する（LRU）。
+    使用順はファイルの更新時刻で管理するため、アプリを再起動しても引き継がれる。
+    テスト再生から合成ワーカーまで複数のスレッドから使われるため、操作はロックで保護する。
+    """
+    DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+    FILE_SUFFIX = '.wav'
+
+    def __init__(self, cache_dir: str, max_bytes: int | None = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes or self.DEFAULT_MAX_BYTES
+        self._lock = threading.Lock()
+        # { キー: サイズ }。先頭ほど古い
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._scan()
+
+    def _scan(self):
+        """起動時に既存のキャッシュファイルを更新時刻順に読み込む。"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        found = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(self.FILE_SUFFIX):
+                st = entry.stat()
+                found.append((st.st_mtime_ns, entry.name[:-len(self.FILE_SUFFIX)], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(engine: str, speaker_id: int, text: str, params: dict | None = None,
+                 api_url: str | None = None, version: str | None = None) -> str:
+        """
+        キャッシュのキーを作る。数値のパラメータは 1 と 1.0 が同じキーになるよう正規化する。
+        api_url と version には VoiceEngineClient.get_engine_identity() の値を渡す。
+        """
+        normalized = {}
+        for key, value in (params or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = round(float(value), 4)
+            normalized[key] = value
+        payload = json.dumps([engine, api_url, version, speaker_id, text, normalized], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.FILE_SUFFIX)
+
+    def get(self, key: str) -> bytes | None:
+        """キャッシュ済みのWAVを返す。無ければNone。"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path) # 最後に使った時刻として更新する
+            except OSError:
+                # 外部から削除された
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        """WAVを保存し、上限を超えた分を古いものから削除する。"""
+        if not data or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            temp_path = None
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, self._path(key))
+            except OSError as e:
+                print(f"音声キャッシュを保存できませんでした: {e}")
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return
+            self._total_bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get_or_create(self, key: str, create) -> bytes:
+        """キャッシュにあればそれを返し、無ければ create() で作って保存してから返す。"""
+        data = self.get(key)
+        if data is None:
+            data = create()
+            self.put(key, data)
+        return data
@@ -5,11 +5,19 @@ import os
 import shutil
 import ast
 import re
-import json
+import copy
+import tempfile
+from contextlib import contextmanager
+
+from .event_store import EventStore
 
 class CharacterData:
     """
     character.iniの内容をオブジェクトとして管理し、読み書きを行うクラス。
+
+    read_only=True で開くと、フォルダやサムネイルの作成を一切行わず、
+    iniは初めて設定値にアクセスした時点で読み込む。変更系のメソッドは PermissionError を送出する。
+    一覧作成や一括処理など、多数のキャラクターを読むだけのツール向け。
     """
     class SafeFormatDict(dict):
         """
@@ -179,8 +187,9 @@ ISSUE_NUMBER = {GITHUB_ISSUE_NUMBER}
 censor_rects = {censor_rects}
 """
 
-    def __init__(self, project_id: str, base_path: str):
+    def __init__(self, project_id: str, base_path: str, read_only: bool = False):
         self.project_id = project_id
+        self.read_only = read_only
         # 1. EXEのある場所から "characters" フォルダへの絶対パスを作成
         characters_dir_path = os.path.join(base_path, 'characters')
         
@@ -192,12 +201,12 @@ censor_rects = {censor_rects}
         
         # 4.イベントファイルが格納されるディレクトリのパス
         self.events_dir = os.path.join(self.base_path, "events")
-        # events ディレクトリが存在しない場合は作成
-        os.makedirs(self.events_dir, exist_ok=True)
         # イベントスチルが格納されるディレクトリのパス
         self.stills_dir = os.path.join(self.base_path, "stills")
-        # stills ディレクトリが存在しない場合は作成
-        os.makedirs(self.stills_dir, exist_ok=True)
+        if not read_only:
+            # events / stills ディレクトリが存在しない場合は作成
+            os.makedirs(self.events_dir, exist_ok=True)
+            os.makedirs(self.stills_dir, exist_ok=True)
 
         # 5. readme.txt ファイルへのパスを作成
         self.readme_path = os.path.join(self.base_path, "readme.txt")
@@ -205,13 +214,35 @@ censor_rects = {censor_rects}
         # 6.専用話題ファイルのパスを作成
         self.topics_character_path = os.path.join(self.base_path, "topics.txt")
 
-        self.config = configparser.ConfigParser(interpolation=None)
-        self.config.optionxform = str
+        # イベントJSONのキャッシュと参照の逆引きインデックス
+        self.event_store = EventStore(self.events_dir)
+
+        # 読み込み済みの設定（読み取り専用モードでは config に初めてアクセスした時点で読み込む）
+        self._config = None
+        # タッチエリアの解析済みインデックス
+        # { 'COSTUME_DETAIL_xxx': { 感情ID(normalはNone): [エリア辞書, ...] } }
+        self._touch_area_index = {}
+        # 前回の保存以降に変更されたセクション名の集合（空ならsave()は何もしない）
+        self._dirty_sections = set()
+        if read_only:
+            return
         self.load()
 
         # 6.サムネイルが存在しなければ生成を試みる
         self._ensure_thumbnail_exists()
 
+    @property
+    def config(self) -> configparser.ConfigParser:
+        """iniの内容。まだ読み込んでいなければここで読み込む。"""
+        if self._config is None:
+            self.load()
+        return self._config
+
+    def _ensure_writable(self):
+        """読み取り専用で開かれている場合は PermissionError を送出する。"""
+        if self.read_only:
+            raise PermissionError(f"キャラクター '{self.project_id}' は読み取り専用で開かれているため変更できません。")
+
     def _ensure_thumbnail_exists(self):
         """
         キャラクターフォルダ直下にthumbnail.pngがなければ生成を試みる。
@@ -230,11 +261,48 @@ censor_rects = {censor_rects}
 
     def load(self):
         """iniファイルを読み込む。存在しない場合は雛形から生成。"""
+        if self._config is None:
+            self._config = configparser.ConfigParser(interpolation=None)
+            self._config.optionxform = str
         if os.path.exists(self.ini_path):
             self.config.read(self.ini_path, encoding='utf-8')
             print(f"既存のiniファイルを読み込みました: {self.ini_path}")
+            self._dirty_sections = set()
         else:
             self._load_from_template()
+            # ファイルがまだ無いので、初回のsave()では必ず全体を書き出す
+            self._dirty_sections = set(self.config.sections())
+        self._rebuild_touch_area_index()
+
+    def _mark_dirty(self, section: str):
+        """セクションを「未保存の変更あり」として記録する。"""
+        self._dirty_sections.add(section)
+
+    def _section_snapshot(self, section: str):
+        """セクションの現在の内容を比較用のタプルで返す。セクションが無ければNone。"""
+        if not self.config.has_section(section):
+            return None
+        return tuple(self.config.items(section, raw=True))
+
+    @contextmanager
+    def _track_section_changes(self, section: str):
+        """
+        セクションを一度消してから作り直すような更新処理を囲み、
+        内容が実際に変わった場合のみダーティとして記録する。
+        """
+        before = self._section_snapshot(section)
+        was_dirty = section in self._dirty_sections
+        yield
+        if self._section_snapshot(section) != before:
+            self._mark_dirty(section)
+        elif not was_dirty:
+            self._dirty_sections.discard(section)
+
+    def has_unsaved_changes(self) -> bool:
+        """前回の保存以降にiniの内容が変更されているかを返す。"""
+        if self.read_only:
+            return False
+        return bool(self._dirty_sections) or not os.path.exists(self.ini_path)
 
     def _load_from_template(self):
         """
@@ -293,7 +361,15 @@ censor_rects = {censor_rects}
         self.config.read_string(ini_string)
 
     def save(self):
-        """現在の設定内容を、コメントと構造を保持した形でiniファイルに書き出します。"""
+        """
+        現在の設定内容を、コメントと構造を保持した形でiniファイルに書き出します。
+        前回の保存以降に変更が無ければ書き込みを省略します。
+        書き込みは一時ファイル経由で行い、途中で失敗しても既存のファイルを壊しません。
+        """
+        self._ensure_writable()
+        if not self.has_unsaved_changes():
+            print(f"設定に変更が無いため保存をスキップしました: {self.ini_path}")
+            return
 
         def _normalize_placeholder(v: str) -> str:
             s = (v or '').strip()
@@ -374,11 +450,28 @@ censor_rects = {censor_rects}
         safe_args = self.SafeFormatDict(format_args)
         output_content = self.DEFAULT_INI_CONTENT.format_map(safe_args)
         
-        with open(self.ini_path, 'w', encoding='utf-8') as configfile:
-            configfile.write(output_content.strip())
-            
+        self._write_atomically(self.ini_path, output_content.strip())
+        self._dirty_sections.clear()
+
         print(f"設定をコメントを保持した形式でファイルに保存しました: {self.ini_path}")
 
+    @staticmethod
+    def _write_atomically(path: str, content: str):
+        """同じフォルダの一時ファイルに書き出してから os.replace で差し替える。"""
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.", suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
     def get(self, section: str, option: str, fallback: str = '', raw: bool = False) -> str:
         """
         設定値を取得します。raw=Trueで補間を無効化できます。
@@ -404,9 +497,16 @@ censor_rects = {censor_rects}
             option (str): オプション名.
             value: セットする値 (自動的に文字列に変換されます).
         """
+        self._ensure_writable()
+        value = str(value)
         if not self.config.has_section(section):
             self.config.add_section(section)
-        self.config.set(section, option, str(value))
+            self._mark_dirty(section)
+        elif self.config.get(section, option, fallback=None, raw=True) != value:
+            self._mark_dirty(section)
+        self.config.set(section, option, value)
+        if option.startswith('touch_area_'):
+            self._invalidate_touch_area_index(section)
 
     def get_issue_reference(self):
         """character.ini 内の [GITHUB] から Issue 参照を取得する。
@@ -457,6 +557,7 @@ censor_rects = {censor_rects}
         """
         新しい衣装をiniファイルとファイルシステムに追加します。
         """
+        self._ensure_writable()
         if self.config.has_option('COSTUMES', costume_id):
             raise ValueError(f"衣装ID '{costume_id}' は既に使用されています。")
 
@@ -466,6 +567,8 @@ censor_rects = {censor_rects}
         # 2. 対応する[COSTUME_DETAIL_...]セクションを雛形から作成
         section_name = f'COSTUME_DETAIL_{costume_id}'
         self.config.add_section(section_name)
+        self._mark_dirty(section_name)
+        self._invalidate_touch_area_index(section_name)
         self.set(section_name, 'IMAGE_PATH', costume_id) # IMAGE_PATHはIDと同じにするのが規約
         self.set(section_name, 'AVAILABLE_EMOTIONS', 'normal:通常')
 
@@ -477,6 +580,7 @@ censor_rects = {censor_rects}
         """
         衣装のIDと名前を変更します。
         """
+        self._ensure_writable()
         if old_id == 'default':
             # default衣装は名前のみ変更可能
             self.set('COSTUMES', old_id, new_name)
@@ -484,6 +588,7 @@ censor_rects = {censor_rects}
 
         # [COSTUMES]セクションのキーと値を更新
         self.config.remove_option('COSTUMES', old_id)
+        self._mark_dirty('COSTUMES')
         self.set('COSTUMES', new_id, new_name)
 
         # [COSTUME_DETAIL_...]セクションをリネーム
@@ -493,6 +598,10 @@ censor_rects = {censor_rects}
             items = self.config.items(old_section)
             self.config.remove_section(old_section)
             self.config.add_section(new_section)
+            self._mark_dirty(old_section)
+            self._mark_dirty(new_section)
+            self._invalidate_touch_area_index(old_section)
+            self._invalidate_touch_area_index(new_section)
             for key, value in items:
                 # IMAGE_PATHも新しいIDに更新
                 if key.lower() == 'image_path':
@@ -510,16 +619,20 @@ censor_rects = {censor_rects}
         """
         指定された衣装をiniファイルとファイルシステムから削除します。
         """
+        self._ensure_writable()
         if costume_id == 'default':
             raise ValueError("'default'衣装は削除できません。")
 
         # 1. [COSTUMES]セクションから削除
-        self.config.remove_option('COSTUMES', costume_id)
+        if self.config.remove_option('COSTUMES', costume_id):
+            self._mark_dirty('COSTUMES')
 
         # 2. [COSTUME_DETAIL_...]セクションを削除
         section_name = f'COSTUME_DETAIL_{costume_id}'
         if self.config.has_section(section_name):
             self.config.remove_section(section_name)
+            self._mark_dirty(section_name)
+        self._invalidate_touch_area_index(section_name)
 
         # 3. 画像フォルダを再帰的に削除
         costume_image_path = os.path.join(self.base_path, costume_id)
@@ -554,56 +667,82 @@ censor_rects = {censor_rects}
         emotions_str = ",".join([f"{expr['id']}:{expr['name']}" for expr in expressions])
         self.set(section, 'AVAILABLE_EMOTIONS', emotions_str)
 
+    # タッチエリアのキー名: touch_area_N (normal) / touch_area_<感情ID>_N (感情専用)
+    TOUCH_AREA_KEY_PATTERN = re.compile(r'^touch_area_(?:(.+)_)?(\d+)$')
+
+    def _rebuild_touch_area_index(self):
+        """全衣装セクションのタッチエリアを解析し、インデックスを作り直す。"""
+        self._touch_area_index = {}
+        for section in self.config.sections():
+            if section.startswith('COSTUME_DETAIL_'):
+                self._get_touch_area_index(section)
+
+    def _invalidate_touch_area_index(self, section: str):
+        """指定セクションの解析済みタッチエリアを破棄する（次回参照時に再解析される）。"""
+        self._touch_area_index.pop(section, None)
+
+    def _get_touch_area_index(self, section: str) -> dict:
+        """
+        指定セクションのタッチエリアを 感情ID → 連番順のエリアリスト の辞書として返す。
+        normal用(touch_area_N)のキーは None で格納する。
+        解析結果はセクション単位でキャッシュされる。
+        """
+        index = self._touch_area_index.get(section)
+        if index is not None:
+            return index
+
+        numbered = {}
+        if self.config.has_section(section):
+            for key, value in self.config.items(section):
+                match = self.TOUCH_AREA_KEY_PATTERN.match(key)
+                if not match:
+                    continue
+                emotion_key, number = match.group(1), int(match.group(2))
+                # 解析に失敗したキーでも「専用設定が存在する」ことは記録しておく
+                entries = numbered.setdefault(emotion_key, [])
+                try:
+                    parts = value.rsplit(',', 2)
+                    if len(parts) != 3: continue
+
+                    coords_def_str, action_name_raw, cursor_name = [p.strip() for p in parts]
+                    # エスケープされた改行文字(\\n)を実際の改行(\n)に戻す
+                    action_name = action_name_raw.replace('\\n', '\n')
+                    rect_list = ast.literal_eval(coords_def_str)
+
+                    entries.append((number, {
+                        'key': key,
+                        'rects': rect_list,
+                        'action': action_name,
+                        'cursor': cursor_name
+                    }))
+                except (ValueError, SyntaxError, IndexError) as e:
+                    print(f"タッチエリアの解析エラー ({key}): {e}")
+
+        # キーの連番でソートして格納
+        index = {
+            emotion_key: [area for _, area in sorted(entries, key=lambda x: x[0])]
+            for emotion_key, entries in numbered.items()
+        }
+        self._touch_area_index[section] = index
+        return index
+
     def get_touch_areas_for_costume(self, costume_id: str, emotion_id: str) -> list:
         """
         指定された衣装と感情のタッチエリア設定を解析してリストで返します。
         指定された感情に設定がなければ、normal(基本)の設定を返します。
+        戻り値は呼び出し側で自由に変更できるコピーです。
         """
         section = f'COSTUME_DETAIL_{costume_id}'
         if not self.config.has_section(section):
             return []
 
-        # --- 1. 指定された感情専用のキーパターンを定義 ---
-        # 例: emotion_idが"fun"なら、"touch_area_fun_..."にマッチ
-        emotion_specific_pattern = re.compile(f'^touch_area_{re.escape(emotion_id)}_(\\d+)$')
-        
-        # --- 2. 基本となるnormal用のキーパターンを定義 ---
-        # "touch_area_数字" にのみマッチし、"touch_area_fun_数字" などは除外
-        normal_pattern = re.compile(r'^touch_area_(\d+)$')
+        index = self._get_touch_area_index(section)
 
-        def _parse_areas_from_pattern(pattern):
-            areas = []
-            for key, value in self.config.items(section):
-                match = pattern.match(key)
-                if match:
-                    try:
-                        parts = value.rsplit(',', 2)
-                        if len(parts) != 3: continue
-
-                        coords_def_str, action_name_raw, cursor_name = [p.strip() for p in parts]
-                        # エスケープされた改行文字(\\n)を実際の改行(\n)に戻す
-                        action_name = action_name_raw.replace('\\n', '\n')
-                        rect_list = ast.literal_eval(coords_def_str)
-                        
-                        areas.append({
-                            'key': key,
-                            'rects': rect_list,
-                            'action': action_name,
-                            'cursor': cursor_name
-                        })
-                    except (ValueError, SyntaxError, IndexError) as e:
-                        print(f"タッチエリアの解析エラー ({key}): {e}")
-            # キーの連番でソートして返す
-            return sorted(areas, key=lambda x: int(pattern.match(x['key']).group(1)))
-
-        # --- 3. 指定された感情のエリアを探し、なければnormalを探す ---
-        emotion_areas = _parse_areas_from_pattern(emotion_specific_pattern)
+        # 指定された感情のエリアを探し、なければnormalを返す
+        emotion_areas = index.get(emotion_id)
         if emotion_areas:
-            # 専用設定が見つかった場合はそれを返す
-            return emotion_areas
-        
-        # normal自身を要求されているか、フォールバックとしてnormalを返す
-        return _parse_areas_from_pattern(normal_pattern)
+            return copy.deepcopy(emotion_areas)
+        return copy.deepcopy(index.get(None, []))
 
     def get_specific_touch_areas_for_costume(self, costume_id: str, emotion_id: str) -> list | None:
         """
@@ -613,11 +752,8 @@ censor_rects = {censor_rects}
         section = f'COSTUME_DETAIL_{costume_id}'
         if not self.config.has_section(section):
             return None
-        
-        emotion_specific_pattern = re.compile(f'^touch_area_{re.escape(emotion_id)}_(\\d+)$')
-        has_specific_setting = any(emotion_specific_pattern.match(key) for key in self.config.options(section))
 
-        if has_specific_setting:
+        if emotion_id in self._get_touch_area_index(section):
             return self.get_touch_areas_for_costume(costume_id, emotion_id)
         else:
             return None
@@ -626,31 +762,36 @@ censor_rects = {censor_rects}
         """
         指定された感情のタッチエリアリストからiniファイルの設定を更新します。
         """
+        self._ensure_writable()
         section = f'COSTUME_DETAIL_{costume_id}'
         if not self.config.has_section(section):
             return
 
-        # --- 1. 更新対象の感情に対応する既存のtouch_areaをすべて削除 ---
-        key_prefix = f'touch_area_{emotion_id}_' if emotion_id != 'normal' else 'touch_area_'
-        pattern = re.compile(f'^{re.escape(key_prefix)}(\\d+)$')
-        
-        for key in list(self.config.options(section)):
-            if pattern.match(key):
-                self.config.remove_option(section, key)
-        
-        # --- 2. 新しいリストから設定を再構築 ---
-        for i, area in enumerate(areas):
-            new_key = f'{key_prefix}{i+1}'
-            rects_str = str(area['rects'])
-            # 実際の改行(\n)をエスケープされた文字列(\\n)に置換する
-            action_name_escaped = area['action'].replace('\n', '\\n')
-            value = f"{rects_str}, {action_name_escaped}, {area['cursor']}"
-            self.set(section, new_key, value)
+        with self._track_section_changes(section):
+            # --- 1. 更新対象の感情に対応する既存のtouch_areaをすべて削除 ---
+            key_prefix = f'touch_area_{emotion_id}_' if emotion_id != 'normal' else 'touch_area_'
+            pattern = re.compile(f'^{re.escape(key_prefix)}(\\d+)$')
+
+            for key in list(self.config.options(section)):
+                if pattern.match(key):
+                    self.config.remove_option(section, key)
+
+            # --- 2. 新しいリストから設定を再構築 ---
+            for i, area in enumerate(areas):
+                new_key = f'{key_prefix}{i+1}'
+                rects_str = str(area['rects'])
+                # 実際の改行(\n)をエスケープされた文字列(\\n)に置換する
+                action_name_escaped = area['action'].replace('\n', '\\n')
+                value = f"{rects_str}, {action_name_escaped}, {area['cursor']}"
+                self.set(section, new_key, value)
+
+        self._invalidate_touch_area_index(section)
             
     def delete_touch_areas_for_emotion(self, costume_id: str, emotion_id: str):
         """
         指定された感情専用のタッチエリア設定をすべて削除し、normalへの継承状態に戻す。
         """
+        self._ensure_writable()
         section = f'COSTUME_DETAIL_{costume_id}'
         if not self.config.has_section(section) or emotion_id == 'normal':
             return
@@ -661,6 +802,9 @@ censor_rects = {censor_rects}
         for key in list(self.config.options(section)):
             if pattern.match(key):
                 self.config.remove_option(section, key)
+                self._mark_dirty(section)
+
+        self._invalidate_touch_area_index(section)
 
     def get_favorability_stages(self) -> list:
         """
@@ -685,14 +829,16 @@ censor_rects = {censor_rects}
         """
         好感度段階のリストからiniファイルの設定を更新します。
         """
-        # 既存のセクションをクリア
-        if self.config.has_section('FAVORABILITY_STAGES'):
-            self.config.remove_section('FAVORABILITY_STAGES')
-        self.config.add_section('FAVORABILITY_STAGES')
-        
-        # 新しいリストから設定を再構築
-        for stage in stages:
-            self.set('FAVORABILITY_STAGES', str(stage['threshold']), stage['name'])
+        self._ensure_writable()
+        with self._track_section_changes('FAVORABILITY_STAGES'):
+            # 既存のセクションをクリア
+            if self.config.has_section('FAVORABILITY_STAGES'):
+                self.config.remove_section('FAVORABILITY_STAGES')
+            self.config.add_section('FAVORABILITY_STAGES')
+
+            # 新しいリストから設定を再構築
+            for stage in stages:
+                self.set('FAVORABILITY_STAGES', str(stage['threshold']), stage['name'])
 
     def get_favorability_hearts(self) -> list:
         """
@@ -716,12 +862,14 @@ censor_rects = {censor_rects}
         """
         ハート設定のリストからiniファイルの設定を更新します。
         """
-        if self.config.has_section('FAVORABILITY_HEARTS'):
-            self.config.remove_section('FAVORABILITY_HEARTS')
-        self.config.add_section('FAVORABILITY_HEARTS')
-        
-        for heart in hearts:
-            self.set('FAVORABILITY_HEARTS', str(heart['threshold']), heart['filename'])
+        self._ensure_writable()
+        with self._track_section_changes('FAVORABILITY_HEARTS'):
+            if self.config.has_section('FAVORABILITY_HEARTS'):
+                self.config.remove_section('FAVORABILITY_HEARTS')
+            self.config.add_section('FAVORABILITY_HEARTS')
+
+            for heart in hearts:
+                self.set('FAVORABILITY_HEARTS', str(heart['threshold']), heart['filename'])
 
     def get_heart_ui_colors(self) -> dict:
         """
@@ -740,8 +888,10 @@ censor_rects = {censor_rects}
         """
         [HEART_UI]セクションの色設定と透過モードを更新します。
         """
+        self._ensure_writable()
         if not self.config.has_section('HEART_UI'):
             self.config.add_section('HEART_UI')
+            self._mark_dirty('HEART_UI')
             
         self.set('HEART_UI', 'TRANSPARENCY_MODE', mode)
         self.set('HEART_UI', 'TRANSPARENT_COLOR', trans_color)
@@ -749,8 +899,10 @@ censor_rects = {censor_rects}
 
     def remove_voice_param(self, expression_id: str):
         """指定された表情IDの音声パラメータをiniから削除します。"""
+        self._ensure_writable()
         if self.config.has_option('VOICE_PARAMS', expression_id):
             self.config.remove_option('VOICE_PARAMS', expression_id)
+            self._mark_dirty('VOICE_PARAMS')
             print(f"音声パラメータ '{expression_id}' を削除しました。")
 
     def get_voice_param(self, expression_id: str, fallback: dict = None) -> dict:
@@ -779,6 +931,7 @@ censor_rects = {censor_rects}
 
     def save_readme_content(self, content: str):
         """readme.txtに内容を書き込む。"""
+        self._ensure_writable()
         with open(self.readme_path, 'w', encoding='utf-8') as f:
             f.write(content)
 
@@ -829,55 +982,43 @@ censor_rects = {censor_rects}
         """
         eventsフォルダ内のすべてのイベントID（ファイル名から拡張子を除いたもの）のリストを返す。
         """
-        if not os.path.isdir(self.events_dir):
-            return []
-        return sorted([
-            os.path.splitext(f)[0] for f in os.listdir(self.events_dir)
-            if f.endswith('.json')
-        ])
+        return self.event_store.get_event_ids()
 
     def load_event(self, event_id: str) -> dict | None:
         """
         指定されたイベントIDのJSONファイルを読み込み、辞書として返す。
+        ファイルが変更されていなければキャッシュ済みの内容（のコピー）を返す。
         """
-        event_path = os.path.join(self.events_dir, f"{event_id}.json")
-        if not os.path.exists(event_path):
-            return None
-        try:
-            with open(event_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"イベントファイル '{event_path}' の読み込みに失敗しました: {e}")
-            return None
+        return self.event_store.load(event_id)
 
     def save_event(self, event_id: str, event_data: dict):
         """
-        イベントデータを指定されたIDのJSONファイルとして保存する。
+        イベントデータを指定されたIDのJSONファイルとして保存する。内容が変わっていなければ書き込まない。
         """
-        event_path = os.path.join(self.events_dir, f"{event_id}.json")
-        try:
-            with open(event_path, 'w', encoding='utf-8') as f:
-                json.dump(event_data, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print(f"イベントファイル '{event_path}' の保存に失敗しました: {e}")
-            raise # エラーを呼び出し元に伝える
+        self._ensure_writable()
+        self.event_store.save(event_id, event_data)
 
     def delete_event(self, event_id: str):
         """
         指定されたイベントIDのJSONファイルを削除する。
         """
-        event_path = os.path.join(self.events_dir, f"{event_id}.json")
-        if os.path.exists(event_path):
-            os.remove(event_path)
+        self._ensure_writable()
+        self.event_store.delete(event_id)
 
     def rename_event(self, old_event_id: str, new_event_id: str):
         """
         イベントID（ファイル名）を変更する。
         """
-        old_path = os.path.join(self.events_dir, f"{old_event_id}.json")
-        new_path = os.path.join(self.events_dir, f"{new_event_id}.json")
-        if os.path.exists(old_path) and not os.path.exists(new_path):
-            os.rename(old_path, new_path)
+        self._ensure_writable()
+        self.event_store.rename(old_event_id, new_event_id)
+
+    def get_event_dependents(self, event_id: str) -> list[str]:
+        """指定したイベントの完了を条件にしているイベントIDのリストを返す。"""
+        return self.event_store.get_dependents(event_id)
+
+    def get_flag_usage(self, flag: str) -> dict:
+        """指定したフラグを参照・設定しているイベントIDを返す。"""
+        return self.event_store.get_flag_usage(flag)
 
     def get_special_topics(self) -> list[str]:
         """topics.txtを読み込み、話題のリストを返す。"""
@@ -894,6 +1035,7 @@ censor_rects = {censor_rects}
 
     def update_special_topics(self, topics: list[str]):
         """専用話題のリストをtopics.txtに上書き保存する。"""
+        self._ensure_writable()
         try:
             with open(self.topics_character_path, 'w', encoding='utf-8') as f:
                 # 各話題を改行で区切って書き込む
@@ -6,11 +6,33 @@ import zipfile
 import json
 import os
 import shutil
+import stat
+import hashlib
+import tempfile
+import time
+from .hash_cache import FileHashCache
 
 class CharacterInstaller:
     """
     キャラクターZIPファイルを解析し、charactersフォルダにインストールするクラス。
+
+    ZIPの中身はインストール先の隣に作る一時フォルダへ1エントリずつ展開し、
+    signature.json のマニフェストとハッシュを照合しながら書き込む。
+    すべての検証が通ってから既存フォルダと入れ替えるため、失敗・中断しても既存のキャラクターは壊れない。
     """
+    # 展開前の検証で使う上限値（1つのZIPあたり）
+    MAX_ENTRY_COUNT = 50000
+    MAX_TOTAL_UNCOMPRESSED_BYTES = 1024 * 1024 * 1024 # 1GB
+    MAX_COMPRESSION_RATIO = 100
+    # 圧縮率のチェックを行う最小サイズ（小さなテキストは極端に縮むことがあるため除外）
+    COMPRESSION_RATIO_MIN_BYTES = 1024 * 1024
+    # 展開時の読み込み単位
+    STREAM_CHUNK_SIZE = 1024 * 1024
+    # マニフェストに含まれないファイル
+    SIGNATURE_FILENAME = 'signature.json'
+    # インストールした全パーツのマニフェストをまとめたもの（差分更新で削除するファイルの判定に使う）
+    INSTALL_MANIFEST_FILENAME = '.install_manifest.json'
+
     def __init__(self, parent: tk.Tk, characters_dir: str):
         self.parent = parent
         self.characters_dir = characters_dir
@@ -44,38 +66,328 @@ class CharacterInstaller:
         except Exception as e:
             messagebox.showerror("予期せぬエラー", f"インストール中に予期せぬエラーが発生しました:\n{e}", parent=self.parent)
 
-    def _prepare_target_directory(self, character_id: str) -> str | None:
+    def _confirm_overwrite(self, character_id: str) -> bool:
         """
-        インストール先のディレクトリを準備する。
-        既存の場合は上書き確認を行い、ユーザーがキャンセルした場合はNoneを返す。
+        インストール先が既に存在する場合は上書き確認を行う。
+        この時点では既存のフォルダには一切触れない（入れ替えは展開と検証が終わってから行う）。
         """
         target_path = os.path.join(self.characters_dir, character_id)
         if os.path.exists(target_path):
-            if not messagebox.askyesno("上書き確認", 
+            return messagebox.askyesno("上書き確認", 
                 f"キャラクター '{character_id}' は既に存在します。\n"
                 "上書きしてよろしいですか？ (既存のデータは完全に削除されます)",
-                parent=self.parent):
-                return None # ユーザーがキャンセル
-            
-            print(f"既存のフォルダを削除します: {target_path}")
-            shutil.rmtree(target_path)
-        
-        os.makedirs(target_path)
-        return target_path
+                parent=self.parent)
+        return True
+
+    @staticmethod
+    def _validate_character_id(character_id) -> str:
+        """package_info.json の character_id がフォルダ名として安全か確認する。"""
+        if (not isinstance(character_id, str) or not character_id.strip() or character_id in ('.', '..')
+                or any(c in character_id for c in '\\/:*?"<>|')):
+            raise ValueError(f"package_info.json のキャラクターIDが不正です: {character_id!r}")
+        return character_id
+
+    def _create_staging_dir(self, character_id: str) -> str:
+        """インストール先と同じフォルダ内に展開用の一時フォルダを作る（入れ替えを os.replace で行うため）。"""
+        os.makedirs(self.characters_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix=f".{character_id}.installing.", dir=self.characters_dir)
+
+    def _read_manifest(self, zip_file: zipfile.ZipFile) -> dict | None:
+        """signature.json のファイルマニフェストを返す。署名ファイルが無い場合はNone。"""
+        if self.SIGNATURE_FILENAME not in zip_file.namelist():
+            return None
+        with zip_file.open(self.SIGNATURE_FILENAME) as f:
+            signature_data = json.load(f)
+        manifest = signature_data.get('file_manifest')
+        if not isinstance(manifest, dict):
+            raise ValueError("signature.json にファイルマニフェストがありません。")
+        return manifest
+
+    def _safe_member_path(self, dest_dir: str, member_name: str) -> str:
+        """ZIP内のパスを展開先のパスに変換する。展開先の外を指すパスは拒否する。"""
+        name = member_name.replace('\\', '/')
+        parts = [p for p in name.split('/') if p not in ('', '.')]
+        if name.startswith('/') or '..' in parts or (parts and ':' in parts[0]):
+            raise ValueError(f"不正なパスを含むZIPです: {member_name}")
+        dest_root = os.path.realpath(dest_dir)
+        target = os.path.realpath(os.path.join(dest_root, *parts))
+        if target != dest_root and not target.startswith(dest_root + os.sep):
+            raise ValueError(f"不正なパスを含むZIPです: {member_name}")
+        return target
+
+    def _validate_entries(self, zip_file: zipfile.ZipFile, manifest: dict | None) -> list[zipfile.ZipInfo]:
+        """
+        展開を始める前に、ZIPの目次（宣言されたサイズ）だけで検査できる項目を確認する。
+        パストラバーサル、シンボリックリンク、エントリ数、合計サイズ、圧縮率、マニフェストとの対応。
+        """
+        infos = zip_file.infolist()
+        if len(infos) > self.MAX_ENTRY_COUNT:
+            raise ValueError(f"ZIP内のファイル数が多すぎます ({len(infos)}件)。")
+
+        total_size = 0
+        file_names = set()
+        for info in infos:
+            self._safe_member_path(os.curdir, info.filename)
+            if stat.S_ISLNK(info.external_attr >> 16):
+                raise ValueError(f"シンボリックリンクを含むZIPはインストールできません: {info.filename}")
+            if info.is_dir():
+                continue
+            total_size += info.file_size
+            if info.file_size >= self.COMPRESSION_RATIO_MIN_BYTES and info.file_size > info.compress_size * self.MAX_COMPRESSION_RATIO:
+                raise ValueError(f"圧縮率が異常なファイルを含むため、インストールを中止しました: {info.filename}")
+            file_names.add(info.filename)
+
+        if total_size > self.MAX_TOTAL_UNCOMPRESSED_BYTES:
+            raise ValueError(f"展開後のサイズが大きすぎます ({total_size / 1024**2:.0f}MB)。")
+
+        if manifest is not None:
+            unexpected = file_names - set(manifest) - {self.SIGNATURE_FILENAME}
+            missing = set(manifest) - file_names
+            if unexpected:
+                raise ValueError(f"署名に含まれないファイルがZIPに含まれています: {', '.join(sorted(unexpected)[:5])}")
+            if missing:
+                raise ValueError(f"署名に記載されたファイルがZIPにありません: {', '.join(sorted(missing)[:5])}")
+        return infos
+
+    def _extract_verified(self, zip_file: zipfile.ZipFile, dest_dir: str, manifest: dict | None = None, only: set | None = None):
+        """
+        ZIPのエントリを1つずつ dest_dir へ展開する。書き込みと同時にSHA256を計算してマニフェストと照合し、
+        宣言されたサイズを超えるデータが出てきた時点で中止する（展開後にもう一度読み直す必要はない）。
+        only を指定した場合は、そのパスのファイルだけを展開する。
+
+        Raises:
+            ValueError: 検証に失敗した場合（展開途中のファイルは dest_dir に残るため、呼び出し側で破棄すること）。
+        """
+        for info in self._validate_entries(zip_file, manifest):
+            target = self._safe_member_path(dest_dir, info.filename)
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            if only is not None and info.filename not in only:
+                continue
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            sha256 = hashlib.sha256()
+            written = 0
+            with zip_file.open(info) as src, open(target, 'wb') as dest:
+                for chunk in iter(lambda: src.read(self.STREAM_CHUNK_SIZE), b""):
+                    written += len(chunk)
+                    if written > info.file_size:
+                        raise ValueError(f"宣言されたサイズを超えるデータを含むため、インストールを中止しました: {info.filename}")
+                    sha256.update(chunk)
+                    dest.write(chunk)
+            if written != info.file_size:
+                raise ValueError(f"ファイルサイズが一致しません: {info.filename}")
+
+            if manifest is not None and info.filename != self.SIGNATURE_FILENAME:
+                if sha256.hexdigest() != manifest.get(info.filename):
+                    raise ValueError(f"ファイルのハッシュが署名と一致しません (改ざんまたは破損): {info.filename}")
+
+    def _confirm_unsigned(self, zip_file: zipfile.ZipFile) -> dict | None:
+        """
+        マニフェストを読み込む。署名ファイルが無い古いパッケージの場合は、検証なしで続けるか確認する。
+
+        Raises:
+            InterruptedError: ユーザーが中止を選んだ場合。
+        """
+        manifest = self._read_manifest(zip_file)
+        if manifest is None and not messagebox.askyesno("確認",
+                "このZIPには署名ファイル(signature.json)が含まれていないため、内容を検証できません。\n"
+                "インストールを続けますか？", parent=self.parent):
+            raise InterruptedError("署名の無いパッケージのため、インストールを中止しました。")
+        return manifest
+
+    @staticmethod
+    def _merge_tree(src_dir: str, dest_dir: str):
+        """src_dir の中身を dest_dir へ移動して統合する（同じドライブ内なのでコピーは発生しない）。"""
+        for dirpath, dirnames, filenames in os.walk(src_dir):
+            rel = os.path.relpath(dirpath, src_dir)
+            target_dir = os.path.join(dest_dir, rel) if rel != os.curdir else dest_dir
+            os.makedirs(target_dir, exist_ok=True)
+            for filename in filenames:
+                os.replace(os.path.join(dirpath, filename), os.path.join(target_dir, filename))
+
+    def _swap_into_place(self, staging_dir: str, character_id: str):
+        """
+        展開済みの一時フォルダを正式なフォルダと入れ替える。
+        既存フォルダは一度退避し、入れ替えに失敗した場合は元に戻す。
+        """
+        target_path = os.path.join(self.characters_dir, character_id)
+        backup_path = None
+        if os.path.exists(target_path):
+            backup_path = os.path.join(self.characters_dir, f".{character_id}.backup.{time.strftime('%Y%m%d%H%M%S')}")
+            os.replace(target_path, backup_path)
+        try:
+            os.replace(staging_dir, target_path)
+        except OSError:
+            if backup_path:
+                os.replace(backup_path, target_path)
+            raise
+        if backup_path:
+            print(f"既存のフォルダを削除します: {backup_path}")
+            shutil.rmtree(backup_path, ignore_errors=True)
+
+    def _choose_install_mode(self, character_id: str, manifest: dict | None) -> bool | None:
+        """
+        既にインストール済みの場合に、差分更新するか（True）すべて置き換えるか（False）を確認する。中止した場合はNone。
+        差分更新は署名付き（マニフェストのある）パッケージだけで選べる。
+        """
+        target_path = os.path.join(self.characters_dir, character_id)
+        if os.path.isdir(target_path) and manifest is not None:
+            return messagebox.askyesnocancel("更新方法の選択",
+                f"キャラクター '{character_id}' は既に存在します。\n\n"
+                "「はい」: 差分更新 (変更されたファイルだけを更新し、追加したファイルなどは残します)\n"
+                "「いいえ」: すべて置き換え (既存のデータは完全に削除されます)",
+                parent=self.parent)
+        return False if self._confirm_overwrite(character_id) else None
 
     def _install_complete(self, zip_file: zipfile.ZipFile, package_info: dict):
         """単独のZIPファイルをインストールする"""
-        character_id = package_info['character_id']
+        character_id = self._validate_character_id(package_info['character_id'])
         print(f"単独パッケージ '{character_id}' のインストールを開始します。")
 
-        target_path = self._prepare_target_directory(character_id)
-        if target_path is None:
+        try:
+            manifest = self._confirm_unsigned(zip_file)
+        except InterruptedError:
+            messagebox.showinfo("中止", "インストールを中止しました。", parent=self.parent)
+            return
+
+        update = self._choose_install_mode(character_id, manifest)
+        if update is None:
             messagebox.showinfo("中止", "インストールを中止しました。", parent=self.parent)
             return
+        if update:
+            self._update_installed(zip_file, manifest, character_id)
+            return
 
-        zip_file.extractall(path=target_path)
+        staging_dir = self._create_staging_dir(character_id)
+        try:
+            self._extract_verified(zip_file, staging_dir, manifest)
+            if manifest is not None:
+                self._write_install_manifest(staging_dir, manifest)
+            self._swap_into_place(staging_dir, character_id)
+        finally:
+            # 入れ替えが済んでいれば一時フォルダは既に無い
+            if os.path.exists(staging_dir):
+                shutil.rmtree(staging_dir, ignore_errors=True)
         messagebox.showinfo("成功", f"キャラクター '{character_id}' のインストールが完了しました。", parent=self.parent)
 
+    def _plan_delta_update(self, zip_file: zipfile.ZipFile, manifest: dict, character_id: str) -> tuple[list[str], list[str]]:
+        """
+        単独のZIPについて、(展開が必要なファイル, 削除するファイル) を返す。
+
+        Raises:
+            ValueError: ZIPの目次の検証に失敗した場合（マニフェストのファイルがZIPに無い場合を含む）。
+        """
+        hash_cache = self._open_hash_cache(character_id)
+        changed = self._plan_changed_files(zip_file, manifest, character_id, hash_cache)
+        hash_cache.save()
+        return changed, self._plan_removed_files(manifest, character_id)
+
+    def _open_hash_cache(self, character_id: str) -> FileHashCache:
+        """インストール済みファイルのハッシュのキャッシュ。次回の差分更新で再利用する。"""
+        return FileHashCache(os.path.join(self.characters_dir, '.cache', 'hashes', f"{character_id}.json"))
+
+    def _plan_changed_files(self, zip_file: zipfile.ZipFile, manifest: dict, character_id: str, hash_cache: FileHashCache) -> list[str]:
+        """
+        インストール済みのファイルとZIP（1パーツ分）のマニフェストを比較し、展開が必要なファイルを返す。
+        サイズが違うファイルはハッシュを計算せずに変更ありとみなす。
+
+        Raises:
+            ValueError: ZIPの目次の検証に失敗した場合（マニフェストのファイルがZIPに無い場合を含む）。
+        """
+        # 先にZIPの目次を検証し、マニフェストの全ファイルがZIPに揃っていることを確かめてから比較する
+        zip_sizes = {info.filename: info.file_size for info in self._validate_entries(zip_file, manifest) if not info.is_dir()}
+        target_path = os.path.join(self.characters_dir, character_id)
+        changed = []
+        same_size = {}
+        for name in manifest:
+            installed_path = self._safe_member_path(target_path, name)
+            if not os.path.isfile(installed_path) or os.path.getsize(installed_path) != zip_sizes[name]:
+                changed.append(name)
+            else:
+                same_size[name] = installed_path
+
+        installed_hashes = hash_cache.get_hashes(same_size)
+        changed.extend(name for name, digest in installed_hashes.items() if digest != manifest[name])
+        return sorted(changed)
+
+    def _plan_removed_files(self, manifest: dict, character_id: str) -> list[str]:
+        """
+        前回インストールした全パーツのマニフェストに載っていて、新しいマニフェスト（分割パッケージでは全パーツ分）に
+        無いファイルを返す。ユーザーが追加したファイルは前回のマニフェストに無いため残る。
+        """
+        target_path = os.path.join(self.characters_dir, character_id)
+        removed = []
+        for name in self._read_installed_manifest(target_path):
+            if name not in manifest and name != self.SIGNATURE_FILENAME:
+                installed_path = self._safe_member_path(target_path, name)
+                if os.path.isfile(installed_path):
+                    removed.append(name)
+        return sorted(removed)
+
+    def _read_installed_manifest(self, target_path: str) -> dict:
+        """
+        インストール済みのファイルのマニフェストを返す。
+        .install_manifest.json が無い（以前のバージョンでインストールした）場合は signature.json で代用する。
+        """
+        for filename in (self.INSTALL_MANIFEST_FILENAME, self.SIGNATURE_FILENAME):
+            try:
+                with open(os.path.join(target_path, filename), 'r', encoding='utf-8') as f:
+                    manifest = json.load(f).get('file_manifest')
+            except (OSError, ValueError, AttributeError):
+                continue
+            if isinstance(manifest, dict):
+                return manifest
+        return {}
+
+    def _write_install_manifest(self, dest_dir: str, manifest: dict):
+        """全パーツ分のマニフェストを一時ファイル経由で書き出す。"""
+        fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix=self.INSTALL_MANIFEST_FILENAME, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'file_manifest': manifest}, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(temp_path, os.path.join(dest_dir, self.INSTALL_MANIFEST_FILENAME))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _apply_delta_update(self, staging_dir: str, character_id: str, removed: list[str], manifest: dict):
+        """一時フォルダに展開した変更ファイルをインストール先へ移し、削除されたファイルを片付ける。"""
+        target_path = os.path.join(self.characters_dir, character_id)
+        self._merge_tree(staging_dir, target_path)
+
+        for name in removed:
+            installed_path = self._safe_member_path(target_path, name)
+            os.remove(installed_path)
+            # 空になったフォルダも片付ける
+            parent_dir = os.path.dirname(installed_path)
+            while parent_dir != target_path and not os.listdir(parent_dir):
+                os.rmdir(parent_dir)
+                parent_dir = os.path.dirname(parent_dir)
+        self._write_install_manifest(target_path, manifest)
+
+    def _update_installed(self, zip_file: zipfile.ZipFile, manifest: dict, character_id: str):
+        """
+        インストール済みのキャラクターを差分更新する。
+        変更されたファイルは一時フォルダへ検証しながら展開し、すべて揃ってから1ファイルずつ os.replace で置き換える。
+        """
+        changed, removed = self._plan_delta_update(zip_file, manifest, character_id)
+        print(f"差分更新: 変更 {len(changed)}件 / 削除 {len(removed)}件 / 変更なし {len(manifest) - len(changed)}件")
+
+        staging_dir = self._create_staging_dir(character_id)
+        try:
+            # signature.json もパッケージのものに揃えておく
+            self._extract_verified(zip_file, staging_dir, manifest, only=set(changed) | {self.SIGNATURE_FILENAME})
+            self._apply_delta_update(staging_dir, character_id, removed, manifest)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        messagebox.showinfo("成功",
+            f"キャラクター '{character_id}' を更新しました。\n\n"
+            f"更新: {len(changed)}件 / 削除: {len(removed)}件", parent=self.parent)
+
     def _handle_split_package(self, zip_file: zipfile.ZipFile, package_info: dict, initial_dir: str):
         """分割ZIPファイルを処理する"""
         role = package_info.get('package_role')
@@ -91,20 +403,52 @@ class CharacterInstaller:
         else:
             raise ValueError(f"不明なパッケージロールです: {role}")
 
+    @staticmethod
+    def _describe_part(part_name: str, part_contents: dict) -> str:
+        """パーツ名を、含まれるフォルダ名を添えた表示用の文字列にする。"""
+        contents = part_contents.get(part_name)
+        if contents and contents != [part_name]:
+            return f"'{part_name}' ({', '.join(contents)})"
+        return f"'{part_name}'"
+
     def _install_split_parent(self, zip_file: zipfile.ZipFile, package_info: dict, initial_dir: str):
-        """分割ZIPの親ファイルをインストールし、続けて子ファイルのインストールを順不同で受け付ける"""
-        character_id = package_info['character_id']
+        """
+        分割ZIPの親ファイルをインストールし、続けて子ファイルのインストールを順不同で受け付ける。
+        差分更新では各パーツから変更されたファイルだけを展開し、全パーツのマニフェストを合わせたものと
+        前回のインストール内容を比べて、削除されたファイルを片付ける。
+        """
+        character_id = self._validate_character_id(package_info['character_id'])
         required_child_parts = package_info.get('child_parts', [])
+        # 各パーツに含まれるフォルダの一覧（古い形式のパッケージには無い）
+        part_contents = package_info.get('part_contents', {})
         
         print(f"分割パッケージ(親) '{character_id}' のインストールを開始します。")
-        target_path = self._prepare_target_directory(character_id)
-        if target_path is None:
+        try:
+            parent_manifest = self._confirm_unsigned(zip_file)
+        except InterruptedError:
             messagebox.showinfo("中止", "インストールを中止しました。", parent=self.parent)
             return
+        update = self._choose_install_mode(character_id, parent_manifest)
+        if update is None:
+            messagebox.showinfo("中止", "インストールを中止しました。", parent=self.parent)
+            return
+
+        # 全パーツのマニフェスト（署名の無いパーツがあればNone）
+        combined_manifest = dict(parent_manifest) if parent_manifest is not None else None
+        hash_cache = self._open_hash_cache(character_id) if update else None
+        changed_count = 0
+        removed = []
 
+        # すべてのパーツを一時フォルダに展開し終えてから、既存フォルダと入れ替える（差分更新では変更分だけを移す）
+        staging_dir = self._create_staging_dir(character_id)
         try:
-            # まず親ファイルの内容を解凍
-            zip_file.extractall(path=target_path)
+            # まず親ファイルの内容を検証しながら展開
+            if update:
+                changed = self._plan_changed_files(zip_file, parent_manifest, character_id, hash_cache)
+                changed_count += len(changed)
+                self._extract_verified(zip_file, staging_dir, parent_manifest, only=set(changed) | {self.SIGNATURE_FILENAME})
+            else:
+                self._extract_verified(zip_file, staging_dir, parent_manifest)
             print(f"親ファイル '{character_id}' を解凍しました。")
 
             # インストール済みの子パーツ名を記録するセット
@@ -112,11 +456,12 @@ class CharacterInstaller:
             
             # 全ての子パーツがインストールされるまでループ
             while len(installed_parts) < len(required_child_parts):
-                remaining_parts = set(required_child_parts) - installed_parts
+                remaining_parts = [p for p in required_child_parts if p not in installed_parts]
+                remaining_text = ', '.join(self._describe_part(p, part_contents) for p in remaining_parts)
                 
                 # ファイル選択ダイアログを表示
                 child_zip_path = filedialog.askopenfilename(
-                    title=f"子ファイルを選択してください (残り: {', '.join(remaining_parts)})",
+                    title=f"子ファイルを選択してください (残り: {remaining_text})",
                     initialdir=initial_dir,
                     filetypes=[("ZIP files", "*.zip")],
                     parent=self.parent
@@ -154,11 +499,37 @@ class CharacterInstaller:
                             messagebox.showinfo("情報", f"パーツ '{part_name}' は既にインストール済みです。\n別のファイルを選択してください。", parent=self.parent)
                             continue
 
-                        # --- 検証OKなら解凍 ---
-                        child_zip.extractall(path=target_path)
+                        if update and self._read_manifest(child_zip) is None:
+                            messagebox.showwarning("検証エラー", "差分更新には署名(signature.json)付きの子ファイルが必要です。\n別のファイルを選択してください。", parent=self.parent)
+                            continue
+
+                        # --- 検証OKなら、子ファイル専用の一時フォルダに展開してから統合 ---
+                        # (子ファイルの検証に失敗しても、展開済みの他のパーツを汚さないため)
+                        child_manifest = self._confirm_unsigned(child_zip)
+                        child_staging_dir = tempfile.mkdtemp(prefix=f".{character_id}.part.", dir=self.characters_dir)
+                        try:
+                            changed = self._plan_changed_files(child_zip, child_manifest, character_id, hash_cache) if update else None
+                            self._extract_verified(child_zip, child_staging_dir, child_manifest, only=set(changed) if update else None)
+                        except ValueError as e:
+                            messagebox.showwarning("検証エラー", f"子ファイルの検証に失敗しました。\n\n詳細: {e}\n\n別のファイルを選択してください。", parent=self.parent)
+                            continue
+                        else:
+                            # 子ファイルの signature.json で親のものを上書きしない（全パーツ分は .install_manifest.json に書く）
+                            child_signature_path = os.path.join(child_staging_dir, self.SIGNATURE_FILENAME)
+                            if os.path.exists(child_signature_path):
+                                os.remove(child_signature_path)
+                            self._merge_tree(child_staging_dir, staging_dir)
+                        finally:
+                            shutil.rmtree(child_staging_dir, ignore_errors=True)
+                        if update:
+                            changed_count += len(changed)
+                        if combined_manifest is not None and child_manifest is not None:
+                            combined_manifest.update(child_manifest)
+                        else:
+                            combined_manifest = None
                         installed_parts.add(part_name)
                         print(f"子ファイル '{part_name}' を解凍しました。")
-                        messagebox.showinfo("成功", f"パーツ '{part_name}' を正常にインストールしました。", parent=self.parent)
+                        messagebox.showinfo("成功", f"パーツ {self._describe_part(part_name, part_contents)} を正常にインストールしました。", parent=self.parent)
 
                 except zipfile.BadZipFile:
                     messagebox.showwarning("ファイルエラー", "選択されたZIPファイルが破損しています。\n別のファイルを選択してください。", parent=self.parent)
@@ -167,11 +538,29 @@ class CharacterInstaller:
                     messagebox.showwarning("ファイルエラー", "選択されたZIPファイルの package_info.json が不正です。\n別のファイルを選択してください。", parent=self.parent)
                     continue
 
+            if update:
+                # 全パーツが揃ったら、変更されたファイルだけを既存フォルダへ移す
+                removed = self._plan_removed_files(combined_manifest, character_id)
+                print(f"差分更新: 変更 {changed_count}件 / 削除 {len(removed)}件 / 変更なし {len(combined_manifest) - changed_count}件")
+                self._apply_delta_update(staging_dir, character_id, removed, combined_manifest)
+                hash_cache.save()
+            else:
+                # 全パーツが揃ったら既存フォルダと入れ替える
+                if combined_manifest is not None:
+                    self._write_install_manifest(staging_dir, combined_manifest)
+                self._swap_into_place(staging_dir, character_id)
+
         except (Exception, InterruptedError) as e:
-            # エラーや中断が発生した場合、中途半端なインストールにならないようフォルダを削除
-            if os.path.exists(target_path):
-                shutil.rmtree(target_path)
+            # エラーや中断が発生した場合は一時フォルダを破棄するだけで、既存のフォルダには触れていない
             messagebox.showerror("インストール中断", f"処理が中断されたため、インストールを取り消しました。\n\n詳細: {e}", parent=self.parent)
             return
+        finally:
+            if os.path.exists(staging_dir):
+                shutil.rmtree(staging_dir, ignore_errors=True)
         
+        if update:
+            messagebox.showinfo("成功",
+                f"キャラクター '{character_id}' (分割)を更新しました。\n\n"
+                f"更新: {changed_count}件 / 削除: {len(removed)}件", parent=self.parent)
+            return
         messagebox.showinfo("成功", f"キャラクター '{character_id}' (分割)のインストールが完了しました。", parent=self.parent)
\ No newline at end of file
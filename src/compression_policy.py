@@ -0,0 +1,94 @@
+# src/compression_policy.py
+
+import os
+import time
+import zipfile
+import zlib
+
+
+class CompressionPolicy:
+    """
+    ZIPのエントリごとに圧縮方式を決めるクラス。
+
+    PNG/JPEG/GIFなど既に圧縮されている形式はDeflateしても数%も小さくならずCPU時間だけを使うため、
+    無圧縮(ZIP_STORED)で格納する。character.ini や events/*.json などのテキストは高い圧縮レベルでDeflateする。
+    どちらにも当てはまらない形式は、probe=True なら先頭部分を試しに圧縮して、縮まなければ無圧縮にする。
+    """
+    MODE_AUTO = 'auto'
+    MODE_EXTENSION = 'extension'
+    # 以前と同じく、すべてを標準レベルでDeflateする（比較用）
+    MODE_DEFLATE_ALL = 'deflate'
+    MODES = (MODE_AUTO, MODE_EXTENSION, MODE_DEFLATE_ALL)
+
+    STORE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.zip', '.ogg', '.mp3'}
+    TEXT_EXTENSIONS = {'.ini', '.json', '.txt', '.md', '.csv'}
+    TEXT_LEVEL = 9
+    DEFAULT_LEVEL = 6
+    # 試し圧縮に使う先頭部分のサイズと、無圧縮にする圧縮率のしきい値
+    PROBE_BYTES = 64 * 1024
+    PROBE_STORE_RATIO = 0.95
+    # これより小さいファイルは試さずにDeflateする（ヘッダーの方が大きいため判断できない）
+    PROBE_MIN_BYTES = 512
+
+    def __init__(self, mode: str = MODE_AUTO):
+        if mode not in self.MODES:
+            raise ValueError(f"不明な圧縮ポリシー: {mode} ({', '.join(self.MODES)} のいずれかを指定してください)")
+        self.mode = mode
+
+    def choose(self, arcname: str, src_path: str | None = None) -> tuple[int, int | None]:
+        """エントリの (圧縮方式, 圧縮レベル) を返す。"""
+        if self.mode == self.MODE_DEFLATE_ALL:
+            return zipfile.ZIP_DEFLATED, self.DEFAULT_LEVEL
+
+        ext = os.path.splitext(arcname)[1].lower()
+        if ext in self.STORE_EXTENSIONS:
+            return zipfile.ZIP_STORED, None
+        if ext in self.TEXT_EXTENSIONS:
+            return zipfile.ZIP_DEFLATED, self.TEXT_LEVEL
+        if self.mode == self.MODE_AUTO and src_path and self._is_incompressible(src_path):
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, self.DEFAULT_LEVEL
+
+    def _is_incompressible(self, src_path: str) -> bool:
+        try:
+            with open(src_path, 'rb') as f:
+                sample = f.read(self.PROBE_BYTES)
+        except OSError:
+            return False
+        if len(sample) < self.PROBE_MIN_BYTES:
+            return False
+        # 判定には最速のレベルで十分
+        return len(zlib.compress(sample, 1)) >= len(sample) * self.PROBE_STORE_RATIO
+
+    def zip_info(self, src_path: str, arcname: str, date_time: tuple | None = None) -> zipfile.ZipInfo:
+        """
+        ファイルの ZipInfo を、このポリシーの圧縮方式を設定して作る（ZipFile.open(zinfo, 'w') 用）。
+        date_time を指定すると、更新日時と属性をファイルに依存しない固定値にする（再現可能なビルド用）。
+        """
+        if date_time is not None:
+            zinfo = zipfile.ZipInfo(arcname, date_time)
+            zinfo.file_size = os.path.getsize(src_path)
+            zinfo.external_attr = 0o644 << 16
+            # 作成したOSによって変わらないよう、UNIX形式の属性に揃える
+            zinfo.create_system = 3
+        else:
+            zinfo = zipfile.ZipInfo.from_file(src_path, arcname)
+        compress_type, level = self.choose(arcname, src_path)
+        zinfo.compress_type = compress_type
+        # ZipFile.open(zinfo, 'w') は ZipInfo の圧縮レベルを使う（ZipFile.write の compresslevel 引数と同じもの）。
+        # Python 3.13 で公開の属性 compress_level になったため、あればそちらを使う
+        if hasattr(zinfo, 'compress_level'):
+            zinfo.compress_level = level
+        else:
+            zinfo._compresslevel = level
+        return zinfo
+
+    def writestr(self, zf: zipfile.ZipFile, arcname: str, data: bytes | str, date_time: tuple | None = None):
+        """メモリ上のデータをこのポリシーで書き込む。date_time を省略した場合は現在時刻になる。"""
+        compress_type, level = self.choose(arcname)
+        zinfo = zipfile.ZipInfo(arcname, date_time or time.localtime(time.time())[:6])
+        zinfo.compress_type = compress_type
+        zinfo.external_attr = 0o644 << 16
+        if date_time is not None:
+            zinfo.create_system = 3
+        zf.writestr(zinfo, data, compresslevel=level)
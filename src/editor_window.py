@@ -7,7 +7,6 @@ from tkinterdnd2 import DND_FILES, TkinterDnD
 from PIL import Image, ImageTk
 import os
 import threading
-import requests
 import platform
 if platform.system() == "Windows":
     import winsound
@@ -17,6 +16,8 @@ import subprocess
 
 from .character_data import CharacterData
 from .github_uploader import GithubUploader
+from .image_cache import PreviewImageCache
+from .transparency import TransparencyAnalyzer
 from .settings_window import SettingsWindow 
 from .tabs.tab_basic_settings import TabBasicSettings
 from .tabs.tab_sharing_settings import TabSharingSettings
@@ -52,8 +53,24 @@ class EditorWindow(EditorDNDWindow):
             self.original_pil_image = None
             self.display_tk_image = None
             self.current_preview_filepath = None # プレビュー中の画像のパスを保持
+            # 読み込み済み画像と縮小版のキャッシュ（衣装の切り替えなどで再デコードしないため）
+            self.preview_cache = PreviewImageCache()
+            self.current_preview_entry = None
+            self._resize_after_id = None
+            self._last_canvas_size = None
+
+            # 透過プレビュー（カラーキー透過で実際に抜ける領域とにじみを表示する）
+            self.transparency_analyzer = None
+            self.transparency_preview_var = tk.BooleanVar(value=False)
+            self.transparency_tolerance_var = tk.IntVar(value=TransparencyAnalyzer.read_tolerance(self.character_data, os.path.join(self.app.base_path, 'config.ini')))
+            self._transparency_after_id = None
+            # プレビュー中の画像の透過設定を読むセクション（'INFO' または 'HEART_UI'、サムネイルは None）
+            self._preview_transparency_section = 'INFO'
+            self.transparency_info_label = None
             
             self.speaker_data_cache = {} 
+            # エディタを開くたびに config.ini の api_url を読み直す
+            self.app.voice_client.reload_config()
             self.selected_engine = tk.StringVar()
             self.selected_speaker = tk.StringVar()
             self.selected_style = tk.StringVar()
@@ -169,6 +186,20 @@ class EditorWindow(EditorDNDWindow):
         self.image_canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.image_canvas.bind("<ButtonRelease-1>", self.on_mouse_release)
 
+        # 透過プレビュー (left_panelの子)
+        transparency_frame = ttk.Frame(left_panel)
+        transparency_frame.grid(row=4, column=0, sticky="ew", pady=(self.app.padding_small, 0))
+        transparency_frame.columnconfigure(2, weight=1)
+        ttk.Checkbutton(transparency_frame, text="透過プレビュー", variable=self.transparency_preview_var,
+                        command=self.on_transparency_preview_toggle).grid(row=0, column=0, sticky="w")
+        ttk.Label(transparency_frame, text="許容値:", font=self.app.font_small).grid(row=0, column=1, sticky="e", padx=(self.app.padding_normal, 0))
+        ttk.Scale(transparency_frame, from_=0, to=255, orient="horizontal", variable=self.transparency_tolerance_var,
+                  command=self.on_transparency_tolerance_change).grid(row=0, column=2, sticky="ew", padx=self.app.padding_small)
+        self.transparency_tolerance_label = ttk.Label(transparency_frame, text=str(self.transparency_tolerance_var.get()), width=4, font=self.app.font_small)
+        self.transparency_tolerance_label.grid(row=0, column=3, sticky="w")
+        self.transparency_info_label = ttk.Label(transparency_frame, text="", font=self.app.font_small)
+        self.transparency_info_label.grid(row=1, column=0, columnspan=4, sticky="w")
+
         # 右パネル (Notebookを配置、タブの中がスクロール対象)
         self.notebook = ttk.Notebook(self.main_frame)
         self.notebook.grid(row=0, column=1, sticky="nsew")
@@ -480,6 +511,7 @@ class EditorWindow(EditorDNDWindow):
                 os.makedirs(save_dir, exist_ok=True)
                 save_path = os.path.join(save_dir, "normal_close.png")
                 dropped_image.save(save_path, "PNG")
+                self.current_preview_entry = self.preview_cache.put(save_path, dropped_image)
                 self.original_pil_image = dropped_image
                 self.current_preview_filepath = save_path
                 print(f"基準画像を保存しました: {save_path}")
@@ -488,6 +520,7 @@ class EditorWindow(EditorDNDWindow):
         except Exception as e:
             messagebox.showerror("画像処理エラー", f"画像の処理中にエラーが発生しました:\n{e}", parent=self)
             self.original_pil_image = None
+            self.current_preview_entry = None
             self.current_preview_filepath = None
 
     def redraw_image_preview(self):
@@ -502,9 +535,18 @@ class EditorWindow(EditorDNDWindow):
             self.after(50, self.redraw_image_preview)
             return
 
-        img_copy = self.original_pil_image.copy()
-        img_copy.thumbnail((canvas_w, canvas_h), Image.Resampling.LANCZOS)
-        self.display_tk_image = ImageTk.PhotoImage(img_copy)
+        self._last_canvas_size = (canvas_w, canvas_h)
+        entry = self.current_preview_entry
+        if entry is not None and entry.original is self.original_pil_image:
+            # キャッシュ済みの縮小版から、最も近いサイズのものを元に縮小する
+            display_image = entry.scaled(canvas_w, canvas_h)
+            self.preview_cache.trim()
+        else:
+            display_image = self.original_pil_image.copy()
+            display_image.thumbnail((canvas_w, canvas_h), Image.Resampling.LANCZOS)
+        if self.transparency_preview_var.get():
+            display_image = self._render_transparency_preview(display_image)
+        self.display_tk_image = ImageTk.PhotoImage(display_image)
         x_pos = (canvas_w - self.display_tk_image.width()) / 2
         y_pos = (canvas_h - self.display_tk_image.height()) / 2
         self.image_canvas.create_image(x_pos, y_pos, image=self.display_tk_image, anchor="nw")
@@ -542,8 +584,94 @@ class EditorWindow(EditorDNDWindow):
         text = f"衣装 '{self.current_costume_id.get()}' の\n基準画像をD&D"
         self.image_canvas.create_text(canvas_w/2, canvas_h/2, text=text, justify="center", font=self.placeholder_font)
 
+    def _get_transparency_settings(self) -> tuple[str, str, str]:
+        """プレビュー中の画像の (透過方式, 透過色, 縁色) を、保存前の編集内容も含めて返す。"""
+        if self._preview_transparency_section == 'HEART_UI':
+            favor_tab = self.tabs.get('favor')
+            if favor_tab is not None and 'HEART_TRANSPARENT_COLOR' in favor_tab.widgets:
+                return (favor_tab.widgets['HEART_TRANSPARENCY_MODE'].get(),
+                        favor_tab.widgets['HEART_TRANSPARENT_COLOR'].cget("background"),
+                        favor_tab.widgets['HEART_EDGE_COLOR'].cget("background"))
+            return TransparencyAnalyzer.read_settings(self.character_data, 'HEART_UI')
+
+        basic_tab = self.tabs.get('basic')
+        if basic_tab is not None and 'TRANSPARENT_COLOR' in basic_tab.widgets:
+            return (basic_tab.widgets['TRANSPARENCY_MODE'].get(),
+                    basic_tab.widgets['TRANSPARENT_COLOR'].cget("background"),
+                    basic_tab.widgets['EDGE_COLOR'].cget("background"))
+        return TransparencyAnalyzer.read_settings(self.character_data, 'INFO')
+
+    def _color_to_rgb(self, color: str) -> tuple[int, int, int]:
+        # winfo_rgb は16bit値を返す。色名や3桁の16進表記もTkと同じ規則で解釈できる
+        return tuple(c // 257 for c in self.winfo_rgb(color))
+
+    def _render_transparency_preview(self, display_image: Image.Image) -> Image.Image:
+        """表示用の画像を、カラーキー透過で抜ける領域とにじみを示したプレビューに置き換える。"""
+        if self._preview_transparency_section is None:
+            self.transparency_info_label.config(text="この画像はウィンドウに表示されないため、透過の対象外です。")
+            return display_image
+        mode, trans_color, edge_color = self._get_transparency_settings()
+        if mode != 'color_key':
+            self.transparency_info_label.config(text="透過方式が「透明度維持」のため、画像の透明度がそのまま使われます。")
+            return display_image
+        if self.transparency_analyzer is None:
+            try:
+                self.transparency_analyzer = TransparencyAnalyzer()
+            except RuntimeError as e:
+                self.transparency_info_label.config(text=str(e))
+                return display_image
+
+        try:
+            key_rgb = self._color_to_rgb(trans_color)
+            edge_rgb = self._color_to_rgb(edge_color)
+        except tk.TclError as e:
+            self.transparency_info_label.config(text=f"透過色を解釈できません: {e}")
+            return display_image
+        preview, stats = self.transparency_analyzer.render_preview(
+            self.original_pil_image, key_rgb, edge_rgb, self.transparency_tolerance_var.get(), display_image=display_image)
+
+        keyed_ratio = stats['keyed'] / stats['pixels'] * 100 if stats['pixels'] else 0
+        text = f"透過: {keyed_ratio:.1f}%  にじみ: {stats['halo']:,}px  半透明の縁: {stats['fringe']:,}px"
+        if stats['holes']:
+            text += f"  抜ける不透明画素: {stats['holes']:,}px"
+        if not stats['cached']:
+            text += f"  ({stats['elapsed_ms']:.0f}ms)"
+        self.transparency_info_label.config(text=text)
+        return preview
+
+    def on_transparency_preview_toggle(self):
+        if not self.transparency_preview_var.get():
+            self.transparency_info_label.config(text="")
+        self.redraw_image_preview()
+
+    def on_transparency_tolerance_change(self, value):
+        self.transparency_tolerance_label.config(text=str(self.transparency_tolerance_var.get()))
+        if not self.transparency_preview_var.get() or self.original_pil_image is None:
+            return
+        # スライダーのドラッグ中に連続して届く変更はまとめ、アイドル時に最新の値で1回だけ描き直す
+        if self._transparency_after_id is None:
+            self._transparency_after_id = self.after_idle(self._on_transparency_tolerance_settled)
+
+    def _on_transparency_tolerance_settled(self):
+        self._transparency_after_id = None
+        if self.winfo_exists():
+            self.redraw_image_preview()
+
     def on_window_resize(self, event):
-        self.after(50, self.redraw_image_preview)
+        # ドラッグ中に連続して届くイベントはまとめ、最後の1回だけ再描画する
+        if self._resize_after_id is not None:
+            self.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.after(50, self._on_resize_settled)
+
+    def _on_resize_settled(self):
+        self._resize_after_id = None
+        if not self.winfo_exists() or self.image_canvas is None:
+            return
+        # キャンバスの大きさが変わっていなければ描き直す必要はない
+        canvas_size = (self.image_canvas.winfo_width(), self.image_canvas.winfo_height())
+        if canvas_size == self._last_canvas_size and self.original_pil_image is not None:
+            return
+        self.redraw_image_preview()
 
     def update_costume_selector(self):
         costumes = self.character_data.get_costumes()
@@ -634,7 +762,8 @@ class EditorWindow(EditorDNDWindow):
         filepath = os.path.join(self.character_data.base_path, "thumbnail.png")
         
         if os.path.exists(filepath):
-            self.update_preview_image(filepath)
+            # サムネイルはウィンドウに表示しないため、透過の対象外
+            self.update_preview_image(filepath, transparency_section=None)
         else:
             # サムネイルが存在しない場合は、代わりにキャラクターの基準画像を表示する
             self.set_preview_to_character_base(self.current_costume_id.get())
@@ -645,13 +774,16 @@ class EditorWindow(EditorDNDWindow):
 
     def set_preview_to_heart_image(self, filename, filepath):
         self.preview_mode_label.config(text=f"プレビュー対象: ハート画像 ({filename})")
-        self.update_preview_image(filepath)
+        self.update_preview_image(filepath, transparency_section='HEART_UI')
 
-    def update_preview_image(self, filepath):
+    def update_preview_image(self, filepath, transparency_section='INFO'):
         self.current_preview_filepath = filepath
+        self._preview_transparency_section = transparency_section
+        self.current_preview_entry = None
         if filepath and os.path.exists(filepath):
             try:
-                self.original_pil_image = Image.open(filepath).convert("RGBA")
+                self.current_preview_entry = self.preview_cache.get(filepath)
+                self.original_pil_image = self.current_preview_entry.original
             except Exception as e:
                 print(f"プレビュー画像読込エラー: {e}")
                 self.original_pil_image = None
@@ -912,17 +1044,11 @@ class EditorWindow(EditorDNDWindow):
         try:
             speaker_id = self._find_speaker_id(engine, speaker_name, style_name)
             if speaker_id is None: raise ValueError("指定された話者/スタイルが見つかりません。")
-            urls = {'voicevox': 'http://127.0.0.1:50021', 'aivisspeech': 'http://127.0.0.1:10101'}
-            base_url = urls.get(engine)
-            if not base_url: raise ValueError(f"不明なエンジン: {engine}")
-            query_res = requests.post(f"{base_url}/audio_query", params={'text': text, 'speaker': speaker_id}, timeout=5)
-            query_res.raise_for_status()
-            audio_query = query_res.json()
-            for key, value in params_override.items():
-                if key in audio_query: audio_query[key] = value
-            synth_res = requests.post(f"{base_url}/synthesis", params={'speaker': speaker_id}, json=audio_query, timeout=10)
-            synth_res.raise_for_status()
-            wav_data = synth_res.content
+            api_url, version = self.app.voice_client.get_engine_identity(engine)
+            cache_key = self.app.audio_cache.make_key(engine, speaker_id, text, params_override, api_url=api_url, version=version)
+            wav_data = self.app.audio_cache.get_or_create(
+                cache_key, lambda: self.app.voice_client.synthesize(engine, text, speaker_id, params_override)
+            )
         except Exception as e:
             self.after(0, lambda: messagebox.showerror("APIエラー", f"音声の生成に失敗しました。\n詳細: {e}", parent=self))
         finally:
@@ -932,12 +1058,7 @@ class EditorWindow(EditorDNDWindow):
             if on_finish_callback: self.after(0, on_finish_callback)
 
     def _find_speaker_id(self, engine, speaker_name, style_name):
-        speakers = self.speaker_data_cache.get(engine, [])
-        for speaker in speakers:
-            if speaker['name'] == speaker_name:
-                for style in speaker['styles']:
-                    if style['name'] == style_name: return style['id']
-        return None
+        return self.app.voice_client.find_speaker_id(self.speaker_data_cache.get(engine, []), speaker_name, style_name)
     
     def sanitize_string(self, text: str, max_length: int, allow_newlines: bool = False) -> str:
         """
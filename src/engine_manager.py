@@ -1,14 +1,34 @@
 import configparser
 import os
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import psutil
+import requests
 
 class EngineManager:
     """
     音声合成エンジン（VOICEVOX, AivisSpeech）のプロセスを管理するクラス。
     アプリケーション起動時にエンジンが動いていなければ起動し、
     終了時に他の依存アプリが動いていなければエンジンを終了させる。
+
+    start_all_engines_async() はプロセス一覧を1回だけ走査して全エンジンの起動状態を調べ、
+    未起動のエンジンを並列に起動してから api_url の /version が応答するまで待つ処理をバックグラウンドで行う。
+    進捗は on_status(セクション名, 状態, メッセージ) でワーカースレッドから通知する。
     """
+    ENGINE_SECTIONS = ('VOICEVOX', 'AIVIS_SPEECH')
+    DEFAULT_API_URLS = {'VOICEVOX': 'http://127.0.0.1:50021', 'AIVIS_SPEECH': 'http://127.0.0.1:10101'}
+    # on_status に渡す状態
+    STATUS_CHECKING = 'checking'
+    STATUS_STARTING = 'starting'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_SKIPPED = 'skipped'
+    # 初回起動時はモデルの読み込みに時間がかかるため、応答を長めに待つ
+    READY_TIMEOUT_SEC = 120
+    READY_POLL_INTERVAL_SEC = 0.5
     def __init__(self, config_path='config.ini', base_path='.'):
         self.config = configparser.ConfigParser()
         self.base_path = base_path
@@ -19,6 +39,9 @@ class EngineManager:
         
         # このエディタが起動したプロセスを記録するリスト
         self.managed_processes = []
+        self._lock = threading.Lock()
+        # 終了処理が始まった後は、バックグラウンドのスレッドからエンジンを新たに起動しない
+        self._shutting_down = False
         
         # --- 依存アプリケーションのプロセス名リスト ---
         # ここに記載されたアプリが一つでも実行中の場合、エディタ終了時にエンジンを閉じません。
@@ -29,53 +52,88 @@ class EngineManager:
             "AivisSpeech.exe",   # AivisSpeechのGUIアプリ本体
         ]
 
-    def _is_process_running(self, exe_path: str) -> bool:
-        """指定されたフルパスのプロセスが実行中か正確に確認する"""
-        if not exe_path:
-            return False
-            
+    @staticmethod
+    def _normalize_path(path: str) -> str:
         # 比較のためにパスを正規化し、小文字に変換する
-        normalized_path = os.path.normpath(exe_path).lower()
+        return os.path.normpath(path).lower()
+
+    def _find_running_exes(self, exe_paths) -> set[str]:
+        """プロセス一覧を1回だけ走査し、指定されたパスのうち実行中のもの（正規化済み）を返す"""
+        targets = {self._normalize_path(p) for p in exe_paths if p}
+        running = set()
+        if not targets:
+            return running
         for proc in psutil.process_iter(['exe']):
             try:
                 # 取得したパスも同様に正規化・小文字化して比較
-                if proc.info['exe'] and os.path.normpath(proc.info['exe']).lower() == normalized_path:
-                    return True
+                if proc.info['exe'] and (normalized := self._normalize_path(proc.info['exe'])) in targets:
+                    running.add(normalized)
+                    if running == targets:
+                        break
             except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                 pass
-        return False
+        return running
+
+    def _is_process_running(self, exe_path: str) -> bool:
+        """指定されたフルパスのプロセスが実行中か正確に確認する"""
+        if not exe_path:
+            return False
+        return self._normalize_path(exe_path) in self._find_running_exes([exe_path])
+
+    def _resolve_exe_path(self, section: str) -> str | None:
+        """設定ファイルから実行ファイルのパスを読み取る。見つからなければNone"""
+        exe_path_from_config = self.config.get(section, 'exe_path', fallback=None)
+        if not exe_path_from_config:
+            print(f"[{section}] の exe_path が config.ini に見つかりません。")
+            return None
+
+        # exe_pathが絶対パスでなければ、base_pathと結合して絶対パスに変換
+        if not os.path.isabs(exe_path_from_config):
+            exe_path = os.path.join(self.base_path, exe_path_from_config)
+        else:
+            exe_path = exe_path_from_config # 元々絶対パスならそのまま使う
+
+        if not os.path.exists(exe_path):
+            print(f"[{section}] の exe_path が見つからないか、無効です: {exe_path}")
+            return None
+        return exe_path
+
+    def _api_url(self, section: str) -> str:
+        url = self.config.get(section, 'api_url', fallback='').strip() or self.DEFAULT_API_URLS.get(section, '')
+        return url.rstrip('/')
+
+    def _launch(self, section: str, exe_path: str):
+        """エンジンを起動して管理下に加える。終了処理が始まっている場合は起動せずにNoneを返す"""
+        # エンジンの実行ファイルがあるディレクトリを取得
+        engine_dir = os.path.dirname(exe_path)
+
+        # 終了処理と同時に起動されて停止し損ねることがないよう、確認から記録までをロック内で行う
+        with self._lock:
+            if self._shutting_down:
+                print(f"[{section}] 終了処理中のため、エンジンを起動しません。")
+                return None
+            print(f"[{section}] エンジンが見つからないため、起動します: {exe_path}")
+            # cwdを指定してプロセスを起動する
+            process = subprocess.Popen(
+                [exe_path],
+                cwd=engine_dir,  # 作業ディレクトリをエンジンのディレクトリに設定
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+            )
+            self.managed_processes.append(process)
+        return process
 
-    def _start_engine(self, section: str):
+    def _start_engine(self, section: str, running_exes: set[str] | None = None):
         """設定ファイルからパスを読み取り、エンジンが未起動の場合のみ起動する"""
         try:
-            exe_path_from_config = self.config.get(section, 'exe_path', fallback=None)
-            if not exe_path_from_config:
-                print(f"[{section}] の exe_path が config.ini に見つかりません。")
-                return
-            
-            # exe_pathが絶対パスでなければ、base_pathと結合して絶対パスに変換
-            if not os.path.isabs(exe_path_from_config):
-                exe_path = os.path.join(self.base_path, exe_path_from_config)
-            else:
-                exe_path = exe_path_from_config # 元々絶対パスならそのまま使う
-
-            if not os.path.exists(exe_path):
-                print(f"[{section}] の exe_path が見つからないか、無効です: {exe_path}")
+            exe_path = self._resolve_exe_path(section)
+            if not exe_path:
                 return
 
             # プロセスが実行中でないことを確認してから起動
-            if not self._is_process_running(exe_path):
-                print(f"[{section}] エンジンが見つからないため、起動します: {exe_path}")
-                # エンジンの実行ファイルがあるディレクトリを取得
-                engine_dir = os.path.dirname(exe_path)
-                
-                # cwdを指定してプロセスを起動する
-                process = subprocess.Popen(
-                    [exe_path], 
-                    cwd=engine_dir,  # 作業ディレクトリをエンジンのディレクトリに設定
-                    creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
-                )
-                self.managed_processes.append(process)
+            if running_exes is None:
+                running_exes = self._find_running_exes([exe_path])
+            if self._normalize_path(exe_path) not in running_exes:
+                self._launch(section, exe_path)
             else:
                 print(f"[{section}] エンジンは既に実行中です。")
 
@@ -85,12 +143,94 @@ class EngineManager:
     def start_all_engines_if_needed(self):
         """VOICEVOXとAivisSpeechのエンジンを必要に応じて起動する"""
         print("音声エンジンの状態を確認しています...")
-        self._start_engine('VOICEVOX')
-        self._start_engine('AIVIS_SPEECH')
+        exe_paths = [self._resolve_exe_path(section) for section in self.ENGINE_SECTIONS]
+        running_exes = self._find_running_exes(exe_paths)
+        for section in self.ENGINE_SECTIONS:
+            self._start_engine(section, running_exes)
+
+    def wait_until_ready(self, section: str, process=None, timeout: float | None = None) -> bool:
+        """api_url の /version が応答するまで待つ。起動したプロセスが先に終了した場合はFalse"""
+        url = f"{self._api_url(section)}/version"
+        deadline = time.monotonic() + (timeout if timeout is not None else self.READY_TIMEOUT_SEC)
+        while True:
+            try:
+                if requests.get(url, timeout=2).ok:
+                    return True
+            except requests.exceptions.RequestException:
+                pass
+            if process is not None and process.poll() is not None:
+                print(f"[{section}] エンジンのプロセスが終了しました (終了コード {process.returncode})。")
+                return False
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(self.READY_POLL_INTERVAL_SEC)
+
+    def _start_and_wait(self, section: str, exe_path: str | None, is_running: bool, on_status):
+        """1つのエンジンを（必要なら起動して）応答するまで待つ。ワーカースレッドで実行される"""
+        def notify(status, message):
+            print(f"[{section}] {message}")
+            if on_status:
+                try:
+                    on_status(section, status, message)
+                except Exception as e:
+                    print(f"エンジンの状態通知でエラーが発生しました: {e}")
+
+        process = None
+        if not is_running:
+            if not exe_path:
+                # 実行ファイルが無くても、別の方法で起動済みのエンジンがあれば使える
+                if self.wait_until_ready(section, timeout=0):
+                    notify(self.STATUS_READY, "起動済みのエンジンに接続しました。")
+                else:
+                    notify(self.STATUS_SKIPPED, "実行ファイルが設定されていないため、起動しません。")
+                return
+            try:
+                notify(self.STATUS_STARTING, "エンジンを起動しています...")
+                process = self._launch(section, exe_path)
+            except Exception as e:
+                notify(self.STATUS_FAILED, f"エンジンの起動に失敗しました: {e}")
+                return
+            if process is None:
+                notify(self.STATUS_SKIPPED, "終了処理中のため、起動しませんでした。")
+                return
+        else:
+            notify(self.STATUS_CHECKING, "エンジンの応答を確認しています...")
+
+        started = time.monotonic()
+        if self.wait_until_ready(section, process):
+            notify(self.STATUS_READY, f"エンジンの準備ができました ({time.monotonic() - started:.1f}秒)。")
+        else:
+            notify(self.STATUS_FAILED, "エンジンが応答しません。")
+
+    def start_all_engines_async(self, on_status=None) -> threading.Thread:
+        """
+        エンジンの確認・起動・応答待ちをバックグラウンドで行う。
+        on_status(セクション名, 状態, メッセージ) はワーカースレッドから呼ばれるため、
+        UIを更新する場合は呼び出し側でメインスレッドに処理を渡すこと。
+        """
+        def worker():
+            print("音声エンジンの状態を確認しています...")
+            exe_paths = {section: self._resolve_exe_path(section) for section in self.ENGINE_SECTIONS}
+            try:
+                running_exes = self._find_running_exes(exe_paths.values())
+            except Exception as e:
+                print(f"プロセス一覧の取得に失敗しました: {e}")
+                running_exes = set()
+            with ThreadPoolExecutor(max_workers=len(self.ENGINE_SECTIONS)) as executor:
+                for section, exe_path in exe_paths.items():
+                    is_running = bool(exe_path) and self._normalize_path(exe_path) in running_exes
+                    executor.submit(self._start_and_wait, section, exe_path, is_running, on_status)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
 
     def stop_managed_engines_conditionally(self):
         """依存アプリが動いていなければ、このエディタが起動したエンジンを停止する"""
         print("アプリケーション終了処理を確認しています...")
+        # 以降はバックグラウンドのスレッドから新しいエンジンを起動させない
+        with self._lock:
+            self._shutting_down = True
         
         # 依存アプリケーションが実行中か確認
         for proc in psutil.process_iter(['name']):
@@ -99,12 +239,14 @@ class EngineManager:
                 return # 依存アプリが動いていたら、何もせず処理を終了
 
         # 依存アプリがなければ、管理下のプロセスを終了させる
-        if not self.managed_processes:
+        with self._lock:
+            managed_processes = list(self.managed_processes)
+        if not managed_processes:
             print("このエディタが起動したエンジンはありませんでした。")
             return
             
         print("依存アプリケーションが見つからないため、このエディタが起動したエンジンを終了します...")
-        for process in self.managed_processes:
+        for process in managed_processes:
             try:
                 if process.poll() is None: # プロセスがまだ実行中か確認
                     print(f"プロセス {process.pid} を終了します。")
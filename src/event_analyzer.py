@@ -0,0 +1,204 @@
+# src/event_analyzer.py
+
+from .event_store import EventStore
+
+
+class EventAnalyzer:
+    """
+    events フォルダ内の全イベントを静的に検査するクラス。
+
+    イベントごとにシーケンスの制御フローグラフ（ステップ → 次に実行され得るステップ）を作り、
+    存在しないラベルへのジャンプ、到達できないステップ、終了に到達できないループ、使われていないラベルを検出する。
+    さらにイベント間の依存関係（event_completed 条件、フラグの参照と set_flag）から、
+    存在しないイベントへの参照、どこでも設定されないフラグ、循環して発生し得ないイベントの連鎖を検出する。
+    どの検査もイベント数・ステップ数に対して線形時間で終わるため、保存のたびに実行できる。
+    """
+    SEVERITY_ERROR = 'error'
+    SEVERITY_WARNING = 'warning'
+    SEVERITY_INFO = 'info'
+    # シーケンスの終端を表すノード
+    END = -1
+
+    def __init__(self, event_store: EventStore):
+        self.event_store = event_store
+
+    @classmethod
+    def _issue(cls, severity: str, event_id: str | None, message: str, step: int | None = None) -> dict:
+        return {'severity': severity, 'event_id': event_id, 'step': step, 'message': message}
+
+    @classmethod
+    def build_flow_graph(cls, sequence: list) -> tuple[list[list[int]], list[dict]]:
+        """
+        シーケンスの制御フローグラフを作る。
+
+        Returns:
+            tuple: (各ステップの遷移先インデックスのリスト（終端は END）, ジャンプ先の解決に失敗した箇所の問題リスト)
+        """
+        labels = {}
+        issues = []
+        for i, command in enumerate(sequence):
+            label = command.get('label') if isinstance(command, dict) else None
+            if not label:
+                continue
+            if label in labels:
+                issues.append(cls._issue(cls.SEVERITY_ERROR, None, f"ラベル '{label}' が重複しています (Step {labels[label] + 1} と Step {i + 1})。", i))
+            else:
+                labels[label] = i
+
+        def resolve(i: int, target: str, what: str) -> int:
+            # ジャンプ先が空なら次のステップへ進む
+            if not target:
+                return i + 1 if i + 1 < len(sequence) else cls.END
+            if target not in labels:
+                issues.append(cls._issue(cls.SEVERITY_ERROR, None, f"{what}のジャンプ先ラベル '{target}' が存在しません。", i))
+                return cls.END
+            return labels[target]
+
+        graph = []
+        for i, command in enumerate(sequence):
+            if not isinstance(command, dict):
+                graph.append([i + 1 if i + 1 < len(sequence) else cls.END])
+                continue
+            params = command.get('params') or {}
+            command_type = command.get('type')
+            if command_type == 'choice':
+                options = params.get('options') or []
+                successors = [resolve(i, option.get('jump_to', ''), f"選択肢{j + 1}") for j, option in enumerate(options) if isinstance(option, dict)]
+                if not successors:
+                    successors = [resolve(i, '', '')]
+            elif command_type == 'branch_on_flag':
+                successors = [resolve(i, params.get('jump_if_true', ''), "条件成立時"),
+                              resolve(i, params.get('jump_if_false', ''), "条件不成立時")]
+            else:
+                successors = [resolve(i, command.get('jump_to', ''), "")]
+            graph.append(list(dict.fromkeys(successors)))
+        return graph, issues
+
+    @classmethod
+    def analyze_sequence(cls, event_id: str, sequence: list) -> list[dict]:
+        """1イベント分のシーケンスを検査する。"""
+        if not sequence:
+            return []
+        graph, issues = cls.build_flow_graph(sequence)
+        for issue in issues:
+            issue['event_id'] = event_id
+
+        # --- 先頭から到達できるステップ ---
+        reachable = [False] * len(sequence)
+        reachable[0] = True
+        stack = [0]
+        while stack:
+            for succ in graph[stack.pop()]:
+                if succ != cls.END and not reachable[succ]:
+                    reachable[succ] = True
+                    stack.append(succ)
+
+        # --- 終端に到達できるステップ（逆向きのグラフをたどる） ---
+        predecessors = [[] for _ in sequence]
+        can_finish = [False] * len(sequence)
+        stack = []
+        for i, successors in enumerate(graph):
+            for succ in successors:
+                if succ == cls.END:
+                    if not can_finish[i]:
+                        can_finish[i] = True
+                        stack.append(i)
+                else:
+                    predecessors[succ].append(i)
+        while stack:
+            for pred in predecessors[stack.pop()]:
+                if not can_finish[pred]:
+                    can_finish[pred] = True
+                    stack.append(pred)
+
+        jumped_labels = set()
+        for i, command in enumerate(sequence):
+            if not isinstance(command, dict):
+                continue
+            params = command.get('params') or {}
+            jumped_labels.update(filter(None, [command.get('jump_to'), params.get('jump_if_true'), params.get('jump_if_false')]))
+            jumped_labels.update(o.get('jump_to') for o in params.get('options') or [] if isinstance(o, dict) and o.get('jump_to'))
+
+        for i, command in enumerate(sequence):
+            if not reachable[i]:
+                issues.append(cls._issue(cls.SEVERITY_WARNING, event_id, "このステップには到達できません。", i))
+            elif not can_finish[i]:
+                issues.append(cls._issue(cls.SEVERITY_ERROR, event_id, "このステップから抜け出せないループになっています（終了に到達できません）。", i))
+            label = command.get('label') if isinstance(command, dict) else None
+            if label and label not in jumped_labels and i > 0:
+                issues.append(cls._issue(cls.SEVERITY_INFO, event_id, f"ラベル '{label}' はどこからもジャンプされていません。", i))
+        return issues
+
+    @classmethod
+    def _find_cycles(cls, graph: dict) -> list[list[str]]:
+        """強連結成分分解（Tarjan法、非再帰）で、2つ以上のイベントからなる循環を返す。"""
+        index_of, lowlink, on_stack = {}, {}, set()
+        stack, cycles = [], []
+        counter = 0
+        for root in graph:
+            if root in index_of:
+                continue
+            work = [(root, iter(graph[root]))]
+            index_of[root] = lowlink[root] = counter; counter += 1
+            stack.append(root); on_stack.add(root)
+            while work:
+                node, successors = work[-1]
+                for succ in successors:
+                    if succ not in graph:
+                        continue
+                    if succ not in index_of:
+                        index_of[succ] = lowlink[succ] = counter; counter += 1
+                        stack.append(succ); on_stack.add(succ)
+                        work.append((succ, iter(graph[succ])))
+                        break
+                    if succ in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[succ])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index_of[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1:
+                            cycles.append(sorted(component))
+        return cycles
+
+    def analyze(self) -> list[dict]:
+        """
+        全イベントを検査し、問題のリストを返す。
+        各要素は {'severity': 'error'|'warning'|'info', 'event_id': str|None, 'step': int|None, 'message': str}。
+        """
+        issues = []
+        dependencies = {}
+        flags_read, flags_written = {}, {}
+        events = list(self.event_store.iter_cached_events())
+        event_ids = {event_id for event_id, _, _ in events}
+
+        for event_id, event_data, refs in events:
+            issues.extend(self.analyze_sequence(event_id, event_data.get('sequence') or []))
+            dependencies[event_id] = sorted(refs['events'] - {event_id})
+            for missing in sorted(refs['events'] - event_ids):
+                issues.append(self._issue(self.SEVERITY_ERROR, event_id, f"存在しないイベント '{missing}' を条件に使っています。"))
+            for flag in refs['flags_read']:
+                flags_read.setdefault(flag, []).append(event_id)
+            for flag in refs['flags_written']:
+                flags_written.setdefault(flag, []).append(event_id)
+
+        for flag in sorted(flags_read.keys() - flags_written.keys()):
+            users = ', '.join(sorted(flags_read[flag]))
+            issues.append(self._issue(self.SEVERITY_WARNING, None, f"フラグ '{flag}' はどのイベントでも設定されていません（参照: {users}）。"))
+        for flag in sorted(flags_written.keys() - flags_read.keys()):
+            setters = ', '.join(sorted(flags_written[flag]))
+            issues.append(self._issue(self.SEVERITY_INFO, None, f"フラグ '{flag}' は設定されていますが、どこからも参照されていません（設定: {setters}）。"))
+
+        for cycle in self._find_cycles(dependencies):
+            issues.append(self._issue(self.SEVERITY_WARNING, None,
+                f"イベント {', '.join(cycle)} がお互いの完了を条件にしており、発生しない可能性があります。"))
+        return issues
@@ -0,0 +1,265 @@
+# src/event_store.py
+
+import copy
+import json
+import os
+import tempfile
+
+
+class EventStore:
+    """
+    events フォルダ内のイベントJSONを管理するクラス。
+
+    読み込んだイベントは (更新時刻, サイズ) と一緒にメモリ上に保持し、ファイルが変わっていなければ再解析しない。
+    保存時は内容が変わったイベントだけを書き込む。
+    また、各イベントが参照しているイベントIDやフラグの逆引きインデックスを持ち、
+    「このイベントに依存しているイベント」「このフラグを使っているイベント」を検索できる。
+
+    load() が返す辞書は呼び出し側で自由に変更できるよう、キャッシュのコピーを返す。
+    """
+    # イベントIDを参照する条件の種類
+    EVENT_CONDITION_TYPES = {'event_completed', 'event_completed_after'}
+
+    def __init__(self, events_dir: str):
+        self.events_dir = events_dir
+        # { イベントID: {'mtime_ns': int, 'size': int, 'data': dict, 'refs': dict} }
+        self._cache = {}
+        # get_event_ids の結果と、その時点のフォルダの更新時刻
+        self._ids = None
+        self._ids_mtime_ns = None
+        # 逆引きインデックス（キャッシュ中のイベントから作る）
+        # { 参照されるイベントID: {参照しているイベントID} }
+        self._dependents = {}
+        # { フラグ名: {イベントID} }
+        self._flag_readers = {}
+        self._flag_writers = {}
+
+    def _path(self, event_id: str) -> str:
+        return os.path.join(self.events_dir, f"{event_id}.json")
+
+    def _dir_mtime_ns(self) -> int | None:
+        try:
+            return os.stat(self.events_dir).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _ids_fresh(self) -> bool:
+        """キャッシュしたイベントIDの一覧が、現在のフォルダの内容と一致しているか。"""
+        return self._ids is not None and self._dir_mtime_ns() == self._ids_mtime_ns
+
+    def _update_ids(self, was_fresh: bool, added: str | None = None, removed: str | None = None):
+        """
+        保存・削除・名前変更の後に、フォルダを読み直さずにイベントIDの一覧を更新する。
+        操作の前から一覧が古くなっていた場合は、次の get_event_ids で読み直す。
+        """
+        if not was_fresh:
+            return
+        ids = set(self._ids)
+        ids.discard(removed)
+        if added is not None:
+            ids.add(added)
+        self._ids = sorted(ids)
+        self._ids_mtime_ns = self._dir_mtime_ns()
+
+    @staticmethod
+    def _index_remove(index: dict, keys, event_id: str):
+        for key in keys:
+            owners = index.get(key)
+            if owners is not None:
+                owners.discard(event_id)
+                if not owners:
+                    del index[key]
+
+    def _set_entry(self, event_id: str, entry: dict | None):
+        """キャッシュのエントリを置き換え（Noneなら削除し）、逆引きインデックスも合わせて更新する。"""
+        old = self._cache.pop(event_id, None)
+        if old:
+            refs = old['refs']
+            self._index_remove(self._dependents, refs['events'], event_id)
+            self._index_remove(self._flag_readers, refs['flags_read'], event_id)
+            self._index_remove(self._flag_writers, refs['flags_written'], event_id)
+        if entry is None:
+            return
+        self._cache[event_id] = entry
+        refs = entry['refs']
+        for target in refs['events']:
+            self._dependents.setdefault(target, set()).add(event_id)
+        for flag in refs['flags_read']:
+            self._flag_readers.setdefault(flag, set()).add(event_id)
+        for flag in refs['flags_written']:
+            self._flag_writers.setdefault(flag, set()).add(event_id)
+
+    def get_event_ids(self) -> list[str]:
+        """イベントIDのリストを返す。フォルダの更新時刻が前回と同じなら一覧を読み直さない。"""
+        try:
+            mtime_ns = os.stat(self.events_dir).st_mtime_ns
+        except FileNotFoundError:
+            self._ids, self._ids_mtime_ns = None, None
+            return []
+        if self._ids is None or mtime_ns != self._ids_mtime_ns:
+            self._ids = sorted(os.path.splitext(f)[0] for f in os.listdir(self.events_dir) if f.endswith('.json'))
+            self._ids_mtime_ns = mtime_ns
+            # 削除されたイベントをキャッシュから除く
+            for event_id in set(self._cache) - set(self._ids):
+                self._set_entry(event_id, None)
+        return list(self._ids)
+
+    def _load_cached(self, event_id: str) -> dict | None:
+        """キャッシュのエントリを返す（ファイルが変わっていれば読み直す）。読み込めなければNone。"""
+        event_path = self._path(event_id)
+        try:
+            st = os.stat(event_path)
+        except FileNotFoundError:
+            self._set_entry(event_id, None)
+            return None
+
+        entry = self._cache.get(event_id)
+        if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+            return entry
+
+        try:
+            with open(event_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"イベントファイル '{event_path}' の読み込みに失敗しました: {e}")
+            self._set_entry(event_id, None)
+            return None
+
+        entry = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'data': data, 'refs': self.extract_references(data)}
+        self._set_entry(event_id, entry)
+        return entry
+
+    def load(self, event_id: str) -> dict | None:
+        """イベントを読み込み、辞書（キャッシュのコピー）として返す。"""
+        entry = self._load_cached(event_id)
+        return copy.deepcopy(entry['data']) if entry else None
+
+    def save(self, event_id: str, event_data: dict) -> bool:
+        """
+        イベントを保存する。ファイルの内容と同じであれば書き込まない。
+
+        Returns:
+            bool: 実際に書き込んだ場合はTrue。
+        """
+        entry = self._load_cached(event_id)
+        if entry and entry['data'] == event_data:
+            return False
+
+        event_path = self._path(event_id)
+        was_fresh = self._ids_fresh()
+        os.makedirs(self.events_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.events_dir, prefix=f".{event_id}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(event_data, f, ensure_ascii=False, indent=4)
+            os.replace(temp_path, event_path)
+        except Exception as e:
+            print(f"イベントファイル '{event_path}' の保存に失敗しました: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise # エラーを呼び出し元に伝える
+
+        st = os.stat(event_path)
+        data = copy.deepcopy(event_data)
+        self._set_entry(event_id, {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'data': data, 'refs': self.extract_references(data)})
+        self._update_ids(was_fresh, added=event_id)
+        return True
+
+    def delete(self, event_id: str):
+        event_path = self._path(event_id)
+        was_fresh = self._ids_fresh()
+        if os.path.exists(event_path):
+            os.remove(event_path)
+        self._set_entry(event_id, None)
+        self._update_ids(was_fresh, removed=event_id)
+
+    def rename(self, old_event_id: str, new_event_id: str):
+        old_path = self._path(old_event_id)
+        new_path = self._path(new_event_id)
+        if os.path.exists(old_path) and not os.path.exists(new_path):
+            was_fresh = self._ids_fresh()
+            os.rename(old_path, new_path)
+            # 内容は変わらないため、解析済みのエントリを新しいIDに付け替える（更新時刻は rename では変わらない）
+            entry = self._cache.get(old_event_id)
+            self._set_entry(old_event_id, None)
+            if entry:
+                self._set_entry(new_event_id, entry)
+            self._update_ids(was_fresh, added=new_event_id, removed=old_event_id)
+
+    # --- 逆引きインデックス ---
+
+    @classmethod
+    def _collect_condition_refs(cls, conditions, refs: dict):
+        for cond in conditions or []:
+            if not isinstance(cond, dict):
+                continue
+            cond_type = cond.get('type', '')
+            if cond_type in cls.EVENT_CONDITION_TYPES and cond.get('event_id'):
+                refs['events'].add(cond['event_id'])
+            elif 'flag' in cond_type and cond.get('flag'):
+                refs['flags_read'].add(cond['flag'])
+
+    @classmethod
+    def extract_references(cls, event_data: dict) -> dict:
+        """
+        イベントが参照しているイベントIDとフラグを集める。
+
+        Returns:
+            dict: {'events': set, 'flags_read': set, 'flags_written': set}
+        """
+        refs = {'events': set(), 'flags_read': set(), 'flags_written': set()}
+        if not isinstance(event_data, dict):
+            return refs
+
+        for group in event_data.get('triggers') or []:
+            cls._collect_condition_refs(group, refs)
+        # 古い形式（単一の trigger）
+        if isinstance(event_data.get('trigger'), dict):
+            cls._collect_condition_refs([event_data['trigger']], refs)
+
+        for command in event_data.get('sequence') or []:
+            if not isinstance(command, dict):
+                continue
+            params = command.get('params') or {}
+            if command.get('type') == 'set_flag' and params.get('flag'):
+                refs['flags_written'].add(params['flag'])
+            elif command.get('type') == 'branch_on_flag':
+                cls._collect_condition_refs(params.get('conditions'), refs)
+            elif command.get('type') == 'choice':
+                for option in params.get('options') or []:
+                    if isinstance(option, dict):
+                        cls._collect_condition_refs(option.get('conditions'), refs)
+        return refs
+
+    def iter_cached_events(self):
+        """
+        全イベントを (イベントID, データ, 参照情報) で順に返す（変更されたイベントだけ読み直す）。
+        コピーを作らずキャッシュそのものを返すため、読み取り専用の解析処理でのみ使い、内容を変更しないこと。
+        """
+        for event_id in self.get_event_ids():
+            entry = self._load_cached(event_id)
+            if entry:
+                yield event_id, entry['data'], entry['refs']
+
+    def _refresh(self):
+        """変更されたイベントだけを読み直し、逆引きインデックスを最新にする。"""
+        for event_id in self.get_event_ids():
+            self._load_cached(event_id)
+
+    def get_dependents(self, event_id: str) -> list[str]:
+        """指定したイベントの完了を条件にしているイベントIDのリストを返す。"""
+        self._refresh()
+        return sorted(self._dependents.get(event_id, set()) - {event_id})
+
+    def get_flag_usage(self, flag: str) -> dict:
+        """指定したフラグを {'read': [条件で参照するイベントID], 'written': [set_flagで設定するイベントID]} で返す。"""
+        self._refresh()
+        return {
+            'read': sorted(self._flag_readers.get(flag, ())),
+            'written': sorted(self._flag_writers.get(flag, ())),
+        }
+
+    def get_all_flags(self) -> list[str]:
+        """いずれかのイベントで参照・設定されているフラグ名のリストを返す。"""
+        self._refresh()
+        return sorted(self._flag_readers.keys() | self._flag_writers.keys())
@@ -2,17 +2,21 @@
 
 import configparser
 import os
-import shutil
-import tempfile
 import requests
 import sys
 import hashlib
 import json
+import tempfile
+import zipfile
 from datetime import datetime, timezone
 # PIL(Pillow)ライブラリをインポート
 from PIL import Image, ImageOps, ImageDraw
 
 from .character_data import CharacterData
+from .package_planner import PackagePlanner
+from .hash_cache import FileHashCache
+from .image_optimizer import ImageOptimizer
+from .compression_policy import CompressionPolicy
 
 
 class GithubUploader:
@@ -26,6 +30,21 @@ class GithubUploader:
     # GitHubのZIPファイルサイズ上限（マージンを設ける）
     ZIP_SIZE_LIMIT_BYTES = 24 * 1024 * 1024 # 24MB
 
+    # ZIPに含めるファイルの規則
+    ALLOWED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp'}
+    ALLOWED_ROOT_FILES = {'character.ini', 'readme.txt', 'thumbnail.png', 'topics.txt'}
+
+    # 分割計画をやり直す最大回数
+    MAX_PLAN_ATTEMPTS = 3
+
+    # ZIPへ書き込む際の読み込み単位
+    STREAM_CHUNK_SIZE = 1024 * 1024
+
+    # 再現可能なビルドで使う固定の日時（ZIPで表現できる最も古い日時。環境変数 SOURCE_DATE_EPOCH があればそちらを使う）
+    REPRODUCIBLE_EPOCH = datetime(1980, 1, 1, tzinfo=timezone.utc)
+    # ビルドキャッシュのキーの形式を変えたら上げる
+    BUILD_CACHE_VERSION = 1
+
     def __init__(self, config_path: str):
         if not os.path.exists(config_path):
             raise FileNotFoundError(f"設定ファイルが見つかりません: {config_path}")
@@ -40,6 +59,24 @@ class GithubUploader:
         # 認証済みユーザーのログイン名をキャッシュする変数
         self.current_user_login = None
 
+        # ZIP化の前に画像を可逆に最適化するか（config.ini の [PACKAGING] で設定）
+        self.optimize_images = self.config.getboolean('PACKAGING', 'optimize_images', fallback=False)
+        # この色数以下の画像はパレットPNGにする（0で無効）
+        self.max_palette_colors = self.config.getint('PACKAGING', 'max_palette_colors', fallback=0)
+        # 画像最適化に使うプロセス数（Noneで CPU コア数）
+        self.image_optimizer_workers = None
+        # 直近の create_character_zip での画像最適化の結果
+        self.last_optimization_report = None
+        # 同じ内容から常に同じバイト列のZIPを作り、変更が無ければ前回のZIPを再利用する
+        self.reproducible_builds = self.config.getboolean('PACKAGING', 'reproducible', fallback=True)
+        # ZIPのエントリごとの圧縮方式（画像は無圧縮、テキストは高圧縮）
+        compression_mode = self.config.get('PACKAGING', 'compression', fallback=CompressionPolicy.MODE_AUTO).strip()
+        try:
+            self.compression_policy = CompressionPolicy(compression_mode)
+        except ValueError as e:
+            print(f"警告: {e}")
+            self.compression_policy = CompressionPolicy()
+
         # --- ZIP保存用フォルダのパスを決定 ---
         if getattr(sys, 'frozen', False):
             # EXEとして実行されている場合
@@ -130,98 +167,249 @@ class GithubUploader:
         res.raise_for_status() # その他のHTTPエラー
         return {} # Fallback
 
-    def _calculate_sha256(self, file_path: str) -> str:
-        """ファイルのSHA256ハッシュを計算するヘルパー関数"""
+    def _collect_package_entries(self, character_base_path: str) -> list[tuple[str, str]]:
+        """
+        ZIPに含めるファイル/フォルダを (ZIP内のパス, 元のパス) のリストとして収集する。
+        ファイルのコピーは行わず、パッケージ化のルールに従って対象を列挙するだけ。
+        フォルダ自体も (末尾'/'付きのパス, 元のフォルダ) として含める（空フォルダもZIPに残すため）。
+        """
+        entries = []
+        for name in sorted(os.listdir(character_base_path)):
+            src_path = os.path.join(character_base_path, name)
+            # ルートにある許可されたファイル（元の黒塗りなしthumbnail.pngを含む）
+            if os.path.isfile(src_path):
+                if name.lower() in self.ALLOWED_ROOT_FILES:
+                    entries.append((name, src_path))
+                continue
+            if not os.path.isdir(src_path):
+                continue
+
+            entries.append((f"{name}/", src_path))
+            if name in ['events', 'stills']:
+                # events と stills はサブフォルダも含めてすべて
+                for dirpath, dirnames, filenames in os.walk(src_path):
+                    dirnames.sort()
+                    rel_dir = os.path.relpath(dirpath, character_base_path).replace("\\", "/")
+                    if dirpath != src_path:
+                        entries.append((f"{rel_dir}/", dirpath))
+                    for filename in sorted(filenames):
+                        entries.append((f"{rel_dir}/{filename}", os.path.join(dirpath, filename)))
+            else:
+                # それ以外のディレクトリ（衣装、heartsなど）は直下の画像ファイルのみ
+                for filename in sorted(os.listdir(src_path)):
+                    file_path = os.path.join(src_path, filename)
+                    _, ext = os.path.splitext(filename)
+                    if ext.lower() in self.ALLOWED_IMAGE_EXTENSIONS and os.path.isfile(file_path):
+                        entries.append((f"{name}/{filename}", file_path))
+        return entries
+
+    def _build_timestamp(self) -> datetime:
+        """package_info.json / signature.json とZIPエントリに記録する日時。再現可能なビルドでは固定値を使う。"""
+        if not self.reproducible_builds:
+            return datetime.now(timezone.utc)
+        source_date_epoch = os.environ.get('SOURCE_DATE_EPOCH', '').strip()
+        if source_date_epoch.isdigit():
+            return max(datetime.fromtimestamp(int(source_date_epoch), timezone.utc), self.REPRODUCIBLE_EPOCH)
+        return self.REPRODUCIBLE_EPOCH
+
+    def _write_file_to_zip(self, zf: zipfile.ZipFile, src_path: str, arcname: str, date_time: tuple | None = None) -> str:
+        """ファイルを1回だけ読みながらZIPエントリに書き込み、同時にSHA256を計算して返す。"""
         sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256.update(byte_block)
+        zinfo = self.compression_policy.zip_info(src_path, arcname, date_time=date_time)
+        with open(src_path, "rb") as src, zf.open(zinfo, 'w') as dest:
+            for chunk in iter(lambda: src.read(self.STREAM_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+                dest.write(chunk)
         return sha256.hexdigest()
 
-    def _calculate_dir_size(self, directory: str) -> int:
-        """指定されたディレクトリ内の全ファイルサイズの合計を計算する"""
-        total = 0
-        for entry in os.scandir(directory):
-            if entry.is_file():
-                total += entry.stat().st_size
-            elif entry.is_dir():
-                total += self._calculate_dir_size(entry.path)
-        return total
-
-    def _prepare_and_sign_zip(self, project_id: str, zip_base_name: str, source_dir: str, items_to_include: list[str], package_info: dict) -> str:
+    def _prepare_and_sign_zip(self, project_id: str, zip_base_name: str, entries: list[tuple[str, str]], package_info: dict, file_hashes: dict | None = None) -> str:
         """
-        指定されたファイル/ディレクトリ群から署名とパッケージ情報付きのZIPを作成するヘルパー。
-        source_dirからitems_to_includeで指定されたものだけをZIP化する。
+        (ZIP内のパス, 元のパス) のリストから署名とパッケージ情報付きのZIPを作成するヘルパー。
+        各ファイルは一時フォルダにコピーせず、ZIPへ直接書き込む。
+        マニフェストには、ZIPへ書き込んだバイト列から計算したハッシュを常に使う。
+        file_hashes（キャッシュから取得した事前のハッシュ）と食い違ったファイルは、file_hashes を書き込んだ内容の
+        ハッシュに更新する。signature.json はマニフェストを元に最後に書き込む。
+
+        reproducible_builds が有効な場合は、エントリをパス順に並べ、日時・属性を固定し、
+        JSONのキーをソートして、同じ内容からは常に同じバイト列のZIPを作る。
         """
-        package_dir = tempfile.mkdtemp()
+        file_hashes = file_hashes if file_hashes is not None else {}
+        zip_path = f"{zip_base_name}.zip"
+        temp_zip_path = f"{zip_path}.tmp"
+        reproducible = self.reproducible_builds
+        timestamp = self._build_timestamp()
+        # ZIPエントリの日時（None の場合は元ファイルの更新日時）
+        date_time = timestamp.timetuple()[:6] if reproducible else None
+        if reproducible:
+            entries = sorted(entries, key=lambda entry: entry[0])
         try:
-            # 1. パッケージ情報JSONファイルを生成
-            package_info_path = os.path.join(package_dir, 'package_info.json')
-            with open(package_info_path, 'w', encoding='utf-8') as f:
-                json.dump(package_info, f, indent=2, ensure_ascii=False)
-
-            # 2. 指定されたアイテムをパッケージ用ディレクトリにコピー
-            for item_name in items_to_include:
-                src_path = os.path.join(source_dir, item_name)
-                dest_path = os.path.join(package_dir, item_name)
-                if os.path.isdir(src_path):
-                    shutil.copytree(src_path, dest_path)
-                elif os.path.isfile(src_path):
-                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                    shutil.copy2(src_path, dest_path)
-            
-            # 3. パッケージディレクトリ内の全ファイルからマニフェストを作成
             file_manifest = {}
-            for dirpath, _, filenames in os.walk(package_dir):
-                for filename in filenames:
+            with zipfile.ZipFile(temp_zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                # 1. パッケージ情報JSONを書き込む（マニフェストにも含める）
+                package_info_bytes = json.dumps(package_info, indent=2, ensure_ascii=False, sort_keys=reproducible).encode('utf-8')
+                self.compression_policy.writestr(zf, 'package_info.json', package_info_bytes, date_time=date_time)
+                file_manifest['package_info.json'] = hashlib.sha256(package_info_bytes).hexdigest()
+
+                # 2. 対象ファイルをハッシュ計算しながらZIPへ書き込む
+                for arcname, src_path in entries:
+                    if arcname.endswith('/'):
+                        if reproducible:
+                            zinfo = zipfile.ZipInfo(arcname, date_time)
+                            zinfo.external_attr = (0o40755 << 16) | 0x10 # ディレクトリ属性
+                            zinfo.create_system = 3
+                            zf.writestr(zinfo, b'')
+                        else:
+                            zf.write(src_path, arcname)
+                        continue
                     # 署名ファイル自体はマニフェストに含めない
-                    if filename == 'signature.json':
+                    if os.path.basename(arcname) == 'signature.json':
                         continue
-                    full_path = os.path.join(dirpath, filename)
-                    manifest_key = os.path.relpath(full_path, package_dir).replace("\\", "/")
-                    file_manifest[manifest_key] = self._calculate_sha256(full_path)
-
-            # 4. 署名ファイル生成
-            signature_data = {
-                "version": "1.0.0",
-                "generated_by": "cocococo_character_maker",
-                "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                "character_id": project_id,
-                "file_manifest": file_manifest
-            }
-
-            # 署名データ本体をJSON文字列に変換（キーをソートして一貫性を確保）
-            signature_content_str = json.dumps(signature_data, sort_keys=True, separators=(',', ':'))
-
-            # 署名を計算（内容＋ソルトのハッシュ）
-            signature_hash = hashlib.sha256((signature_content_str + self.signature_salt).encode('utf-8')).hexdigest()
-            
-            # 最終的なJSONデータに署を追加
-            signature_data_with_signature = signature_data.copy()
-            signature_data_with_signature["signature"] = signature_hash
-
-            # 署名ファイルを一時フォルダに書き出す
-            signature_file_path = os.path.join(package_dir, 'signature.json')
-            with open(signature_file_path, 'w', encoding='utf-8') as f:
-                json.dump(signature_data_with_signature, f, indent=2)
+                    digest = self._write_file_to_zip(zf, src_path, arcname, date_time=date_time)
+                    if file_hashes.get(arcname, digest) != digest:
+                        print(f"警告: キャッシュのハッシュと書き込んだ内容が一致しません。書き込んだ内容を使います: {arcname}")
+                    file_hashes[arcname] = digest
+                    file_manifest[arcname] = digest
+
+                # 3. 署名ファイル生成
+                signature_data = {
+                    "version": "1.0.0",
+                    "generated_by": "cocococo_character_maker",
+                    "timestamp_utc": timestamp.isoformat(),
+                    "character_id": project_id,
+                    "file_manifest": file_manifest
+                }
+
+                # 署名データ本体をJSON文字列に変換（キーをソートして一貫性を確保）
+                signature_content_str = json.dumps(signature_data, sort_keys=True, separators=(',', ':'))
+
+                # 署名を計算（内容＋ソルトのハッシュ）
+                signature_hash = hashlib.sha256((signature_content_str + self.signature_salt).encode('utf-8')).hexdigest()
+
+                # 最終的なJSONデータに署名を追加
+                signature_data_with_signature = signature_data.copy()
+                signature_data_with_signature["signature"] = signature_hash
+                self.compression_policy.writestr(
+                    zf, 'signature.json', json.dumps(signature_data_with_signature, indent=2, sort_keys=reproducible), date_time=date_time
+                )
 
-            # 5. ZIP化
-            zip_path = shutil.make_archive(base_name=zip_base_name, format='zip', root_dir=package_dir)
+            # 4. 書き込みが完了してから正式なファイル名に置き換える
+            os.replace(temp_zip_path, zip_path)
             return zip_path
         finally:
-            shutil.rmtree(package_dir)
+            if os.path.exists(temp_zip_path):
+                os.remove(temp_zip_path)
+
+    def _build_planned_zips(self, plan: dict, project_id: str, character_zip_dir: str, base_meta: dict, file_hashes: dict) -> list[str]:
+        """PackagePlanner の計画に従ってZIPを作成し、作成したZIPのパスのリストを返す。"""
+        estimated_mb = plan['estimated_total'] / 1024**2
+        if not plan['split']:
+            print(f"推定サイズ ({estimated_mb:.2f}MB) が制限内のため分割しません。")
+            package_info = base_meta.copy()
+            package_info.update({
+                "package_type": "complete",
+                "base_id": project_id
+            })
+            zip_base_name = os.path.join(character_zip_dir, project_id)
+            part = plan['parts'][0]
+            return [self._prepare_and_sign_zip(project_id, zip_base_name, part['entries'], package_info=package_info, file_hashes=file_hashes)]
+
+        parent_part, child_parts = plan['parts'][0], plan['parts'][1:]
+        print(f"推定サイズ ({estimated_mb:.2f}MB) が制限を超えているため、{len(plan['parts'])}個のZIPに分割します。")
+
+        # 親ZIPには子パーツの一覧と、各パーツに含まれるフォルダの一覧を記録する
+        base_package_info = base_meta.copy()
+        base_package_info.update({
+            "package_type": "split",
+            "base_id": project_id,
+            "part_name": "base",
+            "package_role": "parent",
+            "child_parts": [part['part_name'] for part in child_parts],
+            "part_contents": {part['part_name']: part['contents'] for part in plan['parts']}
+        })
+        zip_paths = [self._prepare_and_sign_zip(
+            project_id, os.path.join(character_zip_dir, f"{project_id}_base"),
+            parent_part['entries'], package_info=base_package_info, file_hashes=file_hashes
+        )]
+
+        for part in child_parts:
+            part_package_info = base_meta.copy()
+            part_package_info.update({
+                "package_type": "split",
+                "base_id": project_id,
+                "part_name": part['part_name'],
+                "package_role": "child",
+                "parent_part": "base",
+                "contents": part['contents']
+            })
+            zip_paths.append(self._prepare_and_sign_zip(
+                project_id, os.path.join(character_zip_dir, f"{project_id}_{part['part_name']}"),
+                part['entries'], package_info=part_package_info, file_hashes=file_hashes
+            ))
+        return zip_paths
+
+    def _build_cache_key(self, project_id: str, character_name: str, entries: list[tuple[str, str]], file_hashes: dict) -> str:
+        """
+        ZIPの内容を決めるもの（ファイルのマニフェスト、ID・名前、圧縮方式、分割の上限、署名ソルト）から
+        ビルドキャッシュのキーを作る。
+        """
+        manifest = sorted((arcname, file_hashes.get(arcname)) for arcname, _ in entries)
+        key_source = {
+            'version': self.BUILD_CACHE_VERSION,
+            'project_id': project_id,
+            'character_name': character_name,
+            'timestamp': self._build_timestamp().isoformat(),
+            'compression': self.compression_policy.mode,
+            'limit_bytes': self.ZIP_SIZE_LIMIT_BYTES,
+            'salt': hashlib.sha256(self.signature_salt.encode('utf-8')).hexdigest(),
+            'manifest': manifest,
+        }
+        return hashlib.sha256(json.dumps(key_source, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
 
-    def create_character_zip(self, character_data: CharacterData, character_base_path: str, project_id: str, character_name: str) -> tuple[list[str], str | None]:
+    @staticmethod
+    def _load_build_cache(cache_path: str, build_key: str) -> list[str] | None:
+        """キーが一致し、作成済みのZIPがすべて当時のまま残っていれば、そのパスのリストを返す。"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('key') != build_key or not cache.get('zips'):
+                return None
+            for zip_entry in cache['zips']:
+                st = os.stat(zip_entry['path'])
+                if st.st_size != zip_entry['size'] or st.st_mtime_ns != zip_entry['mtime_ns']:
+                    return None
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return [zip_entry['path'] for zip_entry in cache['zips']]
+
+    @staticmethod
+    def _save_build_cache(cache_path: str, build_key: str, zip_paths: list[str]):
+        cache = {'key': build_key, 'zips': []}
+        temp_path = None
+        try:
+            for zip_path in zip_paths:
+                st = os.stat(zip_path)
+                cache['zips'].append({'path': zip_path, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns})
+            cache_dir = os.path.dirname(cache_path)
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"警告: ビルドキャッシュの保存に失敗しました: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def create_character_zip(self, character_data: CharacterData, character_base_path: str, project_id: str, character_name: str, optimize_images: bool | None = None) -> tuple[list[str], str | None]:
         """
-        キャラクターフォルダをZIP圧縮する。サイズが25MBを超える場合は衣装ごとに分割する。
+        キャラクターフォルダをZIP圧縮する。圧縮後のサイズが上限を超える見込みの場合は、
+        衣装（大きな衣装は画像ファイル単位）を上限以内のパーツに詰め込んで分割する。
         各ZIPにはパッケージ情報(package_info.json)が含まれる。
+        optimize_images が True（None の場合は config.ini の設定）なら、ZIP化の前に画像を可逆に最適化する。
         
         Returns:
             tuple[list[str], str | None]: (作成されたZIPファイルのフルパスのリスト, 黒塗り適用後サムネイルのパス or None)
         """
-        ALLOWED_IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp'}
-        ALLOWED_ROOT_FILES = {'character.ini', 'readme.txt', 'thumbnail.png', 'topics.txt'}
-
         # --- 1. ZIP出力先を準備 ---
         safe_character_name = "".join(c for c in character_name if c.isalnum() or c in " _-").rstrip()
         if not safe_character_name: safe_character_name = project_id
@@ -233,8 +421,9 @@ class GithubUploader:
         source_thumbnail_path = os.path.join(character_base_path, 'thumbnail.png')
         if os.path.exists(source_thumbnail_path):
             try:
-                # 黒塗り適用サムネイルは別名で一時フォルダに保存
-                censored_thumbnail_path = os.path.join(character_zip_dir, 'censored_thumbnail_for_issue.png')
+                # 黒塗り適用サムネイルは別名で出力フォルダに保存する。ZIPと同じくプロジェクトIDを付け、
+                # 同じキャラクター名のプロジェクトを並列に処理しても（batch_package.py）上書きし合わないようにする
+                censored_thumbnail_path = os.path.join(character_zip_dir, f"{project_id}_censored_thumbnail.png")
                 image = Image.open(source_thumbnail_path).convert("RGBA")
                 
                 # 黒塗り修正を適用
@@ -250,144 +439,88 @@ class GithubUploader:
                 print(f"警告: 黒塗りサムネイル生成中にエラーが発生: {e}")
                 censored_thumbnail_path = None
 
+        # --- 3. ZIP対象の全ファイルを列挙する（コピーはしない） ---
+        entries = self._collect_package_entries(character_base_path)
+        costume_ids = [costume['id'] for costume in character_data.get_costumes()]
+
+        if optimize_images is None:
+            optimize_images = self.optimize_images
+        self.last_optimization_report = None
+        if optimize_images:
+            # 元の画像は変更せず、最適化した画像をキャッシュに置いてZIPの参照先を差し替える
+            optimizer = ImageOptimizer(
+                os.path.join(self.zip_output_dir, '.cache', 'images', project_id),
+                max_colors=self.max_palette_colors, max_workers=self.image_optimizer_workers,
+            )
+            entries, self.last_optimization_report = optimizer.optimize_entries(entries)
+            print(ImageOptimizer.format_report(self.last_optimization_report))
 
-        # --- 3. ZIP対象の全ファイルを一時ステージングディレクトリに集める ---
-        staging_dir = tempfile.mkdtemp()
+        # 署名マニフェスト用のハッシュは、前回から変更されたファイルだけを並列に計算する
+        hash_cache = FileHashCache(os.path.join(self.zip_output_dir, '.cache', 'hashes', f"{project_id}.json"))
+        file_hashes = hash_cache.get_hashes({arcname: path for arcname, path in entries if not arcname.endswith('/')})
         try:
-            # ルートにある許可されたファイル（元の黒塗りなしthumbnail.pngを含む）をコピー
-            for filename in os.listdir(character_base_path):
-                if filename.lower() in ALLOWED_ROOT_FILES:
-                    # 元のthumbnail.pngをそのままコピー
-                    shutil.copy2(os.path.join(character_base_path, filename), os.path.join(staging_dir, filename))
-            
-            # 各ディレクトリを処理
-            for dirname in os.listdir(character_base_path):
-                src_dir_path = os.path.join(character_base_path, dirname)
-                if os.path.isdir(src_dir_path):
-                    dest_dir_path = os.path.join(staging_dir, dirname)
-                    
-                    if dirname in ['events', 'stills']:
-                        shutil.copytree(src_dir_path, dest_dir_path)
-                    else:
-                        # それ以外のディレクトリ（衣装、heartsなど）は画像ファイルのみコピー
-                        os.makedirs(dest_dir_path, exist_ok=True)
-                        for filename in os.listdir(src_dir_path):
-                            _, ext = os.path.splitext(filename)
-                            if ext.lower() in ALLOWED_IMAGE_EXTENSIONS:
-                                shutil.copy2(os.path.join(src_dir_path, filename), os.path.join(dest_dir_path, filename))
-
-            # --- 4. 合計サイズを計算し、分割が必要か判断 ---
-            total_size = self._calculate_dir_size(staging_dir)
-            costumes = character_data.get_costumes()
-            should_split = total_size > self.ZIP_SIZE_LIMIT_BYTES and len(costumes) > 1
-            
-            zip_paths = []
-            
-            # --- 5. package_info.json のための共通メタデータを作成 ---
-            base_meta = {
-                "format_version": "1.0",
-                "character_id": project_id,
-                "character_name": character_name,
-                "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                "generated_by": "cocococo_character_maker"
-            }
-
-            if not should_split:
-                print(f"合計サイズ ({total_size / 1024**2:.2f}MB) が制限内か単一衣装のため分割しません。")
-                
-                # 単独ZIP用のパッケージ情報を作成
-                package_info = base_meta.copy()
-                package_info.update({
-                    "package_type": "complete",
-                    "base_id": project_id
-                })
-
-                zip_base_name = os.path.join(character_zip_dir, project_id)
-                # ステージングディレクトリ内の全ファイル(サムネイル含む)をZIP化
-                all_items = os.listdir(staging_dir)
-                zip_path = self._prepare_and_sign_zip(
-                    project_id, zip_base_name, staging_dir, all_items, package_info=package_info
-                )
-                
-                # 単一ZIPでもサイズチェック
-                if os.path.getsize(zip_path) > self.ZIP_SIZE_LIMIT_BYTES:
-                    raise ValueError(
-                        f"ファイルサイズ超過エラー:\n\n"
-                        f"ZIPファイル ({os.path.basename(zip_path)}) が25MBの上限を超えました。\n\n"
-                        "衣装が1つしかないか、合計サイズが小さいためファイルは分割されませんでした。\n"
-                        "キャラクター内の画像サイズを小さくするか、ファイル数を減らしてください。"
-                    )
-                zip_paths.append(zip_path)
-            else:
-                print(f"合計サイズ ({total_size / 1024**2:.2f}MB) が制限を超えているため、衣装ごとにZIPを分割します。")
-                
-                # 1. 親ZIPを作成する前に、どの子ZIP(衣装)が存在するかリストアップする
-                child_part_names = []
-                for costume in costumes:
-                    costume_id = costume['id']
-                    if costume_id != 'default' and os.path.isdir(os.path.join(staging_dir, costume_id)):
-                        child_part_names.append(costume_id)
-
-                # 2. 親となるベースZIPの作成
-                base_items = [f for f in ALLOWED_ROOT_FILES if os.path.exists(os.path.join(staging_dir, f))]
-                if os.path.isdir(os.path.join(staging_dir, 'default')): base_items.append('default')
-                if os.path.isdir(os.path.join(staging_dir, 'hearts')): base_items.append('hearts')
-                if os.path.isdir(os.path.join(staging_dir, 'events')): base_items.append('events')
-                if os.path.isdir(os.path.join(staging_dir, 'stills')): base_items.append('stills')
-                
-                base_package_info = base_meta.copy()
-                base_package_info.update({
-                    "package_type": "split",
-                    "base_id": project_id,
-                    "part_name": "base",
-                    "package_role": "parent",
-                    "child_parts": child_part_names
-                })
-
-                base_zip_name = os.path.join(character_zip_dir, f"{project_id}_base")
-                base_zip_path = self._prepare_and_sign_zip(
-                    project_id, base_zip_name, staging_dir, base_items, package_info=base_package_info
-                )
+            hash_cache.save()
+        except OSError as e:
+            print(f"警告: ハッシュキャッシュの保存に失敗しました: {e}")
+
+        # --- 4. package_info.json のための共通メタデータを作成 ---
+        base_meta = {
+            "format_version": "1.0",
+            "character_id": project_id,
+            "character_name": character_name,
+            "timestamp_utc": self._build_timestamp().isoformat(),
+            "generated_by": "cocococo_character_maker"
+        }
 
-                # ベースZIPのサイズチェック
-                if os.path.getsize(base_zip_path) > self.ZIP_SIZE_LIMIT_BYTES:
-                    raise ValueError(
-                        f"ファイルサイズ超過エラー:\n\n"
-                        f"ベースファイル群 ({os.path.basename(base_zip_path)}) が25MBの上限を超えました。\n\n"
-                        "default衣装やheartsフォルダ内の画像サイズを小さくするか、ファイル数を減らしてください。"
-                    )
-                zip_paths.append(base_zip_path)
-
-                # 3. 子となる衣装ごとのZIP作成
-                for costume_id in child_part_names:
-                    costume_package_info = base_meta.copy()
-                    costume_package_info.update({
-                        "package_type": "split",
-                        "base_id": project_id,
-                        "part_name": costume_id,
-                        "package_role": "child",
-                        "parent_part": "base"
-                    })
-
-                    costume_zip_name = os.path.join(character_zip_dir, f"{project_id}_{costume_id}")
-                    costume_zip_path = self._prepare_and_sign_zip(
-                        project_id, costume_zip_name, staging_dir, [costume_id], package_info=costume_package_info
-                    )
-
-                    if os.path.getsize(costume_zip_path) > self.ZIP_SIZE_LIMIT_BYTES:
-                        raise ValueError(
-                            f"ファイルサイズ超過エラー:\n\n"
-                            f"衣装 '{costume_id}' ({os.path.basename(costume_zip_path)}) が25MBの上限を超えました。\n\n"
-                            "この衣装に含まれる画像サイズを小さくするか、表情の数を減らしてください。"
-                        )
-                    zip_paths.append(costume_zip_path)
-            
-            print(f"作成されたZIPファイル: {zip_paths}")
-            # 戻り値をタプルに変更
-            return zip_paths, censored_thumbnail_path
-        finally:
-            # --- 処理が終わったら、一時フォルダを必ず削除 ---
-            shutil.rmtree(staging_dir)
+        # 前回と同じ内容なら、作成済みのZIPをそのまま使う（キャッシュのハッシュはこの判定にだけ使う）
+        prebuild_hashes = dict(file_hashes)
+        build_key = self._build_cache_key(project_id, character_name, entries, file_hashes) if self.reproducible_builds else None
+        cache_path = os.path.join(self.zip_output_dir, '.cache', 'builds', f"{project_id}.json")
+        if build_key:
+            cached_zip_paths = self._load_build_cache(cache_path, build_key)
+            if cached_zip_paths:
+                print(f"内容が前回から変わっていないため、作成済みのZIPを再利用します: {cached_zip_paths}")
+                return cached_zip_paths, censored_thumbnail_path
+
+        # --- 5. 圧縮後サイズを見積もって分割を計画し、ZIPを作成する ---
+        # 見積もりより実際のZIPが大きくなった場合は、容量を縮めて計画し直す
+        planner = PackagePlanner(self.ZIP_SIZE_LIMIT_BYTES)
+        for attempt in range(1, self.MAX_PLAN_ATTEMPTS + 1):
+            plan = planner.plan(entries, costume_ids)
+            zip_paths = self._build_planned_zips(plan, project_id, character_zip_dir, base_meta, file_hashes)
+
+            oversized = [p for p in zip_paths if os.path.getsize(p) > self.ZIP_SIZE_LIMIT_BYTES]
+            if not oversized:
+                break
+
+            largest = max(os.path.getsize(p) for p in oversized)
+            for zip_path in zip_paths:
+                os.remove(zip_path)
+            if attempt == self.MAX_PLAN_ATTEMPTS:
+                raise ValueError(
+                    f"ファイルサイズ超過エラー:\n\n"
+                    f"ZIPファイルを{self.ZIP_SIZE_LIMIT_BYTES // 1024**2}MBの上限以内に分割できませんでした。\n\n"
+                    "キャラクター内の画像サイズを小さくするか、ファイル数を減らしてください。"
+                    + ("" if optimize_images else
+                       "\n(config.ini の [PACKAGING] に optimize_images = true を設定すると、画像を自動で可逆圧縮します)")
+                )
+            print(f"ZIPが見積もりより大きくなったため ({largest / 1024**2:.2f}MB)、分割を計画し直します。")
+            planner.shrink_capacity(largest)
+
+        # 書き込み中に内容が変わっていたファイルはハッシュキャッシュから外し、次回は計算し直す。
+        # その場合は事前のハッシュで作ったキーが実際の内容と合わないため、ビルドキャッシュも保存しない
+        stale = [arcname for arcname, digest in prebuild_hashes.items() if file_hashes.get(arcname) != digest]
+        if stale:
+            hash_cache.invalidate(stale)
+            try:
+                hash_cache.save()
+            except OSError as e:
+                print(f"警告: ハッシュキャッシュの保存に失敗しました: {e}")
+        elif build_key:
+            self._save_build_cache(cache_path, build_key, zip_paths)
+        print(f"作成されたZIPファイル: {zip_paths}")
+        # 戻り値をタプルに変更
+        return zip_paths, censored_thumbnail_path
 
     def create_issue(self, title: str, body: str, pat: str) -> dict:
         """
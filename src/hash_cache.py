@@ -0,0 +1,97 @@
+# src/hash_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FileHashCache:
+    """
+    ファイルのSHA256を (パス, サイズ, 更新時刻ns) をキーにしてJSONファイルへ保存するキャッシュ。
+    前回から変更されていないファイルは再計算せず、変更されたファイルだけをスレッドプールで並列にハッシュ計算する。
+    """
+    # ハッシュ計算時の読み込み単位
+    READ_CHUNK_SIZE = 1024 * 1024
+    # 更新直後のファイルは、同じ時刻のまま再度書き換えられる可能性があるためキャッシュしない
+    RACY_WINDOW_NS = 2 * 1_000_000_000
+
+    def __init__(self, cache_path: str, max_workers: int | None = None):
+        self.cache_path = cache_path
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 2)
+        # { キー: [サイズ, 更新時刻ns, sha256] }
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.entries = data
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"ハッシュキャッシュを読み込めなかったため作り直します: {e}")
+            self.entries = {}
+
+    def save(self):
+        """キャッシュを一時ファイル経由でアトミックに書き出す。"""
+        cache_dir = os.path.dirname(self.cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, separators=(',', ':'))
+            os.replace(temp_path, self.cache_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def invalidate(self, keys):
+        """指定したキーのキャッシュを破棄し、次回は計算し直すようにする。"""
+        for key in keys:
+            self.entries.pop(key, None)
+
+    @classmethod
+    def calculate_sha256(cls, file_path: str) -> str:
+        """ファイルのSHA256を大きめのバッファで計算する。"""
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.READ_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def get_hashes(self, files: dict[str, str]) -> dict[str, str]:
+        """
+        { キー: ファイルパス } の各ファイルのSHA256を { キー: sha256 } で返す。
+        キャッシュに無い・変更されたファイルだけを並列に計算し、今回指定されなかったキーはキャッシュから除く。
+        """
+        hashes = {}
+        misses = {}
+        stats = {}
+        for key, path in files.items():
+            st = os.stat(path)
+            stats[key] = (st.st_size, st.st_mtime_ns)
+            cached = self.entries.get(key)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                hashes[key] = cached[2]
+            else:
+                misses[key] = path
+
+        if misses:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for key, digest in zip(misses, executor.map(self.calculate_sha256, misses.values())):
+                    hashes[key] = digest
+
+        now_ns = time.time_ns()
+        self.entries = {
+            key: [size, mtime_ns, hashes[key]]
+            for key, (size, mtime_ns) in stats.items()
+            if now_ns - mtime_ns > self.RACY_WINDOW_NS
+        }
+        print(f"ファイルハッシュ: {len(files)}件中 {len(files) - len(misses)}件をキャッシュから取得、{len(misses)}件を計算しました。")
+        return hashes
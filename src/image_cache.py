@@ -0,0 +1,317 @@
+# src/image_cache.py
+
+import hashlib
+import os
+import tempfile
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+
+class PreviewImageEntry:
+    """
+    1枚の画像について、フル解像度の画像と縮小版のピラミッド（ミップマップ）を保持する。
+    縮小版は必要になった時点で1/2ずつ作成する。
+    """
+    # これより小さい縮小版は作らない
+    MIN_LEVEL_SIZE = 128
+    # 直近に作成した表示サイズの画像をいくつ保持するか
+    MAX_SCALED_IMAGES = 2
+
+    def __init__(self, image: Image.Image):
+        self.original = image
+        self.levels = [image]
+        self.scaled_images = OrderedDict()
+
+    @property
+    def nbytes(self) -> int:
+        """保持している画像のおおよそのメモリ使用量（RGBA換算）。"""
+        images = self.levels + list(self.scaled_images.values())
+        return sum(img.width * img.height * 4 for img in images)
+
+    def _level_for(self, width: int, height: int) -> Image.Image:
+        """指定サイズ以上で最も小さい縮小版を返す（無ければ作る）。"""
+        while True:
+            last = self.levels[-1]
+            half_w, half_h = last.width // 2, last.height // 2
+            if half_w < width or half_h < height or max(half_w, half_h) < self.MIN_LEVEL_SIZE:
+                break
+            self.levels.append(last.reduce(2))
+
+        for level in reversed(self.levels):
+            if level.width >= width and level.height >= height:
+                return level
+        return self.original
+
+    def scaled(self, max_width: int, max_height: int) -> Image.Image:
+        """
+        Image.thumbnail と同じく、縦横比を保って (max_width, max_height) に収まる画像を返す。
+        元画像より大きくはしない。戻り値はキャッシュと共有されるため、呼び出し側で変更しないこと。
+        """
+        scale = min(max_width / self.original.width, max_height / self.original.height, 1.0)
+        target = (max(1, round(self.original.width * scale)), max(1, round(self.original.height * scale)))
+        if target == self.original.size:
+            return self.original
+
+        cached = self.scaled_images.get(target)
+        if cached is not None:
+            self.scaled_images.move_to_end(target)
+            return cached
+
+        source = self._level_for(*target)
+        result = source.resize(target, Image.Resampling.LANCZOS)
+        self.scaled_images[target] = result
+        while len(self.scaled_images) > self.MAX_SCALED_IMAGES:
+            self.scaled_images.popitem(last=False)
+        return result
+
+
+class PreviewImageCache:
+    """
+    プレビュー用画像のLRUキャッシュ。キーは (パス, 更新時刻, サイズ) で、
+    ファイルが書き換えられると自動的に別エントリとして読み直される。
+    保持する画像の合計バイト数が上限を超えると、古いものから破棄する。
+    """
+    def __init__(self, max_bytes: int = 192 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _make_key(filepath: str):
+        st = os.stat(filepath)
+        return (os.path.normcase(os.path.abspath(filepath)), st.st_mtime_ns, st.st_size)
+
+    def get(self, filepath: str) -> PreviewImageEntry:
+        """
+        画像のエントリを返す。キャッシュに無ければファイルを読み込む。
+
+        Raises:
+            OSError: ファイルが存在しない、または画像として読み込めない場合。
+        """
+        key = self._make_key(filepath)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        with Image.open(filepath) as img:
+            image = img.convert("RGBA")
+        return self._store(key, PreviewImageEntry(image))
+
+    def put(self, filepath: str, image: Image.Image) -> PreviewImageEntry:
+        """保存直後の画像など、既にメモリ上にある画像をキャッシュに登録する。"""
+        return self._store(self._make_key(filepath), PreviewImageEntry(image))
+
+    def invalidate(self, filepath: str):
+        """指定したファイルのエントリをすべて破棄する。"""
+        path = os.path.normcase(os.path.abspath(filepath))
+        for key in [k for k in self._entries if k[0] == path]:
+            del self._entries[key]
+
+    def trim(self):
+        """縮小版の追加などで増えた分も含めて、上限を超えていれば古いものから破棄する。"""
+        total = sum(entry.nbytes for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            total -= evicted.nbytes
+
+    def _store(self, key, entry: PreviewImageEntry) -> PreviewImageEntry:
+        # 同じファイルの古い版は不要なので破棄する
+        for old_key in [k for k in self._entries if k[0] == key[0]]:
+            del self._entries[old_key]
+        self._entries[key] = entry
+        self.trim()
+        return entry
+
+
+class ThumbnailDiskCache:
+    """
+    縮小済みのサムネイルを (パス, 更新時刻, サイズ, 目標サイズ) のハッシュをファイル名にしたPNGとして保存するキャッシュ。
+    元画像が更新されると別のキーになるため、古いサムネイルは使われなくなり、いずれ削除される。
+
+    合計サイズが上限を超えたら、最後に使われた時刻が古いものから削除する（LRU）。
+    使用順はファイルの更新時刻で管理するため、アプリを再起動しても引き継がれる。
+    ThumbnailLoader のワーカースレッドから使われるため、操作はロックで保護する。
+    """
+    DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+    FILE_SUFFIX = '.png'
+
+    def __init__(self, cache_dir: str, max_bytes: int | None = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes or self.DEFAULT_MAX_BYTES
+        self._lock = threading.Lock()
+        # { キー: サイズ }。先頭ほど古い
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._scan()
+
+    def _scan(self):
+        """起動時に既存のキャッシュファイルを更新時刻順に読み込む。"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        found = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(self.FILE_SUFFIX):
+                st = entry.stat()
+                found.append((st.st_mtime_ns, entry.name[:-len(self.FILE_SUFFIX)], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(key) -> str:
+        """ThumbnailLoader のメモリキャッシュのキーからファイル名を作る。"""
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.FILE_SUFFIX)
+
+    def get(self, key: str) -> Image.Image | None:
+        """キャッシュ済みのサムネイルを返す。無い・壊れている場合はNone。"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self._path(key)
+            try:
+                with Image.open(path) as img:
+                    img.load()
+                    image = img.copy()
+                os.utime(path) # 最後に使った時刻として更新する
+            except Exception as e:
+                print(f"サムネイルキャッシュを読み込めないため作り直します ({path}): {e}")
+                self._total_bytes -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return image
+
+    def put(self, key: str, image: Image.Image):
+        """サムネイルを保存し、上限を超えた分を古いものから削除する。保存に失敗しても表示には影響させない。"""
+        with self._lock:
+            temp_path = None
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    image.save(f, "PNG")
+                size = os.path.getsize(temp_path)
+                os.replace(temp_path, self._path(key))
+            except Exception as e:
+                print(f"サムネイルキャッシュの保存に失敗しました: {e}")
+                if temp_path and os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+class ThumbnailLoader:
+    """
+    画像の読み込みと縮小をワーカースレッドで行い、完成した PIL.Image を after() でメインスレッドへ渡すクラス。
+
+    要求は「スロット」（表示先のラベルなど）ごとに管理し、同じスロットに新しい要求が来た時点で
+    古い要求の結果は破棄される。縮小済みの画像は (パス, 更新時刻, 目標サイズ) をキーにLRUで保持する。
+    PhotoImage の作成はTkの制約上メインスレッドで行う必要があるため、コールバック側で行うこと。
+    disk_cache_dir を指定すると、縮小済みの画像を ThumbnailDiskCache に保存し、次回以降は元画像をデコードせずに済ませる。
+    """
+    def __init__(self, widget: tk.Misc, max_workers: int = 2, max_bytes: int = 64 * 1024 * 1024, disk_cache_dir: str | None = None):
+        self.widget = widget
+        self.max_bytes = max_bytes
+        self.disk_cache = ThumbnailDiskCache(disk_cache_dir) if disk_cache_dir else None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        # スロットごとの最新の要求番号（これと一致しない結果は古いものとして捨てる）
+        self._generations = {}
+
+    def request(self, slot, image_path: str, max_size: tuple[int, int], callback):
+        """
+        image_path の画像を max_size に収まるよう縮小し、callback(image) をメインスレッドで呼び出す。
+        読み込みに失敗した場合は callback(None) を呼ぶ。キャッシュにあれば即座に呼び出す。
+        """
+        generation = self._generations.get(slot, 0) + 1
+        self._generations[slot] = generation
+
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            callback(None)
+            return
+        key = (os.path.normcase(os.path.abspath(image_path)), st.st_mtime_ns, st.st_size, tuple(max_size))
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            callback(cached)
+            return
+
+        self._executor.submit(self._work, slot, generation, key, image_path, max_size, callback)
+
+    def cancel(self, slot=None):
+        """指定スロット（省略時はすべて）の未完了の要求を無効にする。"""
+        slots = [slot] if slot is not None else list(self._generations)
+        for s in slots:
+            self._generations[s] = self._generations.get(s, 0) + 1
+
+    def shutdown(self):
+        """ワーカースレッドを停止する。未着手の要求は破棄される。"""
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _is_current(self, slot, generation) -> bool:
+        return self._generations.get(slot) == generation
+
+    def _work(self, slot, generation, key, image_path, max_size, callback):
+        """ワーカースレッドで実行される。既に古くなった要求なら何もしない。"""
+        if not self._is_current(slot, generation):
+            return
+        try:
+            image = self._load_thumbnail(key, image_path, max_size)
+        except Exception as e:
+            print(f"サムネイル読込エラー ({image_path}): {e}")
+            image = None
+        try:
+            self.widget.after(0, self._deliver, slot, generation, key, image, callback)
+        except (RuntimeError, tk.TclError):
+            # ウィンドウが既に閉じられている
+            pass
+
+    def _load_thumbnail(self, key, image_path, max_size) -> Image.Image:
+        """ディスクキャッシュがあればそれを、無ければ元画像を縮小して返す（ワーカースレッドで実行）。"""
+        disk_key = ThumbnailDiskCache.make_key(key) if self.disk_cache else None
+        if disk_key:
+            image = self.disk_cache.get(disk_key)
+            if image is not None:
+                return image
+
+        with Image.open(image_path) as img:
+            # thumbnail() はJPEGなどでは縮小した状態で読み込むため、全解像度のデコードを避けられる
+            img.thumbnail(max_size, Image.Resampling.LANCZOS)
+            image = img.copy()
+
+        if disk_key:
+            self.disk_cache.put(disk_key, image)
+        return image
+
+    def _deliver(self, slot, generation, key, image, callback):
+        """メインスレッドで実行される。キャッシュへ登録し、最新の要求であればコールバックを呼ぶ。"""
+        if image is not None:
+            self._cache[key] = image
+            self._cache_bytes += image.width * image.height * 4
+            while self._cache_bytes > self.max_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted.width * evicted.height * 4
+        if self._is_current(slot, generation):
+            callback(image)
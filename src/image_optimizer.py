@@ -0,0 +1,259 @@
+# src/image_optimizer.py
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_bit_depth(path: str) -> int:
+    """PNGのIHDRにあるビット深度を返す。PNGでなければ0を返す。"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(25)
+    except OSError:
+        return 0
+    # シグネチャ(8) + チャンクの長さ(4) + 'IHDR'(4) + 幅(4) + 高さ(4) の次の1バイト
+    if len(header) < 25 or not header.startswith(PNG_SIGNATURE) or header[12:16] != b'IHDR':
+        return 0
+    return header[24]
+
+
+def _optimize_image_file(src_path: str, dest_path: str, max_colors: int, convert: bool) -> dict:
+    """
+    1枚の画像をPNGとして可逆に最適化する（ワーカープロセスで実行される）。
+
+    - 最大圧縮 (compress_level=9, optimize) で再エンコードし、テキストやEXIFなどのメタデータは書き出さない。
+    - max_colors > 0 で色数がそれ以下の場合はパレット画像にする。画素が1つでも変わる場合はパレット化しない。
+    - PNGの場合、元より小さくならなければ dest_path には何も書かない。
+
+    Returns:
+        dict: {'written': bool, 'src_size': int, 'out_size': int, 'quantized': bool, 'error': str|None}
+    """
+    src_size = os.path.getsize(src_path)
+    result = {'written': False, 'src_size': src_size, 'out_size': src_size, 'quantized': False, 'error': None}
+    if _png_bit_depth(src_path) > 8:
+        # Pillow は16bit/チャンネルのPNGを8bitに落として読み込むため、再エンコードすると可逆でなくなる
+        result['error'] = "16bit/チャンネルのPNGのため変換しません。"
+        return result
+    try:
+        with Image.open(src_path) as img:
+            if getattr(img, 'n_frames', 1) > 1:
+                result['error'] = "アニメーション画像のため変換しません。"
+                return result
+            img.load()
+            save_params = {'optimize': True, 'compress_level': 9}
+            # 透過色とカラープロファイルは見た目に関わるため残す
+            if 'transparency' in img.info:
+                save_params['transparency'] = img.info['transparency']
+            if img.info.get('icc_profile'):
+                save_params['icc_profile'] = img.info['icc_profile']
+            out_img = img
+
+            if max_colors > 0 and img.mode in ('RGB', 'RGBA', 'LA', 'L'):
+                rgba = img.convert('RGBA')
+                colors = rgba.getcolors(max_colors)
+                if colors is not None:
+                    quantized = rgba.quantize(colors=len(colors), method=Image.Quantize.FASTOCTREE)
+                    # 可逆であることを確認できた場合だけ採用する
+                    if quantized.convert('RGBA').tobytes() == rgba.tobytes():
+                        out_img = quantized
+                        save_params.pop('transparency', None)
+                        result['quantized'] = True
+
+            buffer = io.BytesIO()
+            out_img.save(buffer, 'PNG', **save_params)
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+
+    data = buffer.getvalue()
+    if not convert and len(data) >= src_size:
+        return result
+    with open(dest_path, 'wb') as f:
+        f.write(data)
+    result.update(written=True, out_size=len(data))
+    return result
+
+
+class ImageOptimizer:
+    """
+    ZIP化の前にキャラクターの画像を可逆に最適化するクラス。
+
+    PNGを最大圧縮で再エンコードし（必要ならパレット化）、衣装などのフォルダにあるBMP/GIFはPNGに変換する。
+    events / stills の画像はイベントのJSONから、hearts の画像は character.ini の[FAVORABILITY_HEARTS]からファイル名で
+    参照されるため、形式の変換（改名）は行わない。
+    元ファイルは変更せず、最適化した画像はキャッシュフォルダに置いて、ZIPのエントリの参照先だけを差し替える。
+    結果は (元のパス, サイズ, 更新時刻, 設定) をキーにキャッシュし、変更されていない画像は再処理しない。
+    """
+    OPTIMIZE_EXTENSIONS = {'.png'}
+    CONVERT_EXTENSIONS = {'.bmp', '.gif'}
+    # ファイル名で参照されるため、形式を変換しないフォルダ
+    KEEP_NAME_FOLDERS = {'events', 'stills', 'hearts'}
+    INDEX_FILENAME = 'index.json'
+    # 最適化の処理内容を変えたら上げる（古いキャッシュを使わないため）
+    CACHE_VERSION = 2
+
+    def __init__(self, cache_dir: str, max_colors: int = 0, max_workers: int | None = None):
+        self.cache_dir = cache_dir
+        self.max_colors = max(0, int(max_colors or 0))
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILENAME)
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get('version') == self.CACHE_VERSION:
+                return data.get('entries', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"画像最適化のキャッシュを読み込めなかったため作り直します: {e}")
+        return {}
+
+    def _save_index(self, entries: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.CACHE_VERSION, 'entries': entries}, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _cache_key(self, src_path: str, convert: bool) -> str:
+        st = os.stat(src_path)
+        raw = f"{os.path.abspath(src_path)}|{st.st_size}|{st.st_mtime_ns}|{self.max_colors}|{int(convert)}|{self.CACHE_VERSION}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _plan_jobs(self, entries: list[tuple[str, str]]) -> dict:
+        """最適化する画像を { ZIP内のパス: (元のパス, 変換後のZIP内のパス, 変換するか) } で返す。"""
+        arcnames = {arcname.lower() for arcname, _ in entries}
+        jobs = {}
+        for arcname, src_path in entries:
+            if arcname.endswith('/'):
+                continue
+            stem, ext = os.path.splitext(arcname)
+            ext = ext.lower()
+            folder = arcname.split('/', 1)[0] if '/' in arcname else ''
+            if ext in self.OPTIMIZE_EXTENSIONS:
+                jobs[arcname] = (src_path, arcname, False)
+            elif ext in self.CONVERT_EXTENSIONS and folder not in self.KEEP_NAME_FOLDERS:
+                new_arcname = f"{stem}.png"
+                # 同名のPNGが既にある場合は上書きになってしまうため変換しない
+                if new_arcname.lower() not in arcnames:
+                    jobs[arcname] = (src_path, new_arcname, True)
+        return jobs
+
+    def optimize_entries(self, entries: list[tuple[str, str]]) -> tuple[list[tuple[str, str]], dict]:
+        """
+        (ZIP内のパス, 元のパス) のリストの画像を最適化し、差し替えたエントリのリストとレポートを返す。
+
+        Returns:
+            tuple: (新しいエントリのリスト, レポート)
+                レポートは {'files', 'optimized', 'converted', 'quantized', 'cached', 'bytes_before', 'bytes_after',
+                           'by_folder': {フォルダ名: {'bytes_before', 'bytes_after'}}, 'errors': [(ZIP内のパス, 内容)]}
+        """
+        jobs = self._plan_jobs(entries)
+        index = self._load_index()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        results = {}
+        pending = {}
+        for arcname, (src_path, _, convert) in jobs.items():
+            key = self._cache_key(src_path, convert)
+            cached = index.get(key)
+            out_path = os.path.join(self.cache_dir, f"{key}.png")
+            if cached and (not cached['written'] or os.path.exists(out_path)):
+                results[arcname] = dict(cached, key=key, cached=True)
+            else:
+                pending[arcname] = (key, src_path, out_path, convert)
+
+        if pending:
+            print(f"画像の最適化: {len(jobs)}件中 {len(pending)}件を処理します...")
+            args = [(src_path, out_path, self.max_colors, convert) for _, src_path, out_path, convert in pending.values()]
+            if self.max_workers > 1 and len(pending) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                    outcomes = list(executor.map(_optimize_image_file, *zip(*args)))
+            else:
+                outcomes = [_optimize_image_file(*a) for a in args]
+            for (arcname, (key, _, _, _)), outcome in zip(pending.items(), outcomes):
+                results[arcname] = dict(outcome, key=key, cached=False)
+
+        # --- エントリを差し替え、レポートを作る ---
+        report = {
+            'files': len(jobs), 'optimized': 0, 'converted': 0, 'quantized': 0, 'cached': 0,
+            'bytes_before': 0, 'bytes_after': 0, 'by_folder': {}, 'errors': [],
+        }
+        new_entries = []
+        used_index = {}
+        for arcname, src_path in entries:
+            result = results.get(arcname)
+            if result is None:
+                new_entries.append((arcname, src_path))
+                continue
+            key = result.pop('key')
+            was_cached = result.pop('cached')
+            if not result['error']:
+                # 失敗した画像は次回もう一度試す
+                used_index[key] = result
+            _, new_arcname, convert = jobs[arcname]
+            if result['written']:
+                new_entries.append((new_arcname, os.path.join(self.cache_dir, f"{key}.png")))
+            else:
+                new_entries.append((arcname, src_path))
+
+            folder = arcname.split('/', 1)[0] if '/' in arcname else '(root)'
+            stats = report['by_folder'].setdefault(folder, {'bytes_before': 0, 'bytes_after': 0})
+            stats['bytes_before'] += result['src_size']
+            stats['bytes_after'] += result['out_size']
+            report['bytes_before'] += result['src_size']
+            report['bytes_after'] += result['out_size']
+            report['cached'] += was_cached
+            report['quantized'] += result['quantized']
+            if result['written']:
+                report['converted' if convert else 'optimized'] += 1
+            if result['error']:
+                report['errors'].append((arcname, result['error']))
+
+        # 今回使わなかった最適化済み画像を削除する
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.png') and entry.name[:-4] not in used_index:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+        try:
+            self._save_index(used_index)
+        except OSError as e:
+            print(f"警告: 画像最適化のキャッシュを保存できませんでした: {e}")
+
+        return new_entries, report
+
+    @staticmethod
+    def format_report(report: dict) -> str:
+        """レポートを、フォルダ（衣装）ごとの削減量を含む複数行のテキストにする。"""
+        def mb(n): return n / 1024**2
+        saved = report['bytes_before'] - report['bytes_after']
+        lines = [
+            f"画像の最適化: {report['files']}件 (再圧縮 {report['optimized']}件, PNGへ変換 {report['converted']}件, "
+            f"パレット化 {report['quantized']}件, キャッシュ {report['cached']}件) "
+            f"{mb(report['bytes_before']):.2f}MB → {mb(report['bytes_after']):.2f}MB ({mb(saved):.2f}MB 削減)"
+        ]
+        for folder, stats in sorted(report['by_folder'].items(), key=lambda item: item[1]['bytes_after'] - item[1]['bytes_before']):
+            folder_saved = stats['bytes_before'] - stats['bytes_after']
+            if folder_saved > 0:
+                lines.append(f"  {folder}: {mb(stats['bytes_before']):.2f}MB → {mb(stats['bytes_after']):.2f}MB ({mb(folder_saved):.2f}MB 削減)")
+        for arcname, error in report['errors']:
+            lines.append(f"  スキップ: {arcname} ({error})")
+        return "\n".join(lines)
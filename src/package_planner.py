@@ -0,0 +1,204 @@
+# src/package_planner.py
+
+import os
+import zlib
+
+
+class PackagePlanner:
+    """
+    キャラクターZIPの分割構成を、実際に圧縮する前に計画するクラス。
+
+    ファイルごとの圧縮後サイズを見積もり、フォルダ（衣装など）単位で
+    上限サイズ以内のパーツへ詰め込む（First-Fit Decreasing）。
+    1つのフォルダだけで上限を超える場合は、画像ファイル単位に分けて複数のパーツへ振り分ける。
+    """
+    # 既に圧縮済みで、Deflateでほとんど小さくならない形式
+    ALREADY_COMPRESSED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif'}
+    # 圧縮率の見積もりに使う先頭部分のサイズ
+    SAMPLE_BYTES = 256 * 1024
+    # 親(base)パーツに優先して入れるフォルダ
+    BASE_FOLDERS = ['default', 'hearts', 'events', 'stills']
+    # package_info.json / signature.json 用に確保しておくサイズ
+    PART_RESERVED_BYTES = 8 * 1024
+
+    def __init__(self, limit_bytes: int, margin_ratio: float = 0.97):
+        self.limit_bytes = limit_bytes
+        # 見積もり誤差に備えて、上限より少し小さい容量で計画する
+        self.capacity = int(limit_bytes * margin_ratio)
+
+    def shrink_capacity(self, actual_size: int):
+        """見積もりより実際のZIPが大きかった場合に、計画用の容量を縮める。"""
+        ratio = self.limit_bytes / actual_size if actual_size > 0 else 1.0
+        self.capacity = int(self.capacity * min(ratio, 1.0) * 0.97)
+
+    def estimate_entry_size(self, arcname: str, path: str) -> int:
+        """1エントリ分のZIP内サイズ（ヘッダーとマニフェストの行を含む）を見積もる。"""
+        # ローカルヘッダー + セントラルディレクトリ + データディスクリプタ + signature.json の1行
+        name_len = len(arcname.encode('utf-8'))
+        overhead = 30 + 46 + 16 + name_len * 3 + 80
+        if arcname.endswith('/'):
+            return overhead
+
+        size = os.path.getsize(path)
+        _, ext = os.path.splitext(arcname)
+        if ext.lower() in self.ALREADY_COMPRESSED_EXTENSIONS or size == 0:
+            # Deflateのブロックヘッダー分だけわずかに増えることがある
+            return size + size // 1000 + overhead
+
+        # テキストやBMPは先頭を実際に圧縮してみて圧縮率を見積もる
+        with open(path, 'rb') as f:
+            sample = f.read(self.SAMPLE_BYTES)
+        ratio = len(zlib.compress(sample, 6)) / len(sample)
+        return int(size * ratio) + 64 + overhead
+
+    def plan(self, entries: list[tuple[str, str]], costume_ids: list[str]) -> dict:
+        """
+        (ZIP内のパス, 元のパス) のリストから分割計画を作成する。
+
+        Returns:
+            dict: {
+                'split': bool,
+                'estimated_total': int,
+                'parts': [{'part_name': str, 'contents': [フォルダ名...], 'entries': [...], 'estimated_bytes': int}, ...]
+            }
+            split=True の場合、parts[0] は親パーツ('base')。
+
+        Raises:
+            ValueError: 単一ファイルだけで上限を超えるなど、分割しても収まらない場合。
+        """
+        sizes = {arcname: self.estimate_entry_size(arcname, path) for arcname, path in entries}
+        estimated_total = sum(sizes.values()) + self.PART_RESERVED_BYTES
+
+        if estimated_total <= self.capacity:
+            return {
+                'split': False,
+                'estimated_total': estimated_total,
+                'parts': [{
+                    'part_name': 'complete',
+                    'contents': sorted({arcname.split('/', 1)[0] for arcname, _ in entries if '/' in arcname}),
+                    'entries': list(entries),
+                    'estimated_bytes': estimated_total,
+                }],
+            }
+
+        # --- 1. ルート直下の名前ごとにまとめる ---
+        root_files = []
+        groups = {}
+        for arcname, _ in entries:
+            if '/' not in arcname:
+                root_files.append(arcname)
+            else:
+                groups.setdefault(arcname.split('/', 1)[0], []).append(arcname)
+
+        # --- 2. 詰め込みの単位を作る。容量を超えるフォルダはファイル単位に分解する ---
+        bin_capacity = self.capacity - self.PART_RESERVED_BYTES
+        base_units, pool_units = [], []
+        costume_set = {c for c in costume_ids if c != 'default'}
+        # 衣装以外のフォルダ（default, hearts, events, stills など）は親パーツを優先する
+        ordered_groups = sorted(groups, key=lambda g: (g in costume_set, self._base_order(g), g))
+        for group in ordered_groups:
+            arcnames = groups[group]
+            unit_size = sum(sizes[a] for a in arcnames)
+            target = pool_units if group in costume_set else base_units
+            if unit_size <= bin_capacity:
+                target.append({'group': group, 'whole': True, 'arcnames': arcnames, 'size': unit_size})
+                continue
+            # フォルダのエントリ自体は最初のファイルと同じ単位に入れる
+            dir_arcnames = [a for a in arcnames if a.endswith('/')]
+            for arcname in arcnames:
+                if arcname.endswith('/'):
+                    continue
+                if sizes[arcname] > bin_capacity:
+                    raise ValueError(
+                        f"ファイルサイズ超過エラー:\n\n"
+                        f"ファイル '{arcname}' 単体で上限({self.limit_bytes / 1024**2:.0f}MB)を超えています。\n\n"
+                        "この画像のサイズを小さくしてください。"
+                    )
+                target.append({'group': group, 'whole': False, 'arcnames': [arcname], 'size': sizes[arcname]})
+            if dir_arcnames:
+                target.append({'group': group, 'whole': False, 'arcnames': dir_arcnames,
+                               'size': sum(sizes[a] for a in dir_arcnames)})
+
+        # --- 3. 親パーツ: ルートのファイルは必ず親に入れ、残りの容量にbase系フォルダを詰める ---
+        parent = {'units': [], 'size': sum(sizes[a] for a in root_files)}
+        if parent['size'] > bin_capacity:
+            raise ValueError(
+                f"ファイルサイズ超過エラー:\n\n"
+                f"character.ini などのルートファイルだけで上限({self.limit_bytes / 1024**2:.0f}MB)を超えています。"
+            )
+        for unit in base_units:
+            if parent['size'] + unit['size'] <= bin_capacity:
+                parent['units'].append(unit)
+                parent['size'] += unit['size']
+            else:
+                pool_units.append(unit)
+
+        # --- 4. 残りを大きい順に、入る最初のパーツへ詰める（First-Fit Decreasing） ---
+        bins = [parent]
+        for unit in sorted(pool_units, key=lambda u: u['size'], reverse=True):
+            for b in bins:
+                if b['size'] + unit['size'] <= bin_capacity:
+                    break
+            else:
+                b = {'units': [], 'size': 0}
+                bins.append(b)
+            b['units'].append(unit)
+            b['size'] += unit['size']
+
+        # --- 5. パーツ名を決め、元の並び順を保ったエントリリストに変換する ---
+        parts = []
+        used_names = {'base'}
+        for index, b in enumerate(bins):
+            included = {a for unit in b['units'] for a in unit['arcnames']}
+            # ファイル単位に分解された場合も、親フォルダのエントリは各パーツに含める
+            for arcname in list(included):
+                segments = arcname.rstrip('/').split('/')[:-1]
+                for depth in range(1, len(segments) + 1):
+                    dir_arcname = '/'.join(segments[:depth]) + '/'
+                    if dir_arcname in sizes:
+                        included.add(dir_arcname)
+            if index == 0:
+                included.update(root_files)
+                part_name = 'base'
+            else:
+                part_name = self._name_part(b, groups, used_names, index)
+            used_names.add(part_name)
+
+            contents = []
+            for unit in b['units']:
+                if unit['group'] not in contents:
+                    contents.append(unit['group'])
+            parts.append({
+                'part_name': part_name,
+                'contents': contents,
+                'entries': [(arcname, path) for arcname, path in entries if arcname in included],
+                'estimated_bytes': b['size'] + self.PART_RESERVED_BYTES,
+            })
+
+        return {'split': True, 'estimated_total': estimated_total, 'parts': parts}
+
+    def _base_order(self, group: str) -> int:
+        return self.BASE_FOLDERS.index(group) if group in self.BASE_FOLDERS else len(self.BASE_FOLDERS)
+
+    @staticmethod
+    def _name_part(b: dict, groups: dict, used_names: set, index: int) -> str:
+        """
+        子パーツの名前を決める。
+        1つの衣装だけを丸ごと含むならその衣装ID、1つの衣装の一部だけなら '<衣装ID>_<連番>'、
+        複数のフォルダを含むなら 'part_<連番>' とする。
+        """
+        group_names = {unit['group'] for unit in b['units']}
+        candidate = f"part_{index:02d}"
+        if len(group_names) == 1:
+            group = next(iter(group_names))
+            covered = {a for unit in b['units'] for a in unit['arcnames']}
+            if covered == set(groups[group]):
+                candidate = group
+            else:
+                n = 1
+                while f"{group}_{n}" in used_names:
+                    n += 1
+                candidate = f"{group}_{n}"
+        if candidate in used_names:
+            candidate = f"part_{index:02d}"
+        return candidate
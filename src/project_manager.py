@@ -2,19 +2,36 @@
 
 import os
 import re
+import json
+import tempfile
+import configparser
+
+from .character_data import CharacterData
 
 class ProjectManager:
     """
     キャラクタープロジェクト（フォルダ）の管理を行うクラス。
+
+    一覧表示用のメタデータ（キャラクター名や衣装数など）は characters/.project_index.json に保存し、
+    フォルダの更新時刻や直下のファイルのサイズが変わったプロジェクトだけを読み直す。
     """
+    INDEX_FILENAME = ".project_index.json"
+    # インデックスの形式を変えた場合は上げる（古いインデックスは読み捨てる）
+    INDEX_VERSION = 3
+
     def __init__(self, base_dir: str):
         self.characters_dir = os.path.join(base_dir, "characters")
         os.makedirs(self.characters_dir, exist_ok=True)
+        self.index_path = os.path.join(self.characters_dir, self.INDEX_FILENAME)
+        # { プロジェクトID: {'signature': [...], 'meta': {...}} }（初回の get_project_index で読み込む）
+        self._index = None
 
     def list_projects(self):
         """既存のキャラクタープロジェクトのリストを返します。"""
         try:
-            return sorted([d for d in os.listdir(self.characters_dir) if os.path.isdir(os.path.join(self.characters_dir, d))])
+            # "." で始まるフォルダはインストール中の一時フォルダなどのため除外する
+            return sorted([d for d in os.listdir(self.characters_dir)
+                           if not d.startswith('.') and os.path.isdir(os.path.join(self.characters_dir, d))])
         except FileNotFoundError:
             return []
 
@@ -44,3 +61,130 @@ class ProjectManager:
         os.makedirs(os.path.join(project_path, "stills"))
         
         print(f"プロジェクトフォルダを作成しました: {project_path}")
+
+    def get_project_index(self, full_rescan: bool = False) -> dict[str, dict]:
+        """
+        全プロジェクトのメタデータを { プロジェクトID: メタデータ } で返す（IDの昇順）。
+        前回から変更されていないプロジェクト（_project_signature が同じもの）はインデックスの値をそのまま使う。
+        full_rescan=True の場合はインデックスを使わずに全プロジェクトを読み直す。
+
+        メタデータ: character_name, system_name, costume_count, expression_count,
+                    event_count, total_bytes, thumbnail_path, error（iniの読込エラー時のみ）
+        """
+        if self._index is None:
+            self._index = self._load_index()
+
+        try:
+            entries = sorted(
+                (entry.name, entry.path) for entry in os.scandir(self.characters_dir)
+                if not entry.name.startswith('.') and entry.is_dir()
+            )
+        except FileNotFoundError:
+            entries = []
+
+        new_index = {}
+        rescanned = 0
+        for project_id, project_path in entries:
+            signature = self._project_signature(project_path)
+            cached = None if full_rescan else self._index.get(project_id)
+            if cached and cached.get('signature') == signature:
+                new_index[project_id] = cached
+            else:
+                new_index[project_id] = {'signature': signature, 'meta': self._scan_project(project_path)}
+                rescanned += 1
+
+        if rescanned or new_index.keys() != self._index.keys():
+            print(f"プロジェクト一覧: {len(new_index)}件中 {rescanned}件を読み直しました。")
+            self._index = new_index
+            self._save_index()
+        return {project_id: entry['meta'] for project_id, entry in new_index.items()}
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get('version') == self.INDEX_VERSION:
+                return data.get('projects', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"プロジェクトインデックスを読み込めなかったため作り直します: {e}")
+        return {}
+
+    def _save_index(self):
+        """インデックスを一時ファイル経由でアトミックに書き出す。失敗しても一覧表示には影響させない。"""
+        temp_path = None
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.characters_dir, prefix=self.INDEX_FILENAME, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.INDEX_VERSION, 'projects': self._index}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"プロジェクトインデックスの保存に失敗しました: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _project_signature(project_path: str) -> list:
+        """
+        プロジェクトの変更検知用の値を返す（フォルダ自体と直下のサブフォルダの更新時刻、直下のファイルの更新時刻とサイズ）。
+        サブフォルダの中までは見ないため、同じ名前のまま上書きされた画像は検知できない（get_project_index の full_rescan で読み直す）。
+        """
+        files = []
+        subdirs = []
+        for entry in os.scandir(project_path):
+            if entry.is_dir():
+                subdirs.append([entry.name, entry.stat().st_mtime_ns])
+            else:
+                st = entry.stat()
+                files.append([entry.name, st.st_mtime_ns, st.st_size])
+        files.sort()
+        subdirs.sort()
+        return [os.stat(project_path).st_mtime_ns, files, subdirs]
+
+    @staticmethod
+    def _scan_project(project_path: str) -> dict:
+        """1プロジェクト分のメタデータを集める。CharacterData は読み取り専用で開くため、ファイルは一切書き込まない。"""
+        meta = {
+            'character_name': None,
+            'system_name': None,
+            'costume_count': 0,
+            'expression_count': 0,
+            'event_count': 0,
+            'total_bytes': 0,
+            'thumbnail_path': None,
+        }
+
+        for dirpath, _, filenames in os.walk(project_path):
+            for filename in filenames:
+                try:
+                    meta['total_bytes'] += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+
+        events_dir = os.path.join(project_path, 'events')
+        if os.path.isdir(events_dir):
+            meta['event_count'] = sum(1 for f in os.listdir(events_dir) if f.endswith('.json'))
+
+        for candidate in (os.path.join(project_path, 'thumbnail.png'), os.path.join(project_path, 'default', 'normal_close.png')):
+            if os.path.isfile(candidate):
+                meta['thumbnail_path'] = candidate
+                break
+
+        ini_path = os.path.join(project_path, 'character.ini')
+        if not os.path.exists(ini_path):
+            # 新規作成直後など、まだ一度も保存されていないプロジェクト
+            return meta
+        character_data = CharacterData(os.path.basename(project_path), os.path.dirname(os.path.dirname(project_path)), read_only=True)
+        try:
+            meta['character_name'] = character_data.get('INFO', 'CHARACTER_NAME', fallback=None)
+        except (configparser.Error, UnicodeDecodeError) as e:
+            meta['error'] = f'character.ini の読み込みに失敗しました: {e}'
+            return meta
+
+        meta['system_name'] = character_data.get('INFO', 'SYSTEM_NAME', fallback=None)
+        costumes = character_data.get_costumes()
+        meta['costume_count'] = len(costumes)
+        for costume in costumes:
+            meta['expression_count'] += len(character_data.get_expressions_for_costume(costume['id']))
+        return meta
@@ -4,6 +4,7 @@ import uuid
 import shutil
 import os
 from .tab_base import TabBase
+from ..event_analyzer import EventAnalyzer
 from PIL import Image, ImageTk
 from tkinterdnd2 import DND_FILES
 import datetime
@@ -1126,6 +1127,14 @@ class TabEvents(TabBase):
         self.event_listbox.grid(row=1, column=0, sticky="nsew")
         self.event_listbox.bind("<<ListboxSelect>>", self.on_event_select)
 
+        # 整合性チェック（ジャンプ先やフラグの参照などを保存のたびに検査する）
+        self.event_analyzer = EventAnalyzer(self.character_data.event_store)
+        validation_frame = ttk.Frame(left_pane)
+        validation_frame.grid(row=2, column=0, sticky="ew", pady=(self.app.padding_small, 0))
+        ttk.Button(validation_frame, text="整合性チェック", command=self.show_validation_results).pack(side="left")
+        self.validation_status_label = ttk.Label(validation_frame, text="", font=self.app.font_small)
+        self.validation_status_label.pack(side="left", padx=self.app.padding_small)
+
         # 右ペイン: イベントエディタ
         right_pane = ttk.Frame(self.paned_window, padding=self.app.padding_normal)
         self.paned_window.add(right_pane, weight=3)
@@ -1173,6 +1182,69 @@ class TabEvents(TabBase):
         for event_id in self.character_data.get_event_ids():
             self.event_listbox.insert(tk.END, event_id)
         self.clear_editor()
+        self._update_validation_status()
+
+    def _save_event(self, event_id: str, event_data: dict):
+        """イベントを保存し、整合性チェックの結果を更新する。"""
+        self.character_data.save_event(event_id, event_data)
+        self._update_validation_status()
+
+    def _update_validation_status(self) -> list[dict]:
+        """全イベントを検査し、件数をステータス欄に表示する。検査結果のリストを返す。"""
+        issues = self.event_analyzer.analyze()
+        errors = sum(1 for issue in issues if issue['severity'] == EventAnalyzer.SEVERITY_ERROR)
+        warnings = sum(1 for issue in issues if issue['severity'] == EventAnalyzer.SEVERITY_WARNING)
+        if errors or warnings:
+            self.validation_status_label.config(text=f"エラー {errors}件 / 警告 {warnings}件", foreground="red" if errors else "darkorange")
+        else:
+            self.validation_status_label.config(text="問題は見つかりませんでした", foreground="green")
+        return issues
+
+    def show_validation_results(self):
+        """整合性チェックの結果を一覧表示する。行をダブルクリックすると該当イベントを選択する。"""
+        issues = self._update_validation_status()
+        if not issues:
+            messagebox.showinfo("整合性チェック", "問題は見つかりませんでした。", parent=self)
+            return
+
+        severity_names = {
+            EventAnalyzer.SEVERITY_ERROR: "エラー",
+            EventAnalyzer.SEVERITY_WARNING: "警告",
+            EventAnalyzer.SEVERITY_INFO: "情報",
+        }
+        severity_order = list(severity_names)
+        issues.sort(key=lambda i: (severity_order.index(i['severity']), i['event_id'] or "", i['step'] if i['step'] is not None else -1))
+
+        window = tk.Toplevel(self)
+        window.title("整合性チェックの結果")
+        window.transient(self.winfo_toplevel())
+        frame = ttk.Frame(window, padding=self.app.padding_normal)
+        frame.pack(expand=True, fill="both")
+        frame.rowconfigure(0, weight=1); frame.columnconfigure(0, weight=1)
+
+        tree = ttk.Treeview(frame, columns=("severity", "event", "step", "message"), show="headings")
+        for column, text, width in (("severity", "種類", 60), ("event", "イベント", 120), ("step", "ステップ", 70), ("message", "内容", 480)):
+            tree.heading(column, text=text)
+            tree.column(column, width=width, stretch=(column == "message"))
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+
+        for issue in issues:
+            step_text = f"Step {issue['step'] + 1}" if issue['step'] is not None else "-"
+            tree.insert("", "end", values=(severity_names[issue['severity']], issue['event_id'] or "-", step_text, issue['message']))
+
+        def on_double_click(event=None):
+            selection = tree.selection()
+            if not selection:
+                return
+            event_id = tree.item(selection[0], "values")[1]
+            event_ids = list(self.event_listbox.get(0, tk.END))
+            if event_id in event_ids:
+                self._restore_selection_and_refresh(event_ids.index(event_id))
+                self.event_listbox.see(event_ids.index(event_id))
+        tree.bind("<Double-Button-1>", on_double_click)
 
     def on_event_select(self, event=None):
         if self.is_dialog_open:
@@ -1340,7 +1412,11 @@ class TabEvents(TabBase):
         selected_indices = self.event_listbox.curselection()
         if not selected_indices: return
         event_id = self.event_listbox.get(selected_indices[0])
-        if messagebox.askyesno("確認", f"本当にイベント '{event_id}' を削除しますか？", parent=self):
+        message = f"本当にイベント '{event_id}' を削除しますか？"
+        dependents = self.character_data.get_event_dependents(event_id)
+        if dependents:
+            message += f"\n\n次のイベントがこのイベントの完了を条件にしています:\n{', '.join(dependents)}"
+        if messagebox.askyesno("確認", message, parent=self):
             self.character_data.delete_event(event_id)
             self.load_data()
 
@@ -1362,7 +1438,7 @@ class TabEvents(TabBase):
 
         if dialog.result:
             event_data.setdefault("sequence", []).append(dialog.result)
-            self.character_data.save_event(event_id, event_data)
+            self._save_event(event_id, event_data)
             self.after(20, lambda: self._restore_selection_and_refresh(selected_index))
 
     def edit_command(self):
@@ -1393,7 +1469,7 @@ class TabEvents(TabBase):
 
         if dialog.result:
             event_data["sequence"][command_index] = dialog.result
-            self.character_data.save_event(event_id, event_data)
+            self._save_event(event_id, event_data)
             self.after(20, lambda: self._restore_selection_and_refresh(selected_index))
 
     def delete_command(self):
@@ -1409,7 +1485,7 @@ class TabEvents(TabBase):
 
         command_index = self.sequence_tree.index(selected_item)
         del event_data["sequence"][command_index]
-        self.character_data.save_event(event_id, event_data)
+        self._save_event(event_id, event_data)
         self.on_event_select()
 
     def _move_command(self, direction: int):
@@ -1441,7 +1517,7 @@ class TabEvents(TabBase):
         sequence[current_index], sequence[new_index] = sequence[new_index], sequence[current_index]
         
         # 2. 変更したデータをファイルに保存
-        self.character_data.save_event(event_id, event_data)
+        self._save_event(event_id, event_data)
 
         # 3. Treeviewの表示を更新
         self.on_event_select()
@@ -6,7 +6,12 @@ from tkinterdnd2 import DND_FILES
 from PIL import Image, ImageTk
 import os
 import ast
+import threading
+import platform
+if platform.system() == "Windows": import winsound
 from .tab_base import TabBase
+from ..image_cache import ThumbnailLoader
+from ..voice_audition import VoiceAuditionRenderer
 
 class ExpressionDialog(simpledialog.Dialog):
     def __init__(self, parent, title, initial_id="", initial_name="", id_editable=True):
@@ -140,12 +145,162 @@ class EmotionVoiceSettingDialog(simpledialog.Dialog):
                 final_params[key] = self.normal_params.get(key, self.params_info[key]['default'])
         self.result = final_params
 
+class VoiceAuditionDialog(tk.Toplevel):
+    """
+    現在の衣装の全表情について、同じセリフをそれぞれの音声パラメータでまとめて合成し、聴き比べるウィンドウ。
+    """
+    def __init__(self, parent, editor_instance, engine, speaker_id, expressions):
+        super().__init__(parent)
+        self.editor = editor_instance
+        self.app = editor_instance.app
+        self.character_data = editor_instance.character_data
+        self.engine = engine
+        self.speaker_id = speaker_id
+        self.expressions = expressions
+        self.renderer = VoiceAuditionRenderer(self.app.voice_client, self.app.audio_cache)
+        self.results = {}
+        self.cancel_event = threading.Event()
+        self.stop_playback_event = threading.Event()
+        self.is_rendering = False
+
+        self.title("表情ごとの声を一括試聴")
+        self.transient(parent.winfo_toplevel())
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.create_widgets()
+
+    def create_widgets(self):
+        frame = ttk.Frame(self, padding=self.app.padding_normal)
+        frame.pack(expand=True, fill="both")
+        frame.rowconfigure(1, weight=1); frame.columnconfigure(0, weight=1)
+
+        text_frame = ttk.Frame(frame)
+        text_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, self.app.padding_small))
+        text_frame.columnconfigure(0, weight=1)
+        self.text_entry = ttk.Entry(text_frame, font=self.app.font_normal)
+        self.text_entry.insert(0, "この声で感情を表現します。")
+        self.text_entry.grid(row=0, column=0, sticky="ew", padx=(0, self.app.padding_normal))
+        self.render_button = ttk.Button(text_frame, text="一括生成", command=self.start_render, style="Tab.TButton")
+        self.render_button.grid(row=0, column=1)
+
+        self.tree = ttk.Treeview(frame, columns=("id", "name", "params", "status"), show="headings", style="Expressions.Treeview")
+        for column, text, width in (("id", "英語ID", 100), ("name", "日本語名", 120), ("params", "パラメータ", 320), ("status", "結果", 120)):
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=width, stretch=(column == "params"))
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        scrollbar.grid(row=1, column=1, sticky="ns")
+        self.tree.bind("<Double-1>", lambda e: self.play_selected())
+
+        names = {"speedScale": "話速", "pitchScale": "高さ", "intonationScale": "抑揚", "volumeScale": "音量"}
+        for expr in self.expressions:
+            params_text = ", ".join(f"{names.get(k, k)} {v:.2f}" if isinstance(v, (int, float)) else f"{k} {v}" for k, v in expr['params'].items())
+            self.tree.insert("", "end", iid=expr['id'], values=(expr['id'], expr['name'], params_text, "未生成"))
+
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(self.app.padding_small, 0))
+        self.play_all_button = ttk.Button(button_frame, text="順番に再生", command=self.play_all, style="Tab.TButton")
+        self.play_all_button.pack(side="left")
+        ttk.Button(button_frame, text="選択を再生", command=self.play_selected, style="Tab.TButton").pack(side="left", padx=self.app.padding_small)
+        ttk.Button(button_frame, text="停止", command=self.stop_playback, style="Tab.TButton").pack(side="left")
+        ttk.Button(button_frame, text="閉じる", command=self.on_close, style="Tab.TButton").pack(side="right")
+
+        self.status_label = ttk.Label(frame, text=f"{len(self.expressions)}件の表情を合成できます。", font=self.app.font_small)
+        self.status_label.grid(row=3, column=0, columnspan=2, sticky="w", pady=(self.app.padding_small, 0))
+
+    def start_render(self):
+        text = self.text_entry.get()
+        if not text or self.is_rendering: return
+        self.is_rendering = True
+        self.cancel_event.clear()
+        self.render_button.config(state="disabled", text="生成中...")
+        for expr in self.expressions: self.tree.set(expr['id'], "status", "待機中")
+        self.status_label.config(text="合成しています...")
+        param_sets = {expr['id']: expr['params'] for expr in self.expressions}
+        threading.Thread(target=self._render_worker, args=(text, param_sets), daemon=True).start()
+
+    def _render_worker(self, text, param_sets):
+        rendered = self.renderer.render(
+            self.engine, self.speaker_id, text, param_sets,
+            on_result=lambda result: self._post(self._on_result, result), cancel_event=self.cancel_event,
+        )
+        self._post(self._on_render_finished, rendered)
+
+    def _post(self, callback, *args):
+        # ワーカースレッドからUIを更新するため、メインスレッドに処理を渡す
+        try:
+            self.after(0, callback, *args)
+        except (tk.TclError, RuntimeError):
+            pass # ウィンドウが閉じられた後
+
+    def _on_result(self, result):
+        if not self.winfo_exists(): return
+        self.results[result['label']] = result
+        if result['error']: status = f"失敗: {result['error']}"
+        elif result['cached']: status = "キャッシュ"
+        else: status = f"{result['latency_ms']:.0f} ms"
+        self.tree.set(result['label'], "status", status)
+
+    def _on_render_finished(self, rendered):
+        if not self.winfo_exists(): return
+        self.is_rendering = False
+        self.render_button.config(state="normal", text="一括生成")
+        summary = VoiceAuditionRenderer.summarize(rendered)
+        message = f"{summary['count']}件 (キャッシュ {summary['cached']}件, 失敗 {summary['failed']}件) / 合計 {summary['total_ms'] / 1000:.1f} 秒"
+        if summary['query_ms'] is not None: message += f" / audio_query {summary['query_ms']:.0f} ms"
+        if summary['avg_ms'] is not None:
+            message += f" / synthesis 平均 {summary['avg_ms']:.0f} ms, 中央値 {summary['p50_ms']:.0f} ms, 最大 {summary['max_ms']:.0f} ms"
+        self.status_label.config(text=message)
+        print(f"音声の一括試聴: {message}")
+
+    def _play_sequence(self, labels):
+        if platform.system() != "Windows":
+            messagebox.showinfo("情報", "音声再生はWindows環境でのみサポートされています。", parent=self); return
+        playable = [label for label in labels if self.results.get(label, {}).get('wav')]
+        if not playable:
+            messagebox.showinfo("情報", "再生できる音声がありません。先に「一括生成」を行ってください。", parent=self); return
+        self.stop_playback()
+        self.stop_playback_event.clear()
+        threading.Thread(target=self._playback_worker, args=(playable,), daemon=True).start()
+
+    def _playback_worker(self, labels):
+        for label in labels:
+            if self.stop_playback_event.is_set(): break
+            self._post(self._highlight, label)
+            try: winsound.PlaySound(self.results[label]['wav'], winsound.SND_MEMORY)
+            except Exception as e: print(f"音声の再生に失敗: {e}")
+
+    def _highlight(self, label):
+        if self.winfo_exists() and self.tree.exists(label):
+            self.tree.selection_set(label); self.tree.see(label)
+
+    def play_all(self):
+        self._play_sequence([expr['id'] for expr in self.expressions])
+
+    def play_selected(self):
+        self._play_sequence(list(self.tree.selection()))
+
+    def stop_playback(self):
+        self.stop_playback_event.set()
+        if platform.system() == "Windows":
+            try: winsound.PlaySound(None, winsound.SND_PURGE)
+            except Exception: pass
+
+    def on_close(self):
+        self.cancel_event.set()
+        self.stop_playback()
+        self.destroy()
+
 class TabExpressions(TabBase):
     def __init__(self, parent, editor_instance):
         self.is_standby_separated_mode = False # UIが分離モードかどうかを管理する状態変数
         super().__init__(parent, editor_instance)
 
     def create_widgets(self):
+        # D&Dエリアのプレビュー画像はワーカースレッドで読み込む
+        self.thumbnail_loader = ThumbnailLoader(self)
+        self.bind("<Destroy>", self._on_destroy, add="+")
+
         parent = self.scrollable_frame
         # 左列(リスト)は伸縮、右列(プレビュー)は固定にする
         parent.columnconfigure(0, weight=1)
@@ -170,6 +325,7 @@ class TabExpressions(TabBase):
         ttk.Button(list_button_frame, text="削除", command=self.delete_expression, style="Tab.TButton").pack(side="left", padx=button_padx)
         self.voice_setting_button = ttk.Button(list_button_frame, text="音声設定...", command=self.edit_voice_settings, state="disabled", style="Tab.TButton")
         self.voice_setting_button.pack(side="left", padx=(self.app.padding_normal, 0))
+        ttk.Button(list_button_frame, text="一括試聴...", command=self.open_voice_audition, style="Tab.TButton").pack(side="left", padx=button_padx)
 
         self.separate_standby_button = ttk.Button(list_button_frame, text="待機画像を分離...", command=self.toggle_standby_separation, style="Tab.TButton")
         self.separate_standby_button.pack(side="right")
@@ -314,6 +470,20 @@ class TabExpressions(TabBase):
             self.character_data.set('VOICE_PARAMS', expression_id, str(dialog.result))
             messagebox.showinfo("成功", f"表情 '{expression_id}' の音声パラメータを更新しました。", parent=self.editor)
 
+    def open_voice_audition(self):
+        engine = self.editor.selected_engine.get()
+        speaker_id = self.editor._find_speaker_id(engine, self.editor.selected_speaker.get(), self.editor.selected_style.get())
+        if speaker_id is None:
+            messagebox.showwarning("設定不足", "音声設定タブでエンジン、話者名、スタイルを選択してください。\n（エンジンが起動していない場合は話者リストを取得できません）", parent=self.editor); return
+        normal_params = self.character_data.get_voice_param('normal')
+        expressions = []
+        for item_id in self.tree.get_children():
+            expr_id, expr_name = self.tree.item(item_id, 'values')[:2]
+            expressions.append({'id': expr_id, 'name': expr_name, 'params': self.character_data.get_voice_param(expr_id, fallback=normal_params)})
+        if not expressions:
+            messagebox.showinfo("情報", "表情がありません。", parent=self.editor); return
+        VoiceAuditionDialog(self, self.editor, engine, speaker_id, expressions)
+
     def on_image_drop(self, event, image_type: str):
         selected_item = self.tree.focus()
         if not selected_item: messagebox.showwarning("警告", "画像を登録する表情をリストから選択してください。", parent=self); return
@@ -472,10 +642,12 @@ class TabExpressions(TabBase):
         else:
             label.config(text=text_map[image_type])
         
-        self.after(10, self._process_image_for_label, label, image_path, target_height)
+        # 以前の表情の読み込み要求は、ここで無効になる
+        self.thumbnail_loader.cancel(image_type)
+        self.after(10, self._process_image_for_label, image_type, label, image_path, target_height)
 
 
-    def _process_image_for_label(self, label, image_path, target_height):
+    def _process_image_for_label(self, image_type, label, image_path, target_height):
         parent_frame = label.master
         frame_width = parent_frame.winfo_width()
         
@@ -487,16 +659,27 @@ class TabExpressions(TabBase):
             return
 
         if image_path and os.path.exists(image_path):
-            try:
-                img = Image.open(image_path)
-                img.thumbnail((frame_width - 10, target_height - 10), Image.Resampling.LANCZOS)
-                
-                tk_img = ImageTk.PhotoImage(img)
-                label.image = tk_img
-                label.config(image=tk_img, text="")
-            except Exception as e:
-                label.image = None
-                label.config(image="", text="画像読込\nエラー")
+            # デコードと縮小はワーカースレッドで行い、完了したらメインスレッドで表示する
+            self.thumbnail_loader.request(
+                image_type, image_path, (frame_width - 10, target_height - 10),
+                lambda img: self._show_image_on_label(label, img)
+            )
         else:
             label.image = None
             label.config(image="")
+
+    def _show_image_on_label(self, label, img):
+        """ThumbnailLoaderから受け取った画像をラベルに表示する（メインスレッドで呼ばれる）。"""
+        if not label.winfo_exists():
+            return
+        if img is None:
+            label.image = None
+            label.config(image="", text="画像読込\nエラー")
+            return
+        tk_img = ImageTk.PhotoImage(img)
+        label.image = tk_img
+        label.config(image=tk_img, text="")
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self.thumbnail_loader.shutdown()
@@ -1,14 +1,19 @@
 # src/tabs/tab_favorability.py
 
 import tkinter as tk
-from tkinter import ttk, simpledialog, messagebox
+from tkinter import ttk, simpledialog, messagebox, font
 from tkinterdnd2 import DND_FILES
 from PIL import Image, ImageTk
 import os
 from .tab_base import TabBase
+from ..image_cache import ThumbnailLoader
 
 class DefaultHeartSelector(tk.Toplevel):
-    def __init__(self, parent, default_hearts_dir):
+    """
+    デフォルトのハート画像を選択するダイアログ。
+    画像は1つのCanvas上にグリッド状に描画し、表示範囲に入ったセルだけをバックグラウンドで読み込む。
+    """
+    def __init__(self, parent, default_hearts_dir, thumbnail_loader):
         super().__init__(parent)
         self.app = parent.app
         self.title("デフォルトのハート画像を選択")
@@ -20,34 +25,131 @@ class DefaultHeartSelector(tk.Toplevel):
         self.transient(parent); self.grab_set()
 
         self.selected_filename = None
-        self.image_references = []
+        self.default_hearts_dir = default_hearts_dir
+        self.thumbnail_loader = thumbnail_loader
+
+        # セルのレイアウト
+        self.thumbnail_size = int(self.app.base_font_size * 5)
+        pad = self.app.padding_small
+        line_height = font.Font(font=self.app.font_small).metrics('linespace')
+        self.cell_width = int(self.thumbnail_size * 1.6) + pad * 2
+        self.cell_height = self.thumbnail_size + line_height * 2 + pad * 3
+        self.columns = 0
+
+        # 表示中のセル { インデックス: {'items': [...], 'image_item': id, 'photo': PhotoImage} }
+        self.cells = {}
 
         main_frame = ttk.Frame(self, padding=self.app.padding_normal)
         main_frame.pack(expand=True, fill="both")
-        canvas = tk.Canvas(main_frame)
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-        scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        canvas.pack(side="left", fill="both", expand=True)
+        self.canvas = tk.Canvas(main_frame, highlightthickness=0, cursor="hand2")
+        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=self._on_scrollbar)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
         try:
-            image_files = sorted([f for f in os.listdir(default_hearts_dir) if f.lower().endswith('.png')])
-            thumbnail_size = int(self.app.base_font_size * 5)
-            for i, filename in enumerate(image_files):
-                filepath = os.path.join(default_hearts_dir, filename)
-                img = Image.open(filepath)
-                img.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
-                photo_img = ImageTk.PhotoImage(img)
-                self.image_references.append(photo_img)
-                btn = ttk.Button(scrollable_frame, image=photo_img, text=filename, compound="top", command=lambda f=filename: self.select_and_close(f))
-                btn.grid(row=i // 5, column=i % 5, padx=self.app.padding_small, pady=self.app.padding_small)
+            self.image_files = sorted([f for f in os.listdir(default_hearts_dir) if f.lower().endswith('.png')])
         except Exception as e:
-            ttk.Label(scrollable_frame, text=f"画像の読み込みに失敗しました:\n{e}", font=self.app.font_normal).pack()
+            self.image_files = []
+            self.canvas.create_text(pad, pad, anchor="nw", text=f"画像の読み込みに失敗しました:\n{e}", font=self.app.font_normal)
+
+        self.canvas.bind("<Configure>", lambda e: self._refresh_visible_cells())
+        self.canvas.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.canvas.bind("<Button-4>", self._on_mouse_wheel)
+        self.canvas.bind("<Button-5>", self._on_mouse_wheel)
+        self.bind("<Destroy>", self._on_destroy, add="+")
         self.wait_window()
 
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self._refresh_visible_cells()
+
+    def _on_mouse_wheel(self, event):
+        if event.num == 4: step = -1
+        elif event.num == 5: step = 1
+        else: step = int(-1 * (event.delta / 120)) or (-1 if event.delta > 0 else 1)
+        self.canvas.yview_scroll(step, "units")
+        self._refresh_visible_cells()
+
+    def _refresh_visible_cells(self):
+        """表示範囲（と前後1行）に入ったセルだけを作成し、範囲外に出たセルは破棄する。"""
+        if not self.image_files:
+            return
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        if canvas_width < 2 or canvas_height < 2:
+            return
+
+        columns = max(1, canvas_width // self.cell_width)
+        if columns != self.columns:
+            # 列数が変わったら配置をやり直す
+            self.columns = columns
+            for index in list(self.cells):
+                self._remove_cell(index)
+        rows = (len(self.image_files) + columns - 1) // columns
+        self.canvas.configure(scrollregion=(0, 0, columns * self.cell_width, rows * self.cell_height))
+        self.canvas.configure(yscrollincrement=max(1, self.cell_height // 4))
+
+        top = self.canvas.canvasy(0)
+        first_row = max(0, int(top // self.cell_height) - 1)
+        last_row = min(rows - 1, int((top + canvas_height) // self.cell_height) + 1)
+        visible = {
+            index for index in range(first_row * columns, (last_row + 1) * columns)
+            if index < len(self.image_files)
+        }
+
+        for index in list(self.cells):
+            if index not in visible:
+                self._remove_cell(index)
+        for index in sorted(visible):
+            if index not in self.cells:
+                self._create_cell(index)
+
+    def _create_cell(self, index):
+        filename = self.image_files[index]
+        row, col = divmod(index, self.columns)
+        x0, y0 = col * self.cell_width, row * self.cell_height
+        pad = self.app.padding_small
+        tag = f"cell_{index}"
+
+        frame_item = self.canvas.create_rectangle(
+            x0 + 1, y0 + 1, x0 + self.cell_width - 1, y0 + self.cell_height - 1,
+            outline="#cccccc", fill=self.canvas.cget("background"), tags=(tag,)
+        )
+        image_item = self.canvas.create_image(
+            x0 + self.cell_width / 2, y0 + pad + self.thumbnail_size / 2, anchor="center", tags=(tag,)
+        )
+        text_item = self.canvas.create_text(
+            x0 + self.cell_width / 2, y0 + pad * 2 + self.thumbnail_size, anchor="n",
+            text=filename, width=self.cell_width - pad * 2, font=self.app.font_small, tags=(tag,)
+        )
+        self.canvas.tag_bind(tag, "<Button-1>", lambda e, f=filename: self.select_and_close(f))
+        self.cells[index] = {'items': [frame_item, image_item, text_item], 'image_item': image_item, 'photo': None}
+
+        filepath = os.path.join(self.default_hearts_dir, filename)
+        self.thumbnail_loader.request(
+            ('default_heart', index), filepath, (self.thumbnail_size, self.thumbnail_size),
+            lambda img, i=index: self._on_thumbnail_loaded(i, img)
+        )
+
+    def _remove_cell(self, index):
+        cell = self.cells.pop(index)
+        self.thumbnail_loader.cancel(('default_heart', index))
+        for item in cell['items']:
+            self.canvas.delete(item)
+
+    def _on_thumbnail_loaded(self, index, img):
+        if not self.winfo_exists() or index not in self.cells or img is None:
+            return
+        cell = self.cells[index]
+        cell['photo'] = ImageTk.PhotoImage(img)
+        self.canvas.itemconfig(cell['image_item'], image=cell['photo'])
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            for index in list(self.cells):
+                self.thumbnail_loader.cancel(('default_heart', index))
+
     def select_and_close(self, filename):
         self.selected_filename = filename; self.destroy()
 
@@ -81,6 +183,10 @@ class StageDialog(simpledialog.Dialog):
 
 class TabFavorability(TabBase):
     def create_widgets(self):
+        # ハート画像のプレビューはバックグラウンドで読み込み、縮小版はディスクにもキャッシュする
+        self.thumbnail_loader = ThumbnailLoader(self, disk_cache_dir=os.path.join(self.app.project_manager.characters_dir, ".cache", "thumbnails"))
+        self.bind("<Destroy>", self._on_destroy, add="+")
+
         parent = self.scrollable_frame
         parent.columnconfigure(0, weight=1); parent.columnconfigure(1, weight=1)
         parent.rowconfigure(0, weight=1)
@@ -203,14 +309,22 @@ class TabFavorability(TabBase):
         if os.path.exists(os.path.join(char_hearts_dir, filename)): path_to_load = os.path.join(char_hearts_dir, filename)
         elif os.path.exists(os.path.join(default_hearts_dir, filename)): path_to_load = os.path.join(default_hearts_dir, filename)
         if path_to_load:
-            try:
-                img = Image.open(path_to_load)
-                thumbnail_size = int(self.app.base_font_size * 3)
-                img.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
-                photo_img = ImageTk.PhotoImage(img)
-                self.heart_images[item_id] = photo_img
-                self.hearts_tree.item(item_id, image=photo_img)
-            except Exception as e: print(f"ハートプレビュー読込エラー: {e}")
+            thumbnail_size = int(self.app.base_font_size * 3)
+            self.thumbnail_loader.request(
+                ('heart_row', item_id), path_to_load, (thumbnail_size, thumbnail_size),
+                lambda img: self._on_heart_preview_loaded(item_id, img)
+            )
+
+    def _on_heart_preview_loaded(self, item_id, img):
+        # 読み込み中に行が削除されている場合もあるため確認する
+        if img is None or not self.hearts_tree.exists(item_id): return
+        photo_img = ImageTk.PhotoImage(img)
+        self.heart_images[item_id] = photo_img
+        self.hearts_tree.item(item_id, image=photo_img)
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self.thumbnail_loader.shutdown()
 
     def collect_data(self):
         stages, hearts = [], []
@@ -268,7 +382,7 @@ class TabFavorability(TabBase):
         if not selected_item: messagebox.showwarning("警告", "画像を割り当てる閾値を選択してください。", parent=self); return
         default_hearts_dir = os.path.join(self.app.base_path, "images", "hearts")
         if not os.path.isdir(default_hearts_dir): messagebox.showerror("エラー", f"デフォルトのハート画像フォルダが見つかりません:\n{os.path.abspath(default_hearts_dir)}", parent=self); return
-        dialog = DefaultHeartSelector(self, default_hearts_dir)
+        dialog = DefaultHeartSelector(self, default_hearts_dir, self.thumbnail_loader)
         if dialog.selected_filename:
             values = list(self.hearts_tree.item(selected_item, 'values'))
             values[1] = dialog.selected_filename
@@ -2,8 +2,6 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
-import requests
 import platform
 if platform.system() == "Windows": import winsound
 import ast
@@ -141,28 +139,46 @@ class TabVoiceSettings(TabBase):
             widgets['scale'].set(widgets['info']['default'])
 
     def init_voice_settings(self):
-        threading.Thread(target=self._fetch_speaker_data, args=(self.editor.selected_engine.get(),), daemon=True).start()
-
-    def _fetch_speaker_data(self, engine_name):
-        if not engine_name or engine_name in self.editor.speaker_data_cache:
-            self.editor.after(0, self.update_speaker_list); return
-        urls = {'voicevox': 'http://127.0.0.1:50021/speakers', 'aivisspeech': 'http://127.0.0.1:10101/speakers'}
-        if not (url := urls.get(engine_name)): return
+        self._request_speaker_data(self.editor.selected_engine.get())
+
+    def _request_speaker_data(self, engine_name):
+        """
+        話者リストを要求する。ディスクにキャッシュがあれば即座に表示し、
+        エンジンからの最新の話者リストはバックグラウンドで取得できた時点で反映する。
+        """
+        if not engine_name:
+            self.update_speaker_list(); return
+        cached = self.editor.app.voice_client.get_speakers(
+            engine_name, on_update=lambda speakers: self._on_speakers_fetched(engine_name, speakers)
+        )
+        if cached is not None:
+            self.editor.speaker_data_cache[engine_name] = cached
+        self.update_speaker_list()
+
+    def _on_speakers_fetched(self, engine_name, speakers):
+        # ワーカースレッドから呼ばれるため、UIの更新はメインスレッドで行う
         try:
-            response = requests.get(url, timeout=3)
-            response.raise_for_status()
-            self.editor.speaker_data_cache[engine_name] = response.json()
-        except requests.exceptions.RequestException:
+            self.editor.after(0, self._apply_fetched_speakers, engine_name, speakers)
+        except (tk.TclError, RuntimeError):
+            pass # エディタが閉じられた後
+
+    def _apply_fetched_speakers(self, engine_name, speakers):
+        if speakers is not None:
+            self.editor.speaker_data_cache[engine_name] = speakers
+        elif engine_name not in self.editor.speaker_data_cache:
+            # キャッシュも無く取得にも失敗した
             self.editor.speaker_data_cache[engine_name] = []
-        self.editor.after(0, self.update_speaker_list)
+        if self.editor.selected_engine.get() == engine_name:
+            self.update_speaker_list()
 
     def on_engine_selected(self, event=None):
         engine = self.editor.selected_engine.get()
         self.widgets['speaker_combo'].set(''); self.widgets['style_combo'].set('')
         self.widgets['style_combo']['values'] = []
         if engine not in self.editor.speaker_data_cache:
-            self.widgets['speaker_combo'].config(state="disabled"); self.widgets['speaker_combo'].set("情報取得中...")
-            threading.Thread(target=self._fetch_speaker_data, args=(engine,), daemon=True).start()
+            # 取得に時間がかかることがあるため、話者名に仮の文字列は入れない（そのまま保存されてしまう）
+            self.widgets['speaker_combo'].config(state="disabled")
+            self._request_speaker_data(engine)
         else: self.update_speaker_list()
     
     def update_speaker_list(self):
@@ -171,8 +187,8 @@ class TabVoiceSettings(TabBase):
         combo = self.widgets['speaker_combo']
         
         if speakers is None: 
-            # データ取得中は、コンボボックスを無効化するがテキストはStringVarの値が維持される
-            combo.set("（情報取得中...）")
+            # データ取得中は、コンボボックスを無効化するだけにする。
+            # コンボボックスは selected_speaker と連動しているため、ここで文字列を入れると保存済みの話者名が上書きされてしまう
             combo.config(state="disabled")
             return
             
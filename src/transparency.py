@@ -0,0 +1,353 @@
+# src/transparency.py
+
+import configparser
+import os
+import time
+from collections import OrderedDict
+
+from PIL import Image, ImageColor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class TransparencyAnalyzer:
+    """
+    カラーキー透過 (TRANSPARENCY_MODE = color_key) で、画像がマスコットとして実際にどう表示されるかを計算するクラス。
+
+    表示は次のように再現する。
+    - 完全に透明な画素は透過色(TRANSPARENT_COLOR)、半透明の画素は縁色(EDGE_COLOR)と合成した色になる。
+    - 合成後の色と透過色の差が、どのチャンネルでも許容値(TRANSPARENCY_TOLERANCE)以下の画素がウィンドウから抜ける。
+    - 抜けた領域に接していて、許容値をわずかに超えただけの透過色に近い画素は残り、輪郭のにじみ（ハロー）として見える。
+
+    計算はRGBA配列に対するNumPyのベクトル演算で行う。プレビューでは (画像, 透過色, 縁色) ごとに
+    透過色との距離のヒストグラム、にじみになり得る画素とその許容値の範囲、表示サイズのブロックごとの距離の中央値を
+    一度だけ求めておくため、許容値のスライダーを動かしたときの再計算は表示サイズの配列の比較だけで済む。
+    """
+    AVAILABLE = np is not None
+    # 許容値からこの値以内しか離れていない画素を、にじみの候補とみなす
+    HALO_MARGIN = 48
+    # 抜ける領域から何画素以内（上下左右の距離）をにじみとみなす
+    HALO_RADIUS = 2
+    # 透明な画素からこれ以上離れた半透明の画素は、輪郭のぼかしではないものとみなす
+    MISUSE_EDGE_DISTANCE = 8
+    # ほぼ不透明な画素（ぼかしの内側の裾など）は誤用とみなさない
+    MISUSE_MAX_ALPHA = 224
+    CHECKER_SIZE = 8
+    CHECKER_COLORS = ((204, 204, 204), (255, 255, 255))
+    MAX_BASE_ENTRIES = 4
+    MAX_PREVIEW_ENTRIES = 32
+
+    # 透過設定のセクションごとの既定値 (透過方式, 透過色, 縁色)
+    DEFAULT_SETTINGS = {
+        'INFO': ('color_key', '#ff00ff', '#838383'),
+        'HEART_UI': ('color_key', '#FF00FF', '#000000'),
+    }
+
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("透過プレビューには numpy が必要です。`pip install numpy` を実行してください。")
+        # { (id(画像), 透過色, 縁色): 前計算の結果 }
+        self._bases = OrderedDict()
+        # { (id(画像), 透過色, 縁色, 許容値, 表示サイズ): (プレビュー画像, 統計, 画像) }
+        self._previews = OrderedDict()
+        self._checkers = {}
+
+    @classmethod
+    def read_settings(cls, character_data, section: str = 'INFO') -> tuple[str, str, str]:
+        """キャラクターの[INFO]または[HEART_UI]から (透過方式, 透過色, 縁色) を読む。未設定の項目は既定値にする。"""
+        default_mode, default_trans, default_edge = cls.DEFAULT_SETTINGS[section]
+        return (character_data.get(section, 'TRANSPARENCY_MODE', fallback='') or default_mode,
+                character_data.get(section, 'TRANSPARENT_COLOR', fallback='') or default_trans,
+                character_data.get(section, 'EDGE_COLOR', fallback='') or default_edge)
+
+    @staticmethod
+    def read_tolerance(character_data, config_path: str | None = None) -> int:
+        """
+        透過色の許容値 (TRANSPARENCY_TOLERANCE) を読む。
+        キャラクターの[INFO]、config.ini のいずれかのセクションの順に探し、どこにも無ければ0（完全一致）とする。
+        """
+        value = character_data.get('INFO', 'TRANSPARENCY_TOLERANCE', fallback=None)
+        if value is None and config_path and os.path.exists(config_path):
+            config = configparser.ConfigParser()
+            config.read(config_path, encoding='utf-8')
+            for section in config.sections():
+                if config.has_option(section, 'TRANSPARENCY_TOLERANCE'):
+                    value = config.get(section, 'TRANSPARENCY_TOLERANCE')
+                    break
+        try:
+            return max(0, min(255, int(value)))
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def parse_color(color: str) -> tuple[int, int, int]:
+        """'#rrggbb' や色名を (R, G, B) にする。"""
+        return ImageColor.getrgb(color)[:3]
+
+    @staticmethod
+    def composite(rgba, key_rgb: tuple, edge_rgb: tuple):
+        """RGBA配列 (H, W, 4) を、表示時と同じく縁色・透過色と合成した RGB配列 (H, W, 3) にする。"""
+        alpha = rgba[..., 3]
+        rgb = rgba[..., :3].copy()
+        # 多くの画素は完全に不透明か完全に透明なので、合成の計算は半透明の画素だけに行う
+        partial = np.flatnonzero((alpha > 0) & (alpha < 255))
+        if partial.size:
+            flat = rgb.reshape(-1, 3)
+            a = alpha.ravel()[partial].astype(np.uint32)[:, None]
+            edge = np.array(edge_rgb, dtype=np.uint32)
+            flat[partial] = (flat[partial].astype(np.uint32) * a + edge * (255 - a) + 127) // 255
+        np.copyto(rgb, np.array(key_rgb, dtype=np.uint8), where=(alpha == 0)[..., None])
+        return rgb
+
+    @staticmethod
+    def key_distance(rgb, key_rgb: tuple):
+        """各画素と透過色の差の、チャンネルごとの最大値 (H, W) を返す。"""
+        distance = None
+        for channel, key in enumerate(key_rgb):
+            plane = rgb[..., channel]
+            diff = np.maximum(plane, key) - np.minimum(plane, key)
+            distance = diff if distance is None else np.maximum(distance, diff)
+        return distance.astype(np.uint8)
+
+    @classmethod
+    def neighborhood_min(cls, distance):
+        """各画素から上下左右 HALO_RADIUS 画素以内の、透過色との距離の最小値を返す。"""
+        result = distance
+        for _ in range(cls.HALO_RADIUS):
+            shrunk = result.copy()
+            np.minimum(shrunk[1:, :], result[:-1, :], out=shrunk[1:, :])
+            np.minimum(shrunk[:-1, :], result[1:, :], out=shrunk[:-1, :])
+            np.minimum(shrunk[:, 1:], result[:, :-1], out=shrunk[:, 1:])
+            np.minimum(shrunk[:, :-1], result[:, 1:], out=shrunk[:, :-1])
+            result = shrunk
+        return result
+
+    @staticmethod
+    def near(mask, radius: int):
+        """
+        mask の画素からおよそ radius 画素以内にある画素を真にする（radius 四方のブロック単位で判定する）。
+        正確な距離ではないが、画素単位で radius 回広げるよりはるかに速い。
+        """
+        height, width = mask.shape
+        grid_h, grid_w = -(-height // radius), -(-width // radius)
+        padded = np.zeros((grid_h * radius, grid_w * radius), dtype=bool)
+        padded[:height, :width] = mask
+        cells = padded.reshape(grid_h, radius, grid_w, radius).any(axis=(1, 3))
+        grown = cells.copy()
+        grown[1:, :] |= cells[:-1, :]
+        grown[:-1, :] |= cells[1:, :]
+        cells = grown.copy()
+        grown[:, 1:] |= cells[:, :-1]
+        grown[:, :-1] |= cells[:, 1:]
+        return np.repeat(np.repeat(grown, radius, axis=0), radius, axis=1)[:height, :width]
+
+    @classmethod
+    def analyze_array(cls, rgba, key_rgb: tuple, edge_rgb: tuple, tolerance: int) -> dict:
+        """
+        RGBA配列の透過結果をフル解像度で計算する（キャッシュなし）。
+
+        Returns:
+            dict: {'keyed': 抜ける画素のマスク, 'halo': にじむ画素のマスク, 'distance': 透過色との距離,
+                   'stats': {'pixels', 'keyed', 'halo', 'holes', 'fringe'}}
+                holes は不透明なのに抜けてしまう画素、fringe は縁色と合成される半透明の画素の数。
+        """
+        tolerance = max(0, min(255, int(tolerance)))
+        distance = cls.key_distance(cls.composite(rgba, key_rgb, edge_rgb), key_rgb)
+        alpha = rgba[..., 3]
+        keyed = distance <= tolerance
+        halo = ~keyed & (distance <= min(255, tolerance + cls.HALO_MARGIN)) & (cls.neighborhood_min(distance) <= tolerance)
+        stats = {
+            'pixels': int(keyed.size),
+            'keyed': int(np.count_nonzero(keyed)),
+            'halo': int(np.count_nonzero(halo)),
+            'holes': int(np.count_nonzero(keyed & (alpha == 255))),
+            'fringe': int(np.count_nonzero((alpha > 0) & (alpha < 255))),
+        }
+        return {'keyed': keyed, 'halo': halo, 'distance': distance, 'stats': stats}
+
+    @classmethod
+    def find_issues(cls, rgba, mode: str, key_rgb: tuple, edge_rgb: tuple, tolerance: int) -> dict:
+        """
+        透過方式ごとに、表示が崩れる画素をフル解像度で調べる（一括検査用）。
+
+        - color_key: halo はにじむ画素、holes は不透明なのに抜けてしまう画素、
+          misuse は透明な画素から MISUSE_EDGE_DISTANCE 画素ほど以上離れた、不透明度が MISUSE_MAX_ALPHA 未満の画素
+          （輪郭のぼかしではなく、影や光彩などの半透明の表現。縁色と合成されて不透明になってしまう）。
+        - alpha: halo は色が透過色に近い半透明の画素（透過色の背景で切り抜いた名残りで、輪郭が色づく）、
+          misuse は透過色で塗られたまま不透明になっている画素。holes は無い。
+
+        Returns:
+            dict: {'halo', 'holes', 'misuse': 真偽値マスク,
+                   'stats': {'pixels', 'keyed', 'halo', 'holes', 'misuse', 'fringe'}}
+        """
+        alpha = rgba[..., 3]
+        partial = (alpha > 0) & (alpha < 255)
+        if mode == 'color_key':
+            result = cls.analyze_array(rgba, key_rgb, edge_rgb, tolerance)
+            halo, holes = result['halo'], result['keyed'] & (alpha == 255)
+            misuse = (alpha > 0) & (alpha < cls.MISUSE_MAX_ALPHA) & ~cls.near(alpha == 0, cls.MISUSE_EDGE_DISTANCE)
+            keyed = result['stats']['keyed']
+        else:
+            tolerance = max(0, min(255, int(tolerance)))
+            distance = cls.key_distance(rgba[..., :3], key_rgb)
+            halo = partial & (distance <= min(255, tolerance + cls.HALO_MARGIN))
+            holes = np.zeros(alpha.shape, dtype=bool)
+            misuse = (alpha == 255) & (distance <= tolerance)
+            keyed = int(np.count_nonzero(alpha == 0))
+        stats = {
+            'pixels': int(alpha.size),
+            'keyed': keyed,
+            'halo': int(np.count_nonzero(halo)),
+            'holes': int(np.count_nonzero(holes)),
+            'misuse': int(np.count_nonzero(misuse)),
+            'fringe': int(np.count_nonzero(partial)),
+        }
+        return {'halo': halo, 'holes': holes, 'misuse': misuse, 'stats': stats}
+
+    def _get_base(self, image: Image.Image, key_rgb: tuple, edge_rgb: tuple) -> dict:
+        """許容値に依存しない前計算を行い、キャッシュする。"""
+        key = (id(image), key_rgb, edge_rgb)
+        base = self._bases.get(key)
+        # id() は画像が破棄されると再利用されるため、同じオブジェクトかどうかも確かめる
+        if base is not None and base['image'] is image:
+            self._bases.move_to_end(key)
+            return base
+
+        rgba = np.asarray(image if image.mode == "RGBA" else image.convert("RGBA"))
+        alpha = rgba[..., 3]
+        distance = self.key_distance(self.composite(rgba, key_rgb, edge_rgb), key_rgb)
+        nearest = self.neighborhood_min(distance)
+        # にじみになるのは「近くの画素が抜け (nearest <= 許容値)、自分は抜けず (distance > 許容値)、
+        # 許容値との差が HALO_MARGIN 以内」の場合なので、画素ごとに該当する許容値の範囲 [lo, hi] が決まる
+        candidates = np.flatnonzero(nearest < distance)
+        cand_distance = distance.ravel()[candidates].astype(np.int16)
+        base = {
+            'image': image,
+            'shape': distance.shape,
+            'distance': distance,
+            # 許容値ごとの画素数は累積ヒストグラムから求める
+            'keyed_cumsum': np.cumsum(np.bincount(distance.ravel(), minlength=256)),
+            'holes_cumsum': np.cumsum(np.bincount(distance[alpha == 255], minlength=256)),
+            'fringe': int(np.count_nonzero((alpha > 0) & (alpha < 255))),
+            'candidates': candidates,
+            'cand_lo': np.maximum(nearest.ravel()[candidates].astype(np.int16), cand_distance - self.HALO_MARGIN),
+            'cand_hi': cand_distance - 1,
+            'grids': {},
+        }
+        self._bases[key] = base
+        while len(self._bases) > self.MAX_BASE_ENTRIES:
+            self._bases.popitem(last=False)
+        return base
+
+    def _get_grid(self, base: dict, size: tuple) -> dict:
+        """
+        フル解像度の画素を表示サイズのブロックにまとめる前計算。
+        ブロックの距離の中央値が許容値以下なら、そのブロックの過半数が抜けるものとして表示する。
+        """
+        grid = base['grids'].get(size)
+        if grid is not None:
+            return grid
+        height, width = base['shape']
+        target_w, target_h = size
+        fy, fx = max(1, -(-height // target_h)), max(1, -(-width // target_w))
+        grid_h, grid_w = -(-height // fy), -(-width // fx)
+        if fy == 1 and fx == 1:
+            median = base['distance']
+        else:
+            # 端の余りは「抜けない」側に数える
+            padded = np.full((grid_h * fy, grid_w * fx), 255, dtype=np.uint8)
+            padded[:height, :width] = base['distance']
+            blocks = padded.reshape(grid_h, fy, grid_w, fx).transpose(0, 2, 1, 3).reshape(grid_h, grid_w, fy * fx)
+            k = (fy * fx - 1) // 2
+            median = np.partition(blocks, k, axis=2)[..., k]
+        ys, xs = np.divmod(base['candidates'], width)
+        grid = {
+            'shape': (grid_h, grid_w),
+            'median': median,
+            'cand_cells': (ys // fy) * grid_w + xs // fx,
+        }
+        base['grids'] = {size: grid}
+        return grid
+
+    @staticmethod
+    def _fit(mask, size: tuple):
+        """ブロック単位のマスクを、表示サイズ (幅, 高さ) にちょうど合わせる。"""
+        if mask.shape == (size[1], size[0]):
+            return mask
+        resized = Image.fromarray(mask.astype(np.uint8) * 255, "L").resize(size, Image.Resampling.NEAREST)
+        return np.asarray(resized) > 127
+
+    def _checker(self, size: tuple):
+        checker = self._checkers.get(size)
+        if checker is None:
+            ys, xs = np.indices((size[1], size[0]))
+            pattern = ((ys // self.CHECKER_SIZE + xs // self.CHECKER_SIZE) % 2).astype(bool)
+            checker = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            checker[~pattern] = self.CHECKER_COLORS[0]
+            checker[pattern] = self.CHECKER_COLORS[1]
+            self._checkers = {size: checker}
+        return checker
+
+    @staticmethod
+    def halo_color(key_rgb: tuple) -> tuple:
+        """にじみの強調表示に使う、透過色の反対色。"""
+        return tuple(255 - c for c in key_rgb)
+
+    def render_preview(self, image: Image.Image, key_rgb: tuple, edge_rgb: tuple, tolerance: int, display_image: Image.Image | None = None) -> tuple[Image.Image, dict]:
+        """
+        抜ける領域を市松模様、にじむ画素を透過色の反対色で塗ったプレビュー画像を返す。
+        にじみは1画素でも含む表示ブロックを塗るため、縮小表示でも細い輪郭のにじみが消えない。
+
+        Args:
+            image: フル解像度の画像。判定はこの解像度で行う。
+            display_image: 表示用に縮小済みの image（省略時は image をそのまま使う）。戻り値はこのサイズになる。
+
+        Returns:
+            tuple: (RGBのプレビュー画像, 統計)。統計は analyze_array() の stats に 'elapsed_ms' と 'cached' を加えたもの。
+        """
+        display_image = display_image if display_image is not None else image
+        tolerance = max(0, min(255, int(tolerance)))
+        size = display_image.size
+        cache_key = (id(image), key_rgb, edge_rgb, tolerance, size)
+        cached = self._previews.get(cache_key)
+        if cached is not None and cached[2] is image:
+            self._previews.move_to_end(cache_key)
+            return cached[0], dict(cached[1], cached=True)
+
+        started = time.perf_counter()
+        base = self._get_base(image, key_rgb, edge_rgb)
+        grid = self._get_grid(base, size)
+
+        halo_selected = (base['cand_lo'] <= tolerance) & (tolerance <= base['cand_hi'])
+        halo_cells = np.zeros(grid['shape'][0] * grid['shape'][1], dtype=bool)
+        halo_cells[grid['cand_cells'][halo_selected]] = True
+        keyed = self._fit(grid['median'] <= tolerance, size)
+        halo = self._fit(halo_cells.reshape(grid['shape']), size)
+
+        if 'display_rgb' not in grid:
+            display_rgba = np.asarray(display_image if display_image.mode == "RGBA" else display_image.convert("RGBA"))
+            grid['display_rgb'] = self.composite(display_rgba, key_rgb, edge_rgb)
+        out = grid['display_rgb'].copy()
+        out[keyed] = self._checker(size)[keyed]
+        out[halo] = self.halo_color(key_rgb)
+
+        stats = {
+            'pixels': int(base['shape'][0] * base['shape'][1]),
+            'keyed': int(base['keyed_cumsum'][tolerance]),
+            'halo': int(np.count_nonzero(halo_selected)),
+            'holes': int(base['holes_cumsum'][tolerance]),
+            'fringe': base['fringe'],
+            'elapsed_ms': (time.perf_counter() - started) * 1000,
+        }
+        preview = Image.fromarray(out, "RGB")
+        self._previews[cache_key] = (preview, stats, image)
+        while len(self._previews) > self.MAX_PREVIEW_ENTRIES:
+            self._previews.popitem(last=False)
+        return preview, dict(stats, cached=False)
+
+    def clear(self):
+        self._bases.clear()
+        self._previews.clear()
@@ -0,0 +1,326 @@
+# src/trigger_engine.py
+
+import bisect
+import datetime
+import heapq
+import random
+
+
+class TriggerEngine:
+    """
+    イベントの発生条件（triggers: 条件グループのOR、グループ内はAND）を判定するエンジン。
+
+    各条件は読み込み時に一度だけ解析し、値を変換済みの関数（述語）にコンパイルする。
+    また、イベントを「監視している状態」（フラグ名、好感度の閾値、他イベントの完了、時計）で索引化し、
+    状態が変わったときは影響を受けるイベントだけを再判定する。
+    好感度の閾値はソート済みのリストで持ち、変化前後の値の間にある閾値を持つイベントだけを対象にする。
+
+    判定の前提（本体アプリの挙動に合わせた解釈）:
+      - triggers が空のイベントは自動では発生しない。
+      - repeatable でないイベントは一度完了したら発生しない。repeatable なら cooldown の経過後に再び発生できる。
+      - フラグの値は数値として解釈できれば数値、できなければ文字列として比較する。
+    """
+    CLOCK = 'clock'
+    DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+    def __init__(self, events: dict[str, dict]):
+        self.favorability = 0
+        self.flags = {}
+        # { イベントID: 最後に完了した日時 }
+        self.completed = {}
+        self.now = datetime.datetime.now()
+        # 条件の判定回数（ベンチマーク用）
+        self.evaluation_count = 0
+        # コンパイルできなかった条件 [(イベントID, 条件, 理由)]
+        self.compile_errors = []
+
+        # { イベントID: {'groups': [[述語, ...], ...], 'repeatable': bool, 'cooldown': timedelta} }
+        self._compiled = {}
+        # { 監視キー: {イベントID, ...} }  監視キーは ('flag', 名前) / ('event', ID) / CLOCK
+        self._watchers = {}
+        # 好感度の閾値 [(閾値, イベントID)]（ソート済み）と、bisect 用の閾値だけのリスト
+        self._favorability_thresholds = []
+        self._favorability_keys = []
+        for event_id, event_data in events.items():
+            self._add_event(event_id, event_data)
+        self._favorability_thresholds.sort()
+        self._favorability_keys = [t for t, _ in self._favorability_thresholds]
+
+    # --- 値の解析 ---
+
+    @classmethod
+    def parse_duration(cls, text: str) -> datetime.timedelta:
+        """'30m', '24h', '1d' のような期間の文字列を timedelta に変換する。単位が無ければ秒とみなす。"""
+        text = str(text).strip().lower()
+        if not text:
+            raise ValueError("期間が空です。")
+        unit = text[-1]
+        if unit in cls.DURATION_UNITS:
+            return datetime.timedelta(seconds=float(text[:-1]) * cls.DURATION_UNITS[unit])
+        return datetime.timedelta(seconds=float(text))
+
+    @staticmethod
+    def _to_number(value):
+        """数値として解釈できれば数値を、できなければNoneを返す。"""
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        return int(number) if number.is_integer() else number
+
+    @classmethod
+    def _flag_equals(cls, actual, expected: str) -> bool:
+        actual_number, expected_number = cls._to_number(actual), cls._to_number(expected)
+        if actual_number is not None and expected_number is not None:
+            return actual_number == expected_number
+        return str(actual) == str(expected)
+
+    # --- コンパイル ---
+
+    def compile_condition(self, cond: dict):
+        """
+        1つの条件を (述語, 監視キーのリスト, 好感度の閾値またはNone) に変換する。
+
+        Raises:
+            ValueError: 条件の種類や値が不正な場合。
+        """
+        cond_type = cond.get('type')
+        value = cond.get('value', '')
+
+        if cond_type in ('favorability_above', 'favorability_below'):
+            threshold = float(value)
+            if cond_type == 'favorability_above':
+                return (lambda s: s.favorability >= threshold), [], threshold
+            return (lambda s: s.favorability <= threshold), [], threshold
+
+        if cond_type and cond_type.startswith('flag_'):
+            flag = cond.get('flag', '')
+            if not flag:
+                raise ValueError("フラグ名が空です。")
+            keys = [('flag', flag)]
+            if cond_type == 'flag_exists':
+                return (lambda s: flag in s.flags), keys, None
+            if cond_type == 'flag_not_exists':
+                return (lambda s: flag not in s.flags), keys, None
+            if cond_type == 'flag_equals':
+                return (lambda s: flag in s.flags and self._flag_equals(s.flags[flag], value)), keys, None
+            if cond_type == 'flag_not_equals':
+                return (lambda s: not (flag in s.flags and self._flag_equals(s.flags[flag], value))), keys, None
+            number = self._to_number(value)
+            if number is None:
+                raise ValueError(f"フラグの比較値が数値ではありません: {value}")
+            if cond_type == 'flag_above':
+                return (lambda s: self._to_number(s.flags.get(flag)) is not None and self._to_number(s.flags[flag]) > number), keys, None
+            if cond_type == 'flag_below':
+                return (lambda s: self._to_number(s.flags.get(flag)) is not None and self._to_number(s.flags[flag]) < number), keys, None
+
+        if cond_type in ('event_completed', 'event_completed_after'):
+            event_id = cond.get('event_id', '')
+            keys = [('event', event_id)]
+            if cond_type == 'event_completed':
+                return (lambda s: event_id in s.completed), keys, None
+            duration = self.parse_duration(cond.get('duration', '24h'))
+            return (lambda s: event_id in s.completed and s.now - s.completed[event_id] >= duration), keys + [self.CLOCK], None
+
+        if cond_type in ('date_equals', 'date_after', 'date_before'):
+            date = datetime.datetime.strptime(cond.get('date', ''), "%Y/%m/%d").date()
+            compare = {'date_equals': lambda d: d == date, 'date_after': lambda d: d >= date, 'date_before': lambda d: d <= date}[cond_type]
+            return (lambda s: compare(s.now.date())), [self.CLOCK], None
+
+        if cond_type in ('time_equals', 'time_after', 'time_before'):
+            time_of_day = datetime.datetime.strptime(cond.get('time', ''), "%H:%M").time()
+            compare = {'time_equals': lambda t: t == time_of_day, 'time_after': lambda t: t >= time_of_day, 'time_before': lambda t: t <= time_of_day}[cond_type]
+            return (lambda s: compare(s.now.time().replace(second=0, microsecond=0))), [self.CLOCK], None
+
+        raise ValueError(f"不明な条件の種類です: {cond_type}")
+
+    def _watch(self, key, event_id: str):
+        self._watchers.setdefault(key, set()).add(event_id)
+
+    def _add_event(self, event_id: str, event_data: dict):
+        triggers = event_data.get('triggers')
+        if triggers is None and isinstance(event_data.get('trigger'), dict):
+            # 古い形式（単一の trigger）
+            trigger = event_data['trigger']
+            triggers = [[trigger]] if trigger.get('type') != 'none' else []
+
+        groups = []
+        for group in triggers or []:
+            predicates = []
+            for cond in group:
+                try:
+                    predicate, keys, threshold = self.compile_condition(cond)
+                except (ValueError, TypeError) as e:
+                    self.compile_errors.append((event_id, cond, str(e)))
+                    # 解釈できない条件を含むグループは成立しない
+                    predicates = None
+                    break
+                predicates.append(predicate)
+                for key in keys:
+                    self._watch(key, event_id)
+                if threshold is not None:
+                    self._favorability_thresholds.append((threshold, event_id))
+            if predicates:
+                groups.append(predicates)
+
+        try:
+            cooldown = self.parse_duration(event_data.get('cooldown') or '0')
+        except ValueError:
+            cooldown = datetime.timedelta(0)
+        repeatable = bool(event_data.get('repeatable', False))
+        self._compiled[event_id] = {'groups': groups, 'repeatable': repeatable, 'cooldown': cooldown}
+        # 自分自身の完了で発生できなくなる。繰り返し可能なら時計が進んだとき（クールダウンの経過後）に再び発生できる
+        self._watch(('event', event_id), event_id)
+        if repeatable:
+            self._watch(self.CLOCK, event_id)
+
+    # --- 判定 ---
+
+    def evaluate(self, event_id: str) -> bool:
+        """現在の状態でイベントが発生できるかを判定する。"""
+        compiled = self._compiled.get(event_id)
+        if not compiled or not compiled['groups']:
+            return False
+        last_completed = self.completed.get(event_id)
+        if last_completed is not None:
+            if not compiled['repeatable'] or self.now - last_completed < compiled['cooldown']:
+                return False
+        self.evaluation_count += 1
+        return any(all(predicate(self) for predicate in group) for group in compiled['groups'])
+
+    def firable_events(self) -> list[str]:
+        """全イベントを判定し、発生できるイベントIDのリストを返す（初期状態の確認用）。"""
+        return [event_id for event_id in sorted(self._compiled) if self.evaluate(event_id)]
+
+    def _firable_among(self, event_ids) -> list[str]:
+        return [event_id for event_id in sorted(event_ids) if self.evaluate(event_id)]
+
+    # --- 状態の変更（影響を受けるイベントのうち、発生できるものを返す） ---
+
+    def set_favorability(self, value: float) -> list[str]:
+        old, self.favorability = self.favorability, value
+        low, high = min(old, value), max(old, value)
+        # [low, high] の範囲にある閾値だけが、判定結果が変わり得る
+        start = bisect.bisect_left(self._favorability_keys, low)
+        end = bisect.bisect_right(self._favorability_keys, high)
+        affected = {event_id for _, event_id in self._favorability_thresholds[start:end]}
+        return self._firable_among(affected)
+
+    def set_flag(self, flag: str, value=None) -> list[str]:
+        """フラグを設定する。value が None ならフラグを削除する。"""
+        if value is None:
+            self.flags.pop(flag, None)
+        else:
+            self.flags[flag] = value
+        return self._firable_among(self._watchers.get(('flag', flag), ()))
+
+    def apply_set_flag(self, params: dict) -> list[str]:
+        """set_flag コマンドのパラメータ（flag, operator, value）を適用する。"""
+        flag = params.get('flag', '')
+        if not flag:
+            return []
+        operator, value = params.get('operator', '='), params.get('value', '1')
+        if operator in ('+', '-'):
+            current = self._to_number(self.flags.get(flag, 0)) or 0
+            delta = self._to_number(value) or 0
+            value = current + delta if operator == '+' else current - delta
+        return self.set_flag(flag, value)
+
+    def complete_event(self, event_id: str) -> list[str]:
+        self.completed[event_id] = self.now
+        return self._firable_among(self._watchers.get(('event', event_id), ()))
+
+    def advance_clock(self, now: datetime.datetime) -> list[str]:
+        self.now = now
+        return self._firable_among(self._watchers.get(self.CLOCK, ()))
+
+
+class TriggerSimulator:
+    """
+    好感度・フラグ・時刻の変化を並べたタイムラインを再生し、どのイベントがいつ発生するかを記録するクラス。
+    発生したイベントは完了扱いにし、シーケンス内の set_flag / set_favorability を適用する
+    （分岐や選択肢は考慮せず、すべてのコマンドが実行されたものとみなす）。
+    無限の連鎖を防ぐため、同じイベントは1ステップにつき1回までしか発生させない。
+
+    各ステップでは「全イベントをID順に判定して発生させる」巡回を、発生するイベントが無くなるまで繰り返すのと
+    同じ結果になるように、判定の対象を状態変化の影響を受けたイベントだけに絞る。
+    巡回の途中で発生したイベントの影響を受けたイベントは、まだ巡回していない（IDが後ろの）ものは同じ巡回で、
+    巡回済みのものは次の巡回で判定する。
+    """
+
+    def __init__(self, events: dict[str, dict], engine: TriggerEngine | None = None):
+        self.events = events
+        self.engine = engine or TriggerEngine(events)
+
+    def _fire(self, event_id: str) -> set[str]:
+        """イベントを発生させ、その影響で再判定が必要になったイベントIDを返す。"""
+        engine = self.engine
+        candidates = set(engine.complete_event(event_id))
+        for command in self.events.get(event_id, {}).get('sequence') or []:
+            params = command.get('params') or {}
+            if command.get('type') == 'set_flag':
+                candidates.update(engine.apply_set_flag(params))
+            elif command.get('type') == 'set_favorability':
+                change = engine._to_number(str(params.get('change', '0')).replace('+', ''))
+                if change:
+                    candidates.update(engine.set_favorability(engine.favorability + change))
+        return candidates
+
+    def run(self, timeline: list[dict]) -> list[dict]:
+        """
+        タイムラインを再生する。各要素は {'time': datetime, 'favorability': 数値(任意), 'flags': {名前: 値}(任意)}。
+
+        Returns:
+            list[dict]: 発生したイベントの記録 [{'time': datetime, 'event_id': str, 'favorability': 数値}]
+        """
+        engine = self.engine
+        fired = []
+        for step_index, step in enumerate(timeline):
+            candidates = set(engine.advance_clock(step['time']))
+            if 'favorability' in step:
+                candidates.update(engine.set_favorability(step['favorability']))
+            for flag, value in (step.get('flags') or {}).items():
+                candidates.update(engine.set_flag(flag, value))
+            if step_index == 0:
+                candidates.update(engine.firable_events())
+
+            fired_in_step = set()
+            while candidates:
+                queue = sorted(candidates - fired_in_step)
+                queued = set(queue)
+                next_candidates = set()
+                while queue:
+                    event_id = heapq.heappop(queue)
+                    # 同じ巡回で先に発生したイベントによって条件が変わっている可能性があるため、直前に判定する
+                    if event_id in fired_in_step or not engine.evaluate(event_id):
+                        continue
+                    fired_in_step.add(event_id)
+                    for other in self._fire(event_id):
+                        if other in fired_in_step:
+                            continue
+                        if other > event_id:
+                            if other not in queued:
+                                heapq.heappush(queue, other)
+                                queued.add(other)
+                        else:
+                            next_candidates.add(other)
+                    fired.append({'time': engine.now, 'event_id': event_id, 'favorability': engine.favorability})
+                candidates = next_candidates
+        return fired
+
+    @staticmethod
+    def generate_timeline(flags: list[str], steps: int, start: datetime.datetime,
+                          step_hours: float = 6.0, seed: int | None = None) -> list[dict]:
+        """好感度のランダムウォークと、ランダムなフラグ変更からなる合成タイムラインを作る。"""
+        rng = random.Random(seed)
+        timeline = []
+        favorability = 0
+        now = start
+        for _ in range(steps):
+            now += datetime.timedelta(hours=rng.uniform(0.5, 2) * step_hours)
+            favorability = max(-500, min(500, favorability + rng.randint(-15, 25)))
+            step = {'time': now, 'favorability': favorability}
+            if flags and rng.random() < 0.3:
+                step['flags'] = {rng.choice(flags): str(rng.randint(0, 3))}
+            timeline.append(step)
+        return timeline
@@ -0,0 +1,116 @@
+# src/voice_audition.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .audio_cache import AudioCache
+from .voice_client import VoiceEngineClient
+
+
+class VoiceAuditionRenderer:
+    """
+    同じセリフを複数の音声パラメータでまとめて合成するクラス（表情ごとの声の一括試聴用）。
+
+    audio_query はテキストと話者が同じなら結果も同じため1回だけ行い、
+    パラメータを上書きした synthesis だけを同時実行数を制限したスレッドプールで並列に行う。
+    合成結果は AudioCache に保存し、テスト再生と同じキーを使うので、どちらで合成した音声も使い回せる。
+    """
+    # ローカルのエンジンは合成中にCPUを使い切るため、並列数は少なめにする
+    DEFAULT_MAX_WORKERS = 3
+
+    def __init__(self, voice_client: VoiceEngineClient, audio_cache: AudioCache | None = None, max_workers: int | None = None):
+        self.voice_client = voice_client
+        self.audio_cache = audio_cache
+        self.max_workers = max_workers or self.DEFAULT_MAX_WORKERS
+
+    def render(self, engine: str, speaker_id: int, text: str, param_sets: dict, on_result=None, cancel_event: threading.Event | None = None) -> dict:
+        """
+        param_sets の各パラメータで text を合成する。
+
+        Args:
+            param_sets (dict): { ラベル（表情IDなど）: 音声パラメータの辞書 }
+            on_result: 1件終わるごとに on_result(結果) をワーカースレッドから呼ぶ。
+            cancel_event: セットされると、まだ始まっていない合成を行わずに終了する。
+
+        Returns:
+            dict: {'query_ms': float|None, 'total_ms': float, 'results': {ラベル: 結果}}
+                結果は {'label', 'params', 'wav': bytes|None, 'latency_ms': float, 'cached': bool, 'error': str|None}
+        """
+        started = time.perf_counter()
+        results = {}
+        # 同じパラメータの表情（オフセット無しなど）は1回だけ合成する
+        groups = {}
+        api_url, version = self.voice_client.get_engine_identity(engine)
+        for label, params in param_sets.items():
+            key = AudioCache.make_key(engine, speaker_id, text, params, api_url=api_url, version=version)
+            groups.setdefault(key, {'params': params, 'labels': []})['labels'].append(label)
+
+        pending = {}
+        for key, group in groups.items():
+            wav = self.audio_cache.get(key) if self.audio_cache else None
+            if wav is not None:
+                self._finish(results, on_result, group, {'wav': wav, 'latency_ms': 0.0, 'cached': True, 'error': None})
+            else:
+                pending[key] = group
+
+        query_ms = None
+        if pending:
+            query_started = time.perf_counter()
+            try:
+                audio_query = self.voice_client.audio_query(engine, text, speaker_id)
+            except Exception as e:
+                for group in pending.values():
+                    self._finish(results, on_result, group, {'wav': None, 'latency_ms': 0.0, 'cached': False, 'error': f"audio_query に失敗しました: {e}"})
+                pending = {}
+            query_ms = (time.perf_counter() - query_started) * 1000
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(self._synthesize_one, engine, speaker_id, audio_query, key, group['params'], cancel_event): group
+                    for key, group in pending.items()
+                }
+                for future in as_completed(futures):
+                    self._finish(results, on_result, futures[future], future.result())
+
+        return {'query_ms': query_ms, 'total_ms': (time.perf_counter() - started) * 1000, 'results': results}
+
+    def _synthesize_one(self, engine, speaker_id, audio_query, key, params, cancel_event) -> dict:
+        outcome = {'wav': None, 'latency_ms': 0.0, 'cached': False, 'error': None}
+        if cancel_event is not None and cancel_event.is_set():
+            outcome['error'] = "中止しました"
+            return outcome
+        started = time.perf_counter()
+        try:
+            outcome['wav'] = self.voice_client.synthesis(engine, speaker_id, self.voice_client.apply_params(audio_query, params))
+            if self.audio_cache:
+                self.audio_cache.put(key, outcome['wav'])
+        except Exception as e:
+            outcome['error'] = str(e)
+        outcome['latency_ms'] = (time.perf_counter() - started) * 1000
+        return outcome
+
+    @staticmethod
+    def _finish(results: dict, on_result, group: dict, outcome: dict):
+        for label in group['labels']:
+            result = dict(outcome, label=label, params=group['params'])
+            results[label] = result
+            if on_result:
+                on_result(result)
+
+    @staticmethod
+    def summarize(rendered: dict) -> dict:
+        """render() の結果から、件数とレイテンシの統計を作る。"""
+        results = list(rendered['results'].values())
+        synthesized = sorted(r['latency_ms'] for r in results if r['wav'] is not None and not r['cached'])
+        return {
+            'count': len(results),
+            'cached': sum(1 for r in results if r['cached']),
+            'failed': sum(1 for r in results if r['error']),
+            'query_ms': rendered['query_ms'],
+            'total_ms': rendered['total_ms'],
+            'avg_ms': sum(synthesized) / len(synthesized) if synthesized else None,
+            'max_ms': synthesized[-1] if synthesized else None,
+            'p50_ms': synthesized[len(synthesized) // 2] if synthesized else None,
+        }
@@ -0,0 +1,242 @@
+# src/voice_client.py
+
+import configparser
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class VoiceEngineClient:
+    """
+    VOICEVOX / AivisSpeech エンジンと通信する共有クライアント。
+
+    エンジンごとに requests.Session を1つ持ち、接続を使い回す。
+    APIのURLは config.ini の [VOICEVOX] / [AIVIS_SPEECH] の api_url から読み込む。
+    話者リスト(/speakers)は (エンジン, バージョン) と一緒にディスクへ保存し、
+    次回以降はエンジンの起動を待たずにキャッシュを返しつつ、バックグラウンドで最新の内容に更新する。
+    """
+    ENGINES = {
+        'voicevox': {'section': 'VOICEVOX', 'default_url': 'http://127.0.0.1:50021'},
+        'aivisspeech': {'section': 'AIVIS_SPEECH', 'default_url': 'http://127.0.0.1:10101'},
+    }
+    # 同じバージョンのエンジンでも、これより古い話者キャッシュは取り直す（モデルの追加などに備える）
+    SPEAKER_CACHE_MAX_AGE_SEC = 24 * 60 * 60
+    # 起動が遅いエンジンに備えて、話者リストの取得をこの時間まで再試行する
+    REFRESH_RETRY_SEC = 60
+    REFRESH_RETRY_INTERVAL_SEC = 2
+    POOL_SIZE = 8
+
+    def __init__(self, config_path: str | None = None, cache_dir: str | None = None):
+        self.config_path = config_path
+        self.cache_dir = cache_dir
+        self.base_urls = {}
+        self.reload_config()
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        # { エンジン名: {'version': str|None, 'fetched_at': float, 'speakers': list} }
+        self._speaker_cache = {}
+        # バックグラウンド更新中のエンジンと、完了時に呼ぶコールバック
+        self._refresh_callbacks = {}
+        # このセッションで確認したエンジンのバージョン { エンジン名: (APIのURL, バージョン) }
+        self._versions = {}
+
+    def reload_config(self):
+        """config.ini から各エンジンのAPIのURLを読み込む。"""
+        config = configparser.ConfigParser()
+        if self.config_path and os.path.exists(self.config_path):
+            config.read(self.config_path, encoding='utf-8')
+        for engine, info in self.ENGINES.items():
+            url = config.get(info['section'], 'api_url', fallback='').strip() or info['default_url']
+            self.base_urls[engine] = url.rstrip('/')
+
+    def _base_url(self, engine: str) -> str:
+        if engine not in self.base_urls:
+            raise ValueError(f"不明なエンジン: {engine}")
+        return self.base_urls[engine]
+
+    def _session(self, engine: str) -> requests.Session:
+        """エンジンごとの接続プール付きセッションを返す。"""
+        with self._lock:
+            session = self._sessions.get(engine)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[engine] = session
+            return session
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    # --- API ---
+
+    def get_version(self, engine: str, timeout: float = 3) -> str:
+        base_url = self._base_url(engine)
+        response = self._session(engine).get(f"{base_url}/version", timeout=timeout)
+        response.raise_for_status()
+        version = str(response.json())
+        self._versions[engine] = (base_url, version)
+        return version
+
+    def get_engine_identity(self, engine: str) -> tuple[str, str | None]:
+        """
+        音声キャッシュのキーに含める (APIのURL, エンジンのバージョン) を返す。
+        バージョンは話者リストの更新時などに取得したものを使い、まだ無ければ /version に問い合わせる（失敗時はNone）。
+        """
+        base_url = self._base_url(engine)
+        known = self._versions.get(engine)
+        if known and known[0] == base_url:
+            return base_url, known[1]
+        try:
+            return base_url, self.get_version(engine)
+        except (requests.exceptions.RequestException, ValueError):
+            return base_url, None
+
+    def fetch_speakers(self, engine: str, timeout: float = 5) -> list:
+        response = self._session(engine).get(f"{self._base_url(engine)}/speakers", timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def audio_query(self, engine: str, text: str, speaker_id: int, timeout: float = 5) -> dict:
+        response = self._session(engine).post(
+            f"{self._base_url(engine)}/audio_query", params={'text': text, 'speaker': speaker_id}, timeout=timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def synthesis(self, engine: str, speaker_id: int, audio_query: dict, timeout: float = 10) -> bytes:
+        response = self._session(engine).post(
+            f"{self._base_url(engine)}/synthesis", params={'speaker': speaker_id}, json=audio_query, timeout=timeout
+        )
+        response.raise_for_status()
+        return response.content
+
+    @staticmethod
+    def apply_params(audio_query: dict, params: dict) -> dict:
+        """audio_query に speedScale などのパラメータを上書きした新しい辞書を返す。"""
+        merged = dict(audio_query)
+        for key, value in (params or {}).items():
+            if key in merged:
+                merged[key] = value
+        return merged
+
+    def synthesize(self, engine: str, text: str, speaker_id: int, params: dict | None = None) -> bytes:
+        """audio_query と synthesis を続けて行い、WAVのバイト列を返す。"""
+        audio_query = self.audio_query(engine, text, speaker_id)
+        return self.synthesis(engine, speaker_id, self.apply_params(audio_query, params))
+
+    @staticmethod
+    def find_speaker_id(speakers: list, speaker_name: str, style_name: str) -> int | None:
+        for speaker in speakers or []:
+            if speaker.get('name') == speaker_name:
+                for style in speaker.get('styles', []):
+                    if style.get('name') == style_name:
+                        return style.get('id')
+        return None
+
+    # --- 話者リストのキャッシュ ---
+
+    def _speaker_cache_path(self, engine: str) -> str | None:
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"speakers_{engine}.json")
+
+    def _load_speaker_cache(self, engine: str) -> dict | None:
+        cached = self._speaker_cache.get(engine)
+        if cached is not None:
+            return cached
+        cache_path = self._speaker_cache_path(engine)
+        if not cache_path or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # URLを変更した場合は別のエンジンの可能性があるため使わない
+            if data.get('api_url') != self._base_url(engine) or not isinstance(data.get('speakers'), list):
+                return None
+        except (OSError, ValueError) as e:
+            print(f"話者リストのキャッシュを読み込めませんでした ({cache_path}): {e}")
+            return None
+        self._speaker_cache[engine] = data
+        return data
+
+    def _save_speaker_cache(self, engine: str, data: dict):
+        self._speaker_cache[engine] = data
+        cache_path = self._speaker_cache_path(engine)
+        if not cache_path:
+            return
+        temp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"話者リストのキャッシュを保存できませんでした: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get_speakers(self, engine: str, on_update=None) -> list | None:
+        """
+        話者リストを返す。キャッシュがあれば即座に返し、無ければNoneを返す。
+        どちらの場合もバックグラウンドで最新の話者リストの取得を開始し、
+        完了すると on_update(話者リスト) を、取得できなかった場合は on_update(None) をワーカースレッドから呼ぶ
+        （Tkのウィジェットを操作する場合は after() でメインスレッドに戻すこと）。
+        """
+        if engine not in self.ENGINES:
+            return None
+        cached = self._load_speaker_cache(engine)
+        with self._lock:
+            callbacks = self._refresh_callbacks.get(engine)
+            if callbacks is not None:
+                # 既に更新中なら、完了時のコールバックに追加するだけ
+                if on_update:
+                    callbacks.append(on_update)
+            else:
+                self._refresh_callbacks[engine] = [on_update] if on_update else []
+                threading.Thread(target=self._refresh_speakers, args=(engine,), daemon=True).start()
+        return cached['speakers'] if cached else None
+
+    def _refresh_speakers(self, engine: str):
+        """ワーカースレッドで実行される。エンジンが起動するまで再試行しながら話者リストを取得する。"""
+        result = None
+        deadline = time.monotonic() + self.REFRESH_RETRY_SEC
+        while True:
+            try:
+                version = self.get_version(engine)
+                cached = self._load_speaker_cache(engine)
+                if (cached and cached.get('version') == version
+                        and time.time() - cached.get('fetched_at', 0) < self.SPEAKER_CACHE_MAX_AGE_SEC):
+                    result = cached['speakers']
+                else:
+                    speakers = self.fetch_speakers(engine)
+                    self._save_speaker_cache(engine, {
+                        'api_url': self._base_url(engine), 'version': version,
+                        'fetched_at': time.time(), 'speakers': speakers,
+                    })
+                    result = speakers
+                break
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if time.monotonic() >= deadline:
+                    print(f"[{engine}] 話者リストを取得できませんでした: {e}")
+                    break
+                time.sleep(self.REFRESH_RETRY_INTERVAL_SEC)
+
+        with self._lock:
+            callbacks = self._refresh_callbacks.pop(engine, [])
+        for callback in callbacks:
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"話者リスト更新後の処理でエラーが発生しました: {e}")
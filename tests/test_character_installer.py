@@ -0,0 +1,190 @@
+# tests/test_character_installer.py
+
+import hashlib
+import json
+import os
+import stat
+import zipfile
+
+import pytest
+
+from src.character_installer import CharacterInstaller
+
+
+@pytest.fixture
+def installer(tmp_path) -> CharacterInstaller:
+    return CharacterInstaller(None, str(tmp_path / 'characters'))
+
+
+def _make_zip(path, files: dict, compression=zipfile.ZIP_DEFLATED) -> zipfile.ZipFile:
+    """{ZIP内のパス: バイト列} からZIPを作り、読み込み用に開いて返す。"""
+    with zipfile.ZipFile(path, 'w', compression=compression) as zf:
+        for name, data in files.items():
+            # 名前をそのまま残すため ZipInfo で書き込む（ZipInfo の圧縮方式が使われる）
+            info = zipfile.ZipInfo(name)
+            info.compress_type = compression
+            zf.writestr(info, data)
+    return zipfile.ZipFile(path)
+
+
+def _manifest(files: dict) -> dict:
+    return {name: hashlib.sha256(data).hexdigest() for name, data in files.items() if not name.endswith('/')}
+
+
+@pytest.mark.parametrize('name', [
+    '../evil.txt',
+    'default/../../evil.txt',
+    '..\\evil.txt',
+    '/etc/evil.txt',
+    '\\evil.txt',
+    'C:/evil.txt',
+    'C:evil.txt',
+])
+def test_rejects_paths_outside_destination(installer, tmp_path, name):
+    with _make_zip(tmp_path / 'evil.zip', {'character.ini': b'[INFO]\n', name: b'x'}) as zf:
+        with pytest.raises(ValueError, match='不正なパス'):
+            installer._validate_entries(zf, None)
+
+
+def test_accepts_normal_paths(installer, tmp_path):
+    files = {'character.ini': b'[INFO]\n', 'default/': b'', 'default/normal.png': b'png', './events/e.json': b'{}'}
+    with _make_zip(tmp_path / 'ok.zip', files) as zf:
+        infos = installer._validate_entries(zf, None)
+    assert [info.filename for info in infos] == list(files)
+    assert installer._safe_member_path(str(tmp_path), './events/e.json') == os.path.realpath(tmp_path / 'events' / 'e.json')
+
+
+def test_rejects_symlinks(installer, tmp_path):
+    path = tmp_path / 'link.zip'
+    with zipfile.ZipFile(path, 'w') as zf:
+        info = zipfile.ZipInfo('default/link.png')
+        info.create_system = 3
+        info.external_attr = (stat.S_IFLNK | 0o777) << 16
+        zf.writestr(info, '/etc/passwd')
+    with zipfile.ZipFile(path) as zf, pytest.raises(ValueError, match='シンボリックリンク'):
+        installer._validate_entries(zf, None)
+
+
+def test_rejects_too_many_entries(installer, tmp_path):
+    installer.MAX_ENTRY_COUNT = 3
+    files = {f"default/{i}.png": b'x' for i in range(4)}
+    with _make_zip(tmp_path / 'many.zip', files) as zf, pytest.raises(ValueError, match='ファイル数'):
+        installer._validate_entries(zf, None)
+
+
+def test_rejects_oversized_total(installer, tmp_path):
+    installer.MAX_TOTAL_UNCOMPRESSED_BYTES = 1000
+    files = {'default/a.png': b'a' * 600, 'default/b.png': b'b' * 600}
+    with _make_zip(tmp_path / 'large.zip', files, compression=zipfile.ZIP_STORED) as zf, pytest.raises(ValueError, match='サイズが大きすぎます'):
+        installer._validate_entries(zf, None)
+
+
+def test_rejects_suspicious_compression_ratio(installer, tmp_path):
+    # 0で埋めたデータはDeflateで1000倍以上に縮む
+    files = {'default/bomb.png': bytes(CharacterInstaller.COMPRESSION_RATIO_MIN_BYTES * 2)}
+    with _make_zip(tmp_path / 'bomb.zip', files) as zf, pytest.raises(ValueError, match='圧縮率'):
+        installer._validate_entries(zf, None)
+
+
+def test_small_files_are_exempt_from_ratio_check(installer, tmp_path):
+    files = {'events/e.json': bytes(CharacterInstaller.COMPRESSION_RATIO_MIN_BYTES - 1)}
+    with _make_zip(tmp_path / 'small.zip', files) as zf:
+        installer._validate_entries(zf, None)
+
+
+def test_rejects_files_not_in_manifest(installer, tmp_path):
+    files = {'character.ini': b'[INFO]\n', 'default/extra.png': b'x'}
+    manifest = _manifest({'character.ini': files['character.ini']})
+    with _make_zip(tmp_path / 'extra.zip', files) as zf, pytest.raises(ValueError, match='署名に含まれない'):
+        installer._validate_entries(zf, manifest)
+
+
+def test_rejects_missing_manifest_files(installer, tmp_path):
+    files = {'character.ini': b'[INFO]\n'}
+    manifest = dict(_manifest(files), **{'default/normal.png': '0' * 64})
+    with _make_zip(tmp_path / 'missing.zip', files) as zf, pytest.raises(ValueError, match='ZIPにありません'):
+        installer._validate_entries(zf, manifest)
+
+
+def test_extract_rejects_hash_mismatch(installer, tmp_path):
+    files = {'character.ini': b'[INFO]\n', 'default/normal.png': b'png'}
+    manifest = dict(_manifest(files), **{'default/normal.png': hashlib.sha256(b'other').hexdigest()})
+    dest = tmp_path / 'dest'
+    with _make_zip(tmp_path / 'tampered.zip', files) as zf, pytest.raises(ValueError, match='ハッシュ'):
+        installer._extract_verified(zf, str(dest), manifest)
+
+
+def test_extract_writes_verified_files(installer, tmp_path):
+    files = {'character.ini': b'[INFO]\n', 'default/': b'', 'default/normal.png': b'png'}
+    dest = tmp_path / 'dest'
+    with _make_zip(tmp_path / 'ok.zip', files) as zf:
+        installer._extract_verified(zf, str(dest), _manifest(files))
+    assert (dest / 'default' / 'normal.png').read_bytes() == b'png'
+
+
+def test_plan_delta_update_reports_missing_entries_as_value_error(installer, tmp_path):
+    files = {'character.ini': b'[INFO]\n'}
+    manifest = dict(_manifest(files), **{'default/normal.png': '0' * 64})
+    os.makedirs(os.path.join(installer.characters_dir, 'alice'))
+    with _make_zip(tmp_path / 'update.zip', files) as zf, pytest.raises(ValueError):
+        installer._plan_delta_update(zf, manifest, 'alice')
+
+
+def test_plan_delta_update_finds_changed_and_removed_files(installer, tmp_path):
+    target = os.path.join(installer.characters_dir, 'alice')
+    old_files = {'character.ini': b'[INFO]\n', 'default/normal.png': b'old', 'default/gone.png': b'gone'}
+    with _make_zip(tmp_path / 'old.zip', old_files) as zf:
+        installer._extract_verified(zf, target, _manifest(old_files))
+    with open(os.path.join(target, CharacterInstaller.SIGNATURE_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump({'file_manifest': _manifest(old_files)}, f)
+
+    new_files = {'character.ini': b'[INFO]\n', 'default/normal.png': b'new'}
+    with _make_zip(tmp_path / 'new.zip', new_files) as zf:
+        changed, removed = installer._plan_delta_update(zf, _manifest(new_files), 'alice')
+    assert changed == ['default/normal.png']
+    assert removed == ['default/gone.png']
+
+
+def _make_package(path, package_info: dict, files: dict):
+    """package_info.json と signature.json を含む署名付きパッケージを作る。"""
+    files = dict(files, **{'package_info.json': json.dumps(package_info).encode('utf-8')})
+    signature = json.dumps({'file_manifest': _manifest(files)}).encode('utf-8')
+    _make_zip(path, dict(files, **{CharacterInstaller.SIGNATURE_FILENAME: signature})).close()
+    return str(path)
+
+
+def test_split_package_delta_update_uses_all_parts(installer, tmp_path, monkeypatch):
+    from tkinter import filedialog, messagebox
+    errors = []
+    monkeypatch.setattr(messagebox, 'showinfo', lambda *a, **k: None)
+    monkeypatch.setattr(messagebox, 'showwarning', lambda *a, **k: errors.append(a))
+    monkeypatch.setattr(messagebox, 'showerror', lambda *a, **k: errors.append(a))
+    monkeypatch.setattr(messagebox, 'askyesno', lambda *a, **k: True)
+    # 2回目は「はい」（差分更新）を選ぶ
+    monkeypatch.setattr(messagebox, 'askyesnocancel', lambda *a, **k: True)
+
+    def install(version: str, parent_files: dict, child_files: dict):
+        parent_info = {'package_type': 'split', 'package_role': 'parent', 'character_id': 'alice', 'child_parts': ['hearts']}
+        child_info = {'package_type': 'split', 'package_role': 'child', 'base_id': 'alice', 'part_name': 'hearts'}
+        parent_path = _make_package(tmp_path / f"parent_{version}.zip", parent_info, parent_files)
+        child_path = _make_package(tmp_path / f"child_{version}.zip", child_info, child_files)
+        monkeypatch.setattr(filedialog, 'askopenfilename', lambda **k: child_path)
+        installer.install_from_zip(parent_path)
+
+    install('v1', {'character.ini': b'[INFO]\n', 'default/normal.png': b'normal'},
+            {'hearts/heart_1.png': b'h1', 'hearts/heart_2.png': b'h2'})
+    target = tmp_path / 'characters' / 'alice'
+    installed = json.loads((target / CharacterInstaller.INSTALL_MANIFEST_FILENAME).read_text(encoding='utf-8'))['file_manifest']
+    assert {'default/normal.png', 'hearts/heart_1.png', 'hearts/heart_2.png'} <= set(installed)
+    (target / 'hearts' / 'mine.png').write_bytes(b'user')
+
+    install('v2', {'character.ini': b'[INFO]\n', 'default/normal.png': b'normal'},
+            {'hearts/heart_1.png': b'new heart'})
+    assert errors == []
+    assert (target / 'hearts' / 'heart_1.png').read_bytes() == b'new heart'
+    # 子ファイルから消えたファイルは削除し、ユーザーが追加したファイルは残す
+    assert not (target / 'hearts' / 'heart_2.png').exists()
+    assert (target / 'hearts' / 'mine.png').read_bytes() == b'user'
+    assert (target / 'default' / 'normal.png').read_bytes() == b'normal'
+    installed = json.loads((target / CharacterInstaller.INSTALL_MANIFEST_FILENAME).read_text(encoding='utf-8'))['file_manifest']
+    assert 'hearts/heart_2.png' not in installed and 'default/normal.png' in installed
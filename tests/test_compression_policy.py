@@ -0,0 +1,78 @@
+# tests/test_compression_policy.py
+
+import json
+import random
+import zipfile
+import zlib
+
+import pytest
+
+from src.compression_policy import CompressionPolicy
+
+
+def _raw_deflate_size(data: bytes, level: int) -> int:
+    """ZIPのDeflateエントリと同じ形式（ヘッダー無し）で圧縮したサイズ。"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return len(compressor.compress(data) + compressor.flush())
+
+
+@pytest.fixture
+def text_data() -> bytes:
+    # レベル6と9で圧縮後のサイズが変わる程度に、繰り返しの少ないテキストにする
+    rng = random.Random(0)
+    words = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 9))) for _ in range(400)]
+    events = [{'id': f"event_{i}", 'text': ' '.join(rng.choice(words) for _ in range(30))} for i in range(200)]
+    data = json.dumps(events, ensure_ascii=False, indent=4).encode('utf-8')
+    assert _raw_deflate_size(data, CompressionPolicy.TEXT_LEVEL) != _raw_deflate_size(data, CompressionPolicy.DEFAULT_LEVEL)
+    return data
+
+
+@pytest.mark.parametrize('date_time', [None, (2020, 1, 1, 0, 0, 0)])
+def test_zip_info_round_trips_text_entry_with_text_level(tmp_path, text_data, date_time):
+    src_path = tmp_path / 'event.json'
+    src_path.write_bytes(text_data)
+    zip_path = tmp_path / 'out.zip'
+
+    policy = CompressionPolicy()
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        zinfo = policy.zip_info(str(src_path), 'events/event.json', date_time=date_time)
+        with open(src_path, 'rb') as src, zf.open(zinfo, 'w') as dest:
+            dest.write(src.read())
+
+    with zipfile.ZipFile(zip_path) as zf:
+        info = zf.getinfo('events/event.json')
+        assert zf.read(info) == text_data
+    assert info.compress_type == zipfile.ZIP_DEFLATED
+    assert info.compress_size == _raw_deflate_size(text_data, CompressionPolicy.TEXT_LEVEL)
+    if date_time is not None:
+        assert info.date_time == date_time
+
+
+def test_zip_info_stores_images(tmp_path):
+    src_path = tmp_path / 'normal.png'
+    src_path.write_bytes(b'\x89PNG\r\n\x1a\n' + bytes(2048))
+    zinfo = CompressionPolicy().zip_info(str(src_path), 'default/normal.png')
+    assert zinfo.compress_type == zipfile.ZIP_STORED
+
+
+def test_writestr_uses_text_level(tmp_path, text_data):
+    zip_path = tmp_path / 'out.zip'
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        CompressionPolicy().writestr(zf, 'package_info.json', text_data)
+    with zipfile.ZipFile(zip_path) as zf:
+        info = zf.getinfo('package_info.json')
+        assert zf.read(info) == text_data
+    assert info.compress_type == zipfile.ZIP_DEFLATED
+    assert info.compress_size == _raw_deflate_size(text_data, CompressionPolicy.TEXT_LEVEL)
+
+
+def test_probe_stores_incompressible_files(tmp_path):
+    src_path = tmp_path / 'voice.bin'
+    src_path.write_bytes(random.Random(0).randbytes(CompressionPolicy.PROBE_BYTES))
+    assert CompressionPolicy().choose('voice.bin', str(src_path)) == (zipfile.ZIP_STORED, None)
+    assert CompressionPolicy(CompressionPolicy.MODE_EXTENSION).choose('voice.bin', str(src_path)) == (zipfile.ZIP_DEFLATED, CompressionPolicy.DEFAULT_LEVEL)
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        CompressionPolicy('fastest')
@@ -0,0 +1,63 @@
+# tests/test_event_analyzer.py
+
+import pytest
+
+from src.event_analyzer import EventAnalyzer
+from src.event_store import EventStore
+
+
+def _completed(event_id: str) -> list:
+    return [[{'type': 'event_completed', 'event_id': event_id}]]
+
+
+@pytest.fixture
+def store(tmp_path) -> EventStore:
+    return EventStore(str(tmp_path / 'events'))
+
+
+def _messages(issues: list, severity: str | None = None) -> list[str]:
+    return [issue['message'] for issue in issues if severity is None or issue['severity'] == severity]
+
+
+def test_finds_dependency_cycles(store):
+    store.save('a', {'triggers': _completed('c')})
+    store.save('b', {'triggers': _completed('a')})
+    store.save('c', {'triggers': _completed('b')})
+    store.save('d', {'triggers': _completed('a')})
+    # 自分自身の完了を条件にするのは循環として扱わない
+    store.save('e', {'triggers': _completed('e')})
+
+    cycles = [m for m in _messages(EventAnalyzer(store).analyze()) if 'お互いの完了' in m]
+    assert cycles == ["イベント a, b, c がお互いの完了を条件にしており、発生しない可能性があります。"]
+
+
+def test_find_cycles_handles_separate_components_and_deep_chains():
+    graph = {'x': ['y'], 'y': ['x'], 'p': ['q'], 'q': ['r'], 'r': ['p'], 'lonely': ['missing']}
+    # 再帰の上限を超える長さの鎖でも失敗しない
+    graph.update({f"n{i}": [f"n{i + 1}"] for i in range(5000)})
+    graph['n5000'] = []
+    assert sorted(EventAnalyzer._find_cycles(graph)) == [['p', 'q', 'r'], ['x', 'y']]
+
+
+def test_reports_missing_events_and_unset_flags(store):
+    store.save('a', {'triggers': [[{'type': 'event_completed', 'event_id': 'ghost'}, {'type': 'flag_equals', 'flag': 'never', 'value': '1'}]],
+                     'sequence': [{'type': 'set_flag', 'params': {'flag': 'unused', 'value': '1'}}]})
+    issues = EventAnalyzer(store).analyze()
+    assert _messages(issues, 'error') == ["存在しないイベント 'ghost' を条件に使っています。"]
+    assert any("'never'" in m for m in _messages(issues, 'warning'))
+    assert any("'unused'" in m for m in _messages(issues, 'info'))
+
+
+def test_sequence_flow_issues():
+    sequence = [
+        {'type': 'dialogue', 'label': 'start'},
+        {'type': 'branch_on_flag', 'params': {'jump_if_true': 'loop', 'jump_if_false': 'nowhere'}},
+        {'type': 'dialogue', 'label': 'loop', 'jump_to': 'loop'},
+        {'type': 'dialogue'},
+    ]
+    issues = EventAnalyzer.analyze_sequence('e', sequence)
+    by_step = {(issue['severity'], issue['step']) for issue in issues}
+    assert ('error', 1) in by_step     # 存在しないラベルへのジャンプ
+    assert ('error', 2) in by_step     # 抜け出せないループ
+    assert ('warning', 3) in by_step   # 到達できないステップ
+    assert all(issue['event_id'] == 'e' for issue in issues)
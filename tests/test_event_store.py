@@ -0,0 +1,80 @@
+# tests/test_event_store.py
+
+import json
+import os
+import random
+
+from src.event_store import EventStore
+
+
+def _event(rng: random.Random) -> dict:
+    return {
+        'triggers': [[{'type': 'event_completed', 'event_id': f"e{rng.randrange(8)}"},
+                      {'type': 'flag_equals', 'flag': f"f{rng.randrange(5)}", 'value': '1'}]],
+        'sequence': [{'type': 'set_flag', 'params': {'flag': f"f{rng.randrange(5)}", 'value': '1'}}],
+    }
+
+
+def _scan(events_dir: str) -> dict:
+    """インデックスを使わずに、ファイルを直接読んで参照情報を集める。"""
+    refs = {}
+    for filename in sorted(os.listdir(events_dir)):
+        if filename.endswith('.json'):
+            with open(os.path.join(events_dir, filename), encoding='utf-8') as f:
+                refs[filename[:-5]] = EventStore.extract_references(json.load(f))
+    return refs
+
+
+def test_reverse_indexes_follow_save_delete_rename_and_external_edits(tmp_path):
+    events_dir = str(tmp_path / 'events')
+    os.makedirs(events_dir)
+    store = EventStore(events_dir)
+    rng = random.Random(0)
+    for step in range(300):
+        event_id = f"e{rng.randrange(8)}"
+        op = rng.random()
+        if op < 0.5:
+            store.save(event_id, _event(rng))
+        elif op < 0.7:
+            store.delete(event_id)
+        elif op < 0.85:
+            store.rename(event_id, f"e{rng.randrange(8)}")
+        else:
+            # エディタ以外での書き換え（更新時刻を明示して、変更を確実に検知させる）
+            path = os.path.join(events_dir, f"{event_id}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(_event(rng), f)
+            os.utime(path, ns=(step * 10**9, step * 10**9))
+
+        refs = _scan(events_dir)
+        assert store.get_event_ids() == list(refs)
+        flags = set()
+        for r in refs.values():
+            flags |= r['flags_read'] | r['flags_written']
+        assert store.get_all_flags() == sorted(flags)
+        for event_id in refs:
+            assert store.get_dependents(event_id) == sorted(o for o, r in refs.items() if event_id in r['events'] and o != event_id)
+        for flag in flags:
+            assert store.get_flag_usage(flag) == {
+                'read': sorted(o for o, r in refs.items() if flag in r['flags_read']),
+                'written': sorted(o for o, r in refs.items() if flag in r['flags_written']),
+            }
+
+
+def test_save_skips_unchanged_events_and_load_returns_copies(tmp_path):
+    store = EventStore(str(tmp_path / 'events'))
+    data = {'triggers': [], 'sequence': [{'type': 'dialogue', 'params': {'text': 'hi'}}]}
+    assert store.save('e', data)
+    assert not store.save('e', data)
+    loaded = store.load('e')
+    loaded['sequence'].clear()
+    assert store.load('e') == data
+
+
+def test_broken_json_is_skipped(tmp_path):
+    events_dir = tmp_path / 'events'
+    events_dir.mkdir()
+    (events_dir / 'broken.json').write_text('{', encoding='utf-8')
+    store = EventStore(str(events_dir))
+    assert store.load('broken') is None
+    assert list(store.iter_cached_events()) == []
@@ -0,0 +1,78 @@
+# tests/test_hash_cache.py
+
+import hashlib
+import os
+import time
+
+from src.hash_cache import FileHashCache
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write(path, data: bytes, age_sec: float = 0):
+    path.write_bytes(data)
+    if age_sec:
+        mtime = time.time() - age_sec
+        os.utime(path, (mtime, mtime))
+
+
+def test_recently_modified_files_are_not_cached(tmp_path):
+    old_path, new_path = tmp_path / 'old.png', tmp_path / 'new.png'
+    _write(old_path, b'old', age_sec=60)
+    _write(new_path, b'new')
+    cache = FileHashCache(str(tmp_path / 'cache.json'))
+
+    hashes = cache.get_hashes({'old.png': str(old_path), 'new.png': str(new_path)})
+    assert hashes == {'old.png': _sha256(b'old'), 'new.png': _sha256(b'new')}
+    # 更新直後のファイルは、同じ時刻のまま書き換えられても気付けないためキャッシュしない
+    assert set(cache.entries) == {'old.png'}
+
+
+def test_racy_file_is_rehashed_after_same_second_rewrite(tmp_path):
+    path = tmp_path / 'normal.png'
+    _write(path, b'aaaa')
+    st = os.stat(path)
+    cache = FileHashCache(str(tmp_path / 'cache.json'))
+    assert cache.get_hashes({'normal.png': str(path)})['normal.png'] == _sha256(b'aaaa')
+
+    # 同じサイズ・同じ更新時刻のまま内容だけが変わった
+    _write(path, b'bbbb')
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert cache.get_hashes({'normal.png': str(path)})['normal.png'] == _sha256(b'bbbb')
+
+
+def test_cache_is_reused_and_persisted(tmp_path, monkeypatch):
+    path = tmp_path / 'normal.png'
+    _write(path, b'data', age_sec=60)
+    cache_path = str(tmp_path / 'cache' / 'hashes.json')
+    cache = FileHashCache(cache_path)
+    cache.get_hashes({'normal.png': str(path)})
+    cache.save()
+
+    reloaded = FileHashCache(cache_path)
+    monkeypatch.setattr(FileHashCache, 'calculate_sha256', classmethod(lambda cls, p: 'recomputed'))
+    assert reloaded.get_hashes({'normal.png': str(path)}) == {'normal.png': _sha256(b'data')}
+
+    # サイズが変われば計算し直す
+    _write(path, b'longer data', age_sec=60)
+    assert reloaded.get_hashes({'normal.png': str(path)}) == {'normal.png': 'recomputed'}
+
+
+def test_invalidate_forces_rehash(tmp_path, monkeypatch):
+    path = tmp_path / 'normal.png'
+    _write(path, b'data', age_sec=60)
+    cache = FileHashCache(str(tmp_path / 'cache.json'))
+    cache.get_hashes({'normal.png': str(path)})
+    cache.invalidate(['normal.png', 'unknown.png'])
+    assert 'normal.png' not in cache.entries
+
+    monkeypatch.setattr(FileHashCache, 'calculate_sha256', classmethod(lambda cls, p: 'recomputed'))
+    assert cache.get_hashes({'normal.png': str(path)}) == {'normal.png': 'recomputed'}
+
+
+def test_broken_cache_file_is_ignored(tmp_path):
+    cache_path = tmp_path / 'cache.json'
+    cache_path.write_text('{broken', encoding='utf-8')
+    assert FileHashCache(str(cache_path)).entries == {}
@@ -0,0 +1,52 @@
+# tests/test_image_cache.py
+
+import os
+
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from src.image_cache import ThumbnailDiskCache  # noqa: E402
+
+
+def _png_size(tmp_path) -> int:
+    path = tmp_path / 'probe.png'
+    Image.new('RGB', (8, 8), (255, 0, 0)).save(path, 'PNG')
+    return os.path.getsize(path)
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache_dir = tmp_path / 'thumbnails'
+    cache = ThumbnailDiskCache(str(cache_dir), max_bytes=_png_size(tmp_path) * 2)
+    image = Image.new('RGB', (8, 8), (255, 0, 0))
+    cache.put('a', image)
+    cache.put('b', image)
+    assert cache.get('a') is not None
+    cache.put('c', image)
+    # 最後に使われた時刻が一番古い 'b' が消える
+    assert cache.get('b') is None
+    assert sorted(os.listdir(cache_dir)) == ['a.png', 'c.png']
+
+
+def test_disk_cache_restores_usage_order_after_restart(tmp_path):
+    cache_dir = tmp_path / 'thumbnails'
+    image = Image.new('RGB', (8, 8), (255, 0, 0))
+    cache = ThumbnailDiskCache(str(cache_dir))
+    cache.put('old', image)
+    cache.put('new', image)
+    os.utime(cache_dir / 'old.png', ns=(0, 0))
+
+    # 更新時刻が古い 'old' から削除される
+    reloaded = ThumbnailDiskCache(str(cache_dir), max_bytes=_png_size(tmp_path) * 2)
+    reloaded.put('newest', image)
+    assert sorted(os.listdir(cache_dir)) == ['new.png', 'newest.png']
+    assert reloaded.get('newest').size == (8, 8)
+
+
+def test_broken_thumbnail_is_dropped(tmp_path):
+    cache_dir = tmp_path / 'thumbnails'
+    cache_dir.mkdir()
+    (cache_dir / 'broken.png').write_bytes(b'not a png')
+    cache = ThumbnailDiskCache(str(cache_dir))
+    assert cache.get('broken') is None
+    assert cache.get('broken') is None
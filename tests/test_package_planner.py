@@ -0,0 +1,139 @@
+# tests/test_package_planner.py
+
+import os
+import random
+
+import pytest
+
+from src.package_planner import PackagePlanner
+
+
+def _write_sparse(path: str, size: int):
+    """中身を書かずに指定サイズのファイルを作る（PNGのサイズの見積もりはファイルサイズしか使わない）。"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+
+def _make_character(root: str, costume_sizes: dict, rng: random.Random) -> list[tuple[str, str]]:
+    """{衣装ID: [画像サイズ...]} のキャラクターを作り、(ZIP内のパス, 元のパス) のリストを返す。"""
+    entries = []
+    os.makedirs(root, exist_ok=True)
+    ini_path = os.path.join(root, 'character.ini')
+    with open(ini_path, 'w', encoding='utf-8') as f:
+        f.write('[INFO]\nCHARACTER_NAME = test\n')
+    entries.append(('character.ini', ini_path))
+    for costume_id, sizes in costume_sizes.items():
+        entries.append((f"{costume_id}/", os.path.join(root, costume_id)))
+        for i, size in enumerate(sizes):
+            path = os.path.join(root, costume_id, f"image_{i:03d}.png")
+            _write_sparse(path, size)
+            entries.append((f"{costume_id}/image_{i:03d}.png", path))
+    events_dir = os.path.join(root, 'events')
+    os.makedirs(events_dir, exist_ok=True)
+    entries.append(('events/', events_dir))
+    for i in range(20):
+        path = os.path.join(events_dir, f"event_{i}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{"id": "event_%d", "text": "%s"}' % (i, ' '.join(str(rng.random()) for _ in range(200))))
+        entries.append((f"events/event_{i}.json", path))
+    return entries
+
+
+def _check_plan(plan: dict, entries: list, planner: PackagePlanner):
+    file_arcnames = [arcname for arcname, _ in entries if not arcname.endswith('/')]
+    included = [arcname for part in plan['parts'] for arcname, _ in part['entries'] if not arcname.endswith('/')]
+    # すべてのファイルが、ちょうど1つのパーツに含まれる
+    assert sorted(included) == sorted(file_arcnames)
+
+    paths = dict(entries)
+    for part in plan['parts']:
+        estimated = sum(planner.estimate_entry_size(arcname, paths[arcname]) for arcname, _ in part['entries'])
+        assert estimated + PackagePlanner.PART_RESERVED_BYTES <= planner.capacity <= planner.limit_bytes
+        assert part['estimated_bytes'] <= planner.capacity
+        # 分割されたフォルダのファイルにも、親フォルダのエントリが付いている
+        arcnames = {arcname for arcname, _ in part['entries']}
+        for arcname in arcnames:
+            if '/' in arcname.rstrip('/'):
+                assert arcname.split('/', 1)[0] + '/' in arcnames
+
+
+def test_plan_keeps_parts_under_zip_size_limit(tmp_path):
+    github_uploader = pytest.importorskip('src.github_uploader')
+    limit = github_uploader.GithubUploader.ZIP_SIZE_LIMIT_BYTES
+    rng = random.Random(0)
+    costume_sizes = {
+        'default': [rng.randint(200_000, 1_500_000) for _ in range(12)],
+        'summer': [rng.randint(500_000, 3_000_000) for _ in range(10)],
+        'winter': [rng.randint(500_000, 3_000_000) for _ in range(10)],
+        # 1つの衣装だけで上限を超えるため、ファイル単位に分けられる
+        'huge': [rng.randint(2_000_000, 6_000_000) for _ in range(16)],
+    }
+    entries = _make_character(str(tmp_path), costume_sizes, rng)
+    planner = PackagePlanner(limit)
+    plan = planner.plan(entries, list(costume_sizes))
+
+    assert plan['split']
+    assert plan['parts'][0]['part_name'] == 'base'
+    assert ('character.ini', str(tmp_path / 'character.ini')) in plan['parts'][0]['entries']
+    assert len({part['part_name'] for part in plan['parts']}) == len(plan['parts'])
+    _check_plan(plan, entries, planner)
+
+
+def test_plan_without_split_when_small(tmp_path):
+    rng = random.Random(1)
+    entries = _make_character(str(tmp_path), {'default': [10_000, 20_000]}, rng)
+    plan = PackagePlanner(24 * 1024 * 1024).plan(entries, ['default'])
+    assert not plan['split']
+    assert plan['parts'][0]['entries'] == entries
+
+
+def test_plan_rejects_single_file_over_limit(tmp_path):
+    entries = _make_character(str(tmp_path), {'default': [10_000], 'big': [2_000_000, 10_000]}, random.Random(2))
+    with pytest.raises(ValueError, match='単体で上限'):
+        PackagePlanner(1_000_000).plan(entries, ['default', 'big'])
+
+
+def test_shrink_capacity_never_grows():
+    planner = PackagePlanner(1_000_000)
+    capacity = planner.capacity
+    planner.shrink_capacity(1_100_000)
+    assert planner.capacity < capacity
+    capacity = planner.capacity
+    planner.shrink_capacity(500_000)
+    assert planner.capacity <= capacity
+
+
+def test_built_zips_stay_under_limit(tmp_path, monkeypatch):
+    github_uploader = pytest.importorskip('src.github_uploader')
+    monkeypatch.setattr(github_uploader.GithubUploader, '_load_salt', lambda self: 'salt')
+    config_path = tmp_path / 'config.ini'
+    config_path.write_text('[PACKAGING]\n', encoding='utf-8')
+    uploader = github_uploader.GithubUploader(str(config_path))
+
+    # 圧縮できない中身の画像で、実際のZIPのサイズを確かめる
+    rng = random.Random(3)
+    root = tmp_path / 'alice'
+    costume_sizes = {costume_id: [rng.randint(4_000, 30_000) for _ in range(rng.randint(5, 15))]
+                     for costume_id in ('default', 'summer', 'winter', 'huge')}
+    costume_sizes['huge'] += [25_000] * 12
+    entries = _make_character(str(root), costume_sizes, rng)
+    for arcname, path in entries:
+        if arcname.endswith('.png'):
+            size = os.path.getsize(path)
+            with open(path, 'wb') as f:
+                f.write(rng.randbytes(size))
+
+    limit = 200_000
+    planner = PackagePlanner(limit)
+    plan = planner.plan(entries, list(costume_sizes))
+    assert plan['split']
+    _check_plan(plan, entries, planner)
+
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    base_meta = {'format_version': '1.0', 'character_id': 'alice', 'character_name': 'alice'}
+    zip_paths = uploader._build_planned_zips(plan, 'alice', str(out_dir), base_meta, {})
+    assert len(zip_paths) == len(plan['parts'])
+    for zip_path in zip_paths:
+        assert os.path.getsize(zip_path) <= limit
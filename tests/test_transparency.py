@@ -0,0 +1,78 @@
+# tests/test_transparency.py
+
+import pytest
+
+np = pytest.importorskip('numpy')
+Image = pytest.importorskip('PIL.Image')
+
+from src.transparency import TransparencyAnalyzer  # noqa: E402
+
+KEY = (255, 0, 255)
+EDGE = (131, 131, 131)
+
+
+def _sample_rgba(seed: int = 0, size: int = 96):
+    """透過色の背景に、透過色に近い色の輪郭と半透明の縁を持つ図形を置いた画像。"""
+    rng = np.random.default_rng(seed)
+    rgba = np.zeros((size, size, 4), dtype=np.uint8)
+    ys, xs = np.indices((size, size))
+    radius = np.hypot(ys - size / 2, xs - size / 2)
+    body = radius < size * 0.3
+    rgba[body] = (40, 160, 90, 255)
+    ring = (radius >= size * 0.3) & (radius < size * 0.36)
+    # 透過色からの距離がいろいろな値になるよう、輪郭の色と不透明度をばらつかせる
+    offsets = rng.integers(0, 90, size=(int(ring.sum()), 3))
+    rgba[ring, :3] = np.clip(np.array(KEY) + np.where(np.array(KEY) > 0, -offsets, offsets), 0, 255)
+    rgba[ring, 3] = rng.choice([0, 96, 180, 255], size=int(ring.sum()))
+    noise = rng.random((size, size)) < 0.02
+    rgba[noise] = (250, 10, 250, 255)
+    return rgba
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_preview_halo_ranges_match_full_analysis(seed):
+    rgba = _sample_rgba(seed)
+    image = Image.fromarray(rgba, 'RGBA')
+    analyzer = TransparencyAnalyzer()
+    base = analyzer._get_base(image, KEY, EDGE)
+    for tolerance in range(0, 256, 5):
+        expected = TransparencyAnalyzer.analyze_array(rgba, KEY, EDGE, tolerance)
+        halo = np.zeros(rgba.shape[0] * rgba.shape[1], dtype=bool)
+        selected = (base['cand_lo'] <= tolerance) & (tolerance <= base['cand_hi'])
+        halo[base['candidates'][selected]] = True
+        assert np.array_equal(halo.reshape(expected['halo'].shape), expected['halo']), tolerance
+
+        _, stats = analyzer.render_preview(image, KEY, EDGE, tolerance)
+        for name in ('pixels', 'keyed', 'halo', 'holes', 'fringe'):
+            assert stats[name] == expected['stats'][name], (tolerance, name)
+
+
+def test_preview_is_cached_per_tolerance():
+    image = Image.fromarray(_sample_rgba(), 'RGBA')
+    analyzer = TransparencyAnalyzer()
+    first, stats = analyzer.render_preview(image, KEY, EDGE, 10)
+    again, cached_stats = analyzer.render_preview(image, KEY, EDGE, 10)
+    assert not stats['cached'] and cached_stats['cached']
+    assert again is first
+
+
+def test_composite_uses_key_for_transparent_and_edge_for_partial():
+    rgba = np.array([[[10, 20, 30, 0], [200, 100, 0, 255], [255, 255, 255, 0]],
+                     [[0, 0, 0, 128], [100, 100, 100, 1], [50, 60, 70, 254]]], dtype=np.uint8)
+    rgb = TransparencyAnalyzer.composite(rgba, KEY, EDGE)
+    assert tuple(rgb[0, 0]) == KEY and tuple(rgb[0, 2]) == KEY
+    assert tuple(rgb[0, 1]) == (200, 100, 0)
+    assert tuple(rgb[1, 0]) == tuple((0 * 128 + c * 127 + 127) // 255 for c in EDGE)
+
+
+def test_misuse_ignores_feathered_edges():
+    size = 64
+    rgba = np.zeros((size, size, 4), dtype=np.uint8)
+    rgba[8:56, 8:56] = (40, 160, 90, 255)
+    # 輪郭のぼかし（透明な画素のすぐ内側）は誤用ではない
+    rgba[8:10, 8:56, 3] = 128
+    # 内側の半透明の影は誤用
+    rgba[30:34, 30:34, 3] = 100
+    issues = TransparencyAnalyzer.find_issues(rgba, 'color_key', KEY, EDGE, 10)
+    assert issues['stats']['misuse'] == 16
+    assert issues['misuse'][30:34, 30:34].all()
@@ -0,0 +1,66 @@
+# tests/test_trigger_engine.py
+
+import datetime
+import random
+
+import pytest
+
+from simulate_triggers import FullScanSimulator, generate_synthetic_events
+from src.trigger_engine import TriggerEngine, TriggerSimulator
+
+START = datetime.datetime(2026, 1, 1, 9, 0)
+
+
+def _sequence(fired: list) -> list:
+    return [(r['time'], r['event_id']) for r in fired]
+
+
+@pytest.mark.parametrize('seed', range(12))
+def test_incremental_engine_matches_full_scan(seed):
+    events = generate_synthetic_events(120, 4, seed)
+    # 繰り返し可能・クールダウン無しのイベントも混ぜる
+    rng = random.Random(seed)
+    for event in events.values():
+        event['cooldown'] = rng.choice(['0', '', '1h', '24h'])
+        event['repeatable'] = rng.random() < 0.4
+    timeline = TriggerSimulator.generate_timeline([f"flag_{i}" for i in range(4)], 80, START, seed=seed)
+
+    engine = TriggerEngine(events)
+    fired = TriggerSimulator(events, engine).run(timeline)
+    full_fired = FullScanSimulator(events).run(timeline)
+    assert fired
+    assert _sequence(fired) == _sequence(full_fired)
+
+
+def test_completion_and_set_flag_chain_within_one_step():
+    events = {
+        'a_intro': {'triggers': [[{'type': 'favorability_above', 'value': '10'}]],
+                    'sequence': [{'type': 'set_flag', 'params': {'flag': 'met', 'operator': '=', 'value': '1'}}]},
+        'b_after_intro': {'triggers': [[{'type': 'event_completed', 'event_id': 'a_intro'}]]},
+        'c_flag': {'triggers': [[{'type': 'flag_equals', 'flag': 'met', 'value': '1'}]]},
+    }
+    timeline = [{'time': START, 'favorability': 0}, {'time': START + datetime.timedelta(hours=1), 'favorability': 20}]
+    fired = TriggerSimulator(events).run(timeline)
+    assert [r['event_id'] for r in fired] == ['a_intro', 'b_after_intro', 'c_flag']
+    assert _sequence(fired) == _sequence(FullScanSimulator(events).run(timeline))
+
+
+def test_non_repeatable_event_fires_once_and_repeatable_respects_cooldown():
+    events = {
+        'once': {'triggers': [[{'type': 'favorability_above', 'value': '0'}]]},
+        'daily': {'triggers': [[{'type': 'favorability_above', 'value': '0'}]], 'repeatable': True, 'cooldown': '24h'},
+    }
+    timeline = [{'time': START + datetime.timedelta(hours=12 * i), 'favorability': 10} for i in range(5)]
+    fired = TriggerSimulator(events).run(timeline)
+    assert [r['event_id'] for r in fired if r['event_id'] == 'once'] == ['once']
+    assert [r['time'] for r in fired if r['event_id'] == 'daily'] == [timeline[0]['time'], timeline[2]['time'], timeline[4]['time']]
+
+
+def test_legacy_single_trigger_and_compile_errors():
+    events = {
+        'legacy': {'trigger': {'type': 'favorability_above', 'value': '5'}},
+        'broken': {'triggers': [[{'type': 'favorability_above', 'value': 'abc'}]]},
+    }
+    engine = TriggerEngine(events)
+    assert [event_id for event_id, _, _ in engine.compile_errors] == ['broken']
+    assert engine.set_favorability(10) == ['legacy']